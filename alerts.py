@@ -0,0 +1,146 @@
+import logging
+import re
+import threading
+import time
+from datetime import datetime
+from typing import Dict, Optional
+
+WINDOW = 60 * 60
+BUDGET = 5
+BUDGET_PERIOD = 60 * 60
+MAX_INCIDENTS = 50
+MESSAGE_LIMIT = 300
+
+# Parts of an error message that differ between otherwise identical
+# failures: query strings, hex addresses and ids, numbers.
+VOLATILE_PARTS = (
+    (re.compile(r'\?[^\s\'")]*'), '?…'),
+    (re.compile(r'0x[0-9a-fA-F]+|\b[0-9a-fA-F]{8,}\b'), '<id>'),
+    (re.compile(r'\d+(?:\.\d+)?'), '<n>'),
+)
+
+
+def fingerprint(error: Exception) -> str:
+    """
+    Возвращает отпечаток ошибки: тип исключения и текст, из которого
+    убраны числа, идентификаторы и параметры запросов.
+    """
+    message = str(error)
+    for pattern, placeholder in VOLATILE_PARTS:
+        message = pattern.sub(placeholder, message)
+    return f'{type(error).__name__}: {message[:MESSAGE_LIMIT]}'
+
+
+def _time(timestamp: float) -> str:
+    return datetime.fromtimestamp(timestamp).strftime('%d.%m %H:%M')
+
+
+class AlertAggregator:
+    """
+    Агрегирует сообщения о сбоях для Telegram. Первый сбой с новым
+    отпечатком сообщается сразу, повторы в течение window секунд
+    только подсчитываются, а по истечении окна отправляется сводка с
+    числом повторов. Всего о сбоях отправляется не больше budget
+    уведомлений за budget_period секунд; сверх лимита уведомления только
+    логируются. После первого успешного цикла отправляется одно
+    уведомление о восстановлении со счетчиками. Открытые сбои хранятся в
+    state['alerts'] и сохраняются вместе с остальным состоянием.
+    """
+
+    def __init__(self, window: float = WINDOW, budget: int = BUDGET,
+                 budget_period: float = BUDGET_PERIOD,
+                 clock=time.time) -> None:
+        self.window = window
+        self.budget = budget
+        self.budget_period = budget_period
+        self.clock = clock
+        self.data = {'incidents': {}, 'sent': []}
+        self._lock = threading.Lock()
+
+    def bind(self, state: Dict) -> None:
+        """Переключает учет на сбои из переданного состояния бота."""
+        with self._lock:
+            self.data = state.setdefault('alerts', {})
+            self.data.setdefault('incidents', {})
+            self.data.setdefault('sent', [])
+
+    def _take_budget(self, now: float) -> bool:
+        sent = [
+            moment for moment in self.data['sent']
+            if now - moment < self.budget_period
+        ]
+        self.data['sent'] = sent
+        if len(sent) >= self.budget:
+            return False
+        sent.append(now)
+        return True
+
+    def _open(self, key: str, error: Exception, now: float) -> Dict:
+        incidents = self.data['incidents']
+        if key not in incidents and len(incidents) >= MAX_INCIDENTS:
+            oldest = min(incidents, key=lambda name: incidents[name]['last'])
+            del incidents[oldest]
+        return incidents.setdefault(key, {
+            'type': type(error).__name__,
+            'count': 0,
+            'unreported': 0,
+            'first': now,
+            'last': now,
+            'reported': None,
+        })
+
+    def record(self, error: Exception) -> Optional[str]:
+        """
+        Учитывает сбой и возвращает текст уведомления, если его нужно
+        отправить сейчас, или None, если сбой подавлен.
+        """
+        now = self.clock()
+        with self._lock:
+            incident = self._open(fingerprint(error), error, now)
+            incident['count'] += 1
+            incident['unreported'] += 1
+            incident['last'] = now
+            reported = incident['reported']
+            if reported is not None and now - reported < self.window:
+                return None
+            if not self._take_budget(now):
+                logging.warning(
+                    f'Уведомление о сбое не отправлено, исчерпан лимит '
+                    f'уведомлений: {error}'
+                )
+                return None
+            if incident['count'] == 1:
+                message = f'Сбой в работе программы: {error}'
+            else:
+                message = (
+                    f'Сбой в работе программы повторяется: {error}\n'
+                    f'С {_time(incident["first"])} — {incident["count"]} '
+                    f'раз, с прошлого уведомления — '
+                    f'{incident["unreported"]}.'
+                )
+            incident['reported'] = now
+            incident['unreported'] = 0
+            return message
+
+    def recovered(self) -> Optional[str]:
+        """
+        Закрывает открытые сбои и возвращает уведомление о восстановлении
+        работы или None, если о сбоях не сообщалось.
+        """
+        with self._lock:
+            incidents = self.data['incidents']
+            self.data['incidents'] = {}
+        if not any(
+            incident['reported'] is not None
+            for incident in incidents.values()
+        ):
+            return None
+        lines = ['Работа восстановлена. Сбои за это время:']
+        lines.extend(
+            f'{key} — {incident["count"]} раз, '
+            f'{_time(incident["first"])}–{_time(incident["last"])}'
+            for key, incident in sorted(
+                incidents.items(), key=lambda item: -item[1]['count']
+            )
+        )
+        return '\n'.join(lines)
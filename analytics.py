@@ -0,0 +1,409 @@
+import json
+import logging
+import os
+import re
+from typing import Dict, Iterable, Optional, Sequence
+
+import numpy as np
+
+COLUMNS = {
+    'created': np.float64,
+    'salary': np.float64,
+    'location': np.int32,
+    'keywords': np.uint64,
+}
+INITIAL_CAPACITY = 1024
+LOAD_BATCH = 10000
+MAX_KEYWORDS = 64
+
+# Salaries are aggregated into log-spaced histogram bins, so percentiles can
+# be updated incrementally; with 512 bins between 1e2 and 1e7 a bin is about
+# 2.3% wide, which is the worst-case error of a percentile estimate.
+SALARY_BINS = np.geomspace(1e2, 1e7, 513)
+PERCENTILES = (25, 50, 75)
+SECONDS_PER_DAY = 60 * 60 * 24
+
+WORD_PATTERN = re.compile(r'\w+')
+
+
+def _salary(salary_min: Optional[float],
+            salary_max: Optional[float]) -> float:
+    values = [value for value in (salary_min, salary_max) if value]
+    return sum(values) / len(values) if values else np.nan
+
+
+def histogram_percentiles(histogram: np.ndarray,
+                          percentiles: Sequence[float] = PERCENTILES
+                          ) -> np.ndarray:
+    """
+    Оценивает перцентили по строкам матрицы гистограмм зарплат. Внутри
+    корзины значение интерполируется в логарифмической шкале. Для пустых
+    строк возвращается NaN.
+    """
+    histogram = np.atleast_2d(histogram)
+    cumulative = np.cumsum(histogram, axis=1)
+    totals = cumulative[:, -1:]
+    targets = totals * (np.asarray(percentiles) / 100.0)
+    bins = np.empty(targets.shape, dtype=np.intp)
+    for row in range(histogram.shape[0]):
+        bins[row] = np.searchsorted(cumulative[row], targets[row])
+    bins = np.minimum(bins, histogram.shape[1] - 1)
+    before = np.take_along_axis(cumulative, bins, axis=1) - np.take_along_axis(
+        histogram, bins, axis=1
+    )
+    inside = np.take_along_axis(histogram, bins, axis=1)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fraction = np.clip((targets - before) / inside, 0, 1)
+    log_edges = np.log(SALARY_BINS)
+    values = np.exp(
+        log_edges[bins] + fraction * (log_edges[bins + 1] - log_edges[bins])
+    )
+    values[np.broadcast_to(totals == 0, values.shape)] = np.nan
+    return values
+
+
+class AnalyticsStore:
+    """
+    Колоночное хранилище вакансий для аналитики: каждая колонка лежит в
+    отдельном файле и отображается в память через numpy.memmap. Агрегаты
+    (гистограммы зарплат и число публикаций по дням) обновляются только
+    по новым строкам.
+    """
+
+    def __init__(self, directory: str, keywords: Sequence[str]) -> None:
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        keywords = [keyword.lower() for keyword in keywords][:MAX_KEYWORDS]
+        self.meta = self._load_meta()
+        if self.meta.get('keywords') != keywords:
+            # Keyword bitmasks depend on the keyword list, so a new list
+            # means rebuilding the store from the archive once.
+            logging.info('Набор ключевых слов изменился, аналитика '
+                         'будет пересчитана по всему архиву.')
+            self.meta = _empty_meta(keywords, capacity=0)
+        self._location_codes = {
+            name: code for code, name in enumerate(self.meta['locations'])
+        }
+        self.columns = self._open_columns(self.meta['capacity'])
+        self.location_histogram = self._load_aggregate(
+            'location_histogram', (len(self.meta['locations']),
+                                   len(SALARY_BINS) - 1)
+        )
+        self.keyword_histogram = self._load_aggregate(
+            'keyword_histogram', (len(keywords), len(SALARY_BINS) - 1)
+        )
+        self.daily_counts = self._load_aggregate(
+            'daily_counts', (len(self.meta['locations']), 0)
+        )
+
+    @property
+    def rows(self) -> int:
+        """Число строк в хранилище."""
+        return self.meta['rows']
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def _load_meta(self) -> Dict:
+        try:
+            with open(self._path('meta.json'), encoding='utf-8') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _load_aggregate(self, name: str, shape) -> np.ndarray:
+        if self.meta['rows']:
+            try:
+                return np.load(self._path(f'{name}.npy'))
+            except (OSError, ValueError):
+                logging.error(f'Не удалось загрузить агрегат {name}.')
+        return np.zeros(shape, dtype=np.int64)
+
+    def _open_columns(self, capacity: int) -> Dict[str, np.ndarray]:
+        columns = {}
+        for name, dtype in COLUMNS.items():
+            path = self._path(f'{name}.bin')
+            size = capacity * np.dtype(dtype).itemsize
+            with open(path, 'ab') as file:
+                file.truncate(size)
+            columns[name] = (
+                np.memmap(path, dtype=dtype, mode='r+', shape=(capacity,))
+                if capacity else np.empty(0, dtype=dtype)
+            )
+        return columns
+
+    def _reserve(self, extra: int) -> None:
+        needed = self.meta['rows'] + extra
+        if needed <= self.meta['capacity']:
+            return
+        capacity = max(INITIAL_CAPACITY, self.meta['capacity'])
+        while capacity < needed:
+            capacity *= 2
+        for column in self.columns.values():
+            if isinstance(column, np.memmap):
+                column.flush()
+        self.columns = self._open_columns(capacity)
+        self.meta['capacity'] = capacity
+
+    def _location_code(self, name: str) -> int:
+        code = self._location_codes.get(name)
+        if code is None:
+            code = self._location_codes[name] = len(self.meta['locations'])
+            self.meta['locations'].append(name)
+        return code
+
+    def _keyword_mask(self, title: str) -> int:
+        words = set(WORD_PATTERN.findall(title.lower()))
+        mask = 0
+        for bit, keyword in enumerate(self.meta['keywords']):
+            if keyword in words:
+                mask |= 1 << bit
+        return mask
+
+    def append(self, rows: Iterable) -> int:
+        """
+        Добавляет строки архива (rowid, title, location, salary_min,
+        salary_max, created_ts) в колонки и обновляет агрегаты по ним.
+        """
+        rows = list(rows)
+        if not rows:
+            return 0
+        self._reserve(len(rows))
+        start, end = self.meta['rows'], self.meta['rows'] + len(rows)
+        created = np.fromiter((row[5] for row in rows), np.float64, len(rows))
+        salary = np.fromiter(
+            (_salary(row[3], row[4]) for row in rows), np.float64, len(rows)
+        )
+        location = np.fromiter(
+            (self._location_code(row[2]) for row in rows), np.int32, len(rows)
+        )
+        keywords = np.fromiter(
+            (self._keyword_mask(row[1]) for row in rows), np.uint64, len(rows)
+        )
+        self.columns['created'][start:end] = created
+        self.columns['salary'][start:end] = salary
+        self.columns['location'][start:end] = location
+        self.columns['keywords'][start:end] = keywords
+        self.meta['rows'] = end
+        self.meta['watermark'] = rows[-1][0]
+        self._update_aggregates(created, salary, location, keywords)
+        return len(rows)
+
+    def _update_aggregates(self, created: np.ndarray, salary: np.ndarray,
+                           location: np.ndarray,
+                           keywords: np.ndarray) -> None:
+        n_locations = len(self.meta['locations'])
+        n_bins = len(SALARY_BINS) - 1
+        self.location_histogram = _grow(
+            self.location_histogram, (n_locations, n_bins)
+        )
+
+        known = ~np.isnan(salary)
+        bins = np.clip(
+            np.searchsorted(SALARY_BINS, salary[known], side='right') - 1,
+            0, n_bins - 1
+        )
+        np.add.at(self.location_histogram, (location[known], bins), 1)
+        for bit in range(len(self.meta['keywords'])):
+            has_keyword = (
+                keywords[known] & np.uint64(1 << bit)
+            ).astype(bool)
+            self.keyword_histogram[bit] += np.bincount(
+                bins[has_keyword], minlength=n_bins
+            )
+
+        days = (created // SECONDS_PER_DAY).astype(np.int64)
+        if self.meta['first_day'] is None:
+            self.meta['first_day'] = int(days.min())
+        first_day = self.meta['first_day']
+        if days.min() < first_day:
+            shift = first_day - int(days.min())
+            self.daily_counts = np.pad(self.daily_counts, ((0, 0), (shift, 0)))
+            first_day = self.meta['first_day'] = int(days.min())
+        day_index = days - first_day
+        self.daily_counts = _grow(
+            self.daily_counts, (n_locations, int(day_index.max()) + 1)
+        )
+        np.add.at(self.daily_counts, (location, day_index), 1)
+
+    def sync(self, archive, batch: int = LOAD_BATCH) -> int:
+        """Догружает из архива строки, добавленные после прошлого вызова."""
+        total = 0
+        while True:
+            rows = archive.rows_after(self.meta['watermark'], batch)
+            total += self.append(rows)
+            if len(rows) < batch:
+                break
+        if total:
+            self.save()
+        logging.debug(f'В аналитику добавлено вакансий: {total}.')
+        return total
+
+    def rebuild(self, archive, version: Optional[float] = None) -> int:
+        """
+        Пересчитывает хранилище по всему архиву: нужно после того, как из
+        архива удалили или в нем изменили строки. Версия архива, по которой
+        выполнен пересчет, запоминается в meta['archive_version'].
+        """
+        self.meta = _empty_meta(self.meta['keywords'], self.meta['capacity'])
+        self.meta['archive_version'] = version
+        self._location_codes = {}
+        self.location_histogram = np.zeros(
+            (0, len(SALARY_BINS) - 1), dtype=np.int64
+        )
+        self.keyword_histogram = np.zeros(
+            (len(self.meta['keywords']), len(SALARY_BINS) - 1), dtype=np.int64
+        )
+        self.daily_counts = np.zeros((0, 0), dtype=np.int64)
+        total = self.sync(archive)
+        self.save()
+        return total
+
+    def save(self) -> None:
+        """Сбрасывает колонки и агрегаты на диск."""
+        for column in self.columns.values():
+            if isinstance(column, np.memmap):
+                column.flush()
+        np.save(self._path('location_histogram.npy'), self.location_histogram)
+        np.save(self._path('keyword_histogram.npy'), self.keyword_histogram)
+        np.save(self._path('daily_counts.npy'), self.daily_counts)
+        tmp_path = self._path('meta.json.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as file:
+            json.dump(self.meta, file, ensure_ascii=False)
+        os.replace(tmp_path, self._path('meta.json'))
+
+    def close(self) -> None:
+        """Сбрасывает колонки на диск и освобождает их отображения."""
+        for column in self.columns.values():
+            if isinstance(column, np.memmap):
+                column.flush()
+        self.columns = {
+            name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()
+        }
+
+    def salary_percentiles(self, by: str = 'location') -> Dict[str, Dict]:
+        """
+        Возвращает число вакансий с зарплатой и перцентили PERCENTILES по
+        локациям (`by='location'`) или ключевым словам (`by='keyword'`).
+        """
+        if by == 'location':
+            names, histogram = self.meta['locations'], self.location_histogram
+        elif by == 'keyword':
+            names, histogram = self.meta['keywords'], self.keyword_histogram
+        else:
+            raise ValueError(
+                f'Группировка возможна по location или keyword, получено {by}.'
+            )
+        if not len(names):
+            return {}
+        values = histogram_percentiles(histogram)
+        counts = histogram.sum(axis=1)
+        return {
+            name: {
+                'count': int(counts[code]),
+                **{
+                    f'p{percentile}': float(values[code, i])
+                    for i, percentile in enumerate(PERCENTILES)
+                }
+            }
+            for code, name in enumerate(names)
+        }
+
+    def rolling_counts(self, window: int = 7,
+                       now: Optional[float] = None) -> Dict[str, tuple]:
+        """
+        Возвращает по каждой локации число публикаций за последние `window`
+        дней и за `window` дней до них.
+        """
+        if self.meta['first_day'] is None:
+            return {}
+        today = int((now or self.columns['created'][
+            :self.meta['rows']
+        ].max()) // SECONDS_PER_DAY) - self.meta['first_day']
+        cumulative = np.concatenate(
+            (np.zeros((self.daily_counts.shape[0], 1), dtype=np.int64),
+             np.cumsum(self.daily_counts, axis=1)),
+            axis=1
+        )
+
+        def total(end_day: int) -> np.ndarray:
+            index = np.clip(end_day + 1, 0, cumulative.shape[1] - 1)
+            return cumulative[:, index]
+
+        current = total(today) - total(today - window)
+        previous = total(today - window) - total(today - 2 * window)
+        return {
+            name: (int(current[code]), int(previous[code]))
+            for code, name in enumerate(self.meta['locations'])
+        }
+
+    def keyword_counts(self, since: float) -> Dict[str, int]:
+        """
+        Считает публикации по ключевым словам, начиная с момента `since`,
+        напрямую по колонкам хранилища.
+        """
+        rows = self.meta['rows']
+        recent = self.columns['keywords'][:rows][
+            self.columns['created'][:rows] >= since
+        ]
+        return {
+            keyword: int(np.count_nonzero(recent & np.uint64(1 << bit)))
+            for bit, keyword in enumerate(self.meta['keywords'])
+        }
+
+
+def _empty_meta(keywords: Sequence[str], capacity: int) -> Dict:
+    return {
+        'rows': 0, 'capacity': capacity, 'watermark': 0,
+        'keywords': list(keywords), 'locations': [], 'first_day': None,
+    }
+
+
+def _grow(array: np.ndarray, shape) -> np.ndarray:
+    if array.shape[0] >= shape[0] and array.shape[1] >= shape[1]:
+        return array
+    return np.pad(
+        array,
+        ((0, max(0, shape[0] - array.shape[0])),
+         (0, max(0, shape[1] - array.shape[1])))
+    )
+
+
+def _money(value: float) -> str:
+    return '—' if np.isnan(value) else f'{value:,.0f}'
+
+
+def format_report(store: AnalyticsStore, top: int = 5,
+                  window: int = 7, now: Optional[float] = None) -> str:
+    """Формирует текстовый отчет по зарплатам и динамике публикаций."""
+    if not store.rows:
+        return 'Аналитика пока пуста: в архиве нет вакансий.'
+    lines = [f'Аналитика рынка по {store.rows} вакансиям.']
+    trends = store.rolling_counts(window, now)
+    locations = store.salary_percentiles('location')
+    ranked = sorted(trends, key=lambda name: trends[name], reverse=True)
+    lines.append(
+        f'\nЛокации (публикаций за {window} дн., изменение; '
+        'зарплата p25/p50/p75):'
+    )
+    for name in ranked[:top]:
+        current, previous = trends[name]
+        stats = locations[name]
+        lines.append(
+            f'• {name or "—"}: {current} ({current - previous:+d}); '
+            f'{_money(stats["p25"])} / {_money(stats["p50"])} / '
+            f'{_money(stats["p75"])}'
+        )
+    keywords = store.salary_percentiles('keyword')
+    if keywords:
+        latest = now or float(store.columns['created'][:store.rows].max())
+        recent = store.keyword_counts(latest - window * SECONDS_PER_DAY)
+        lines.append(
+            f'\nКлючевые слова (публикаций за {window} дн.; медиана '
+            'зарплаты):'
+        )
+        for name in sorted(recent, key=recent.get, reverse=True)[:top]:
+            lines.append(
+                f'• {name}: {recent[name]}; {_money(keywords[name]["p50"])}'
+            )
+    return '\n'.join(lines)
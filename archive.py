@@ -0,0 +1,298 @@
+import logging
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from itertools import islice
+from typing import Dict, Iterable, List, Optional
+
+BATCH_SIZE = 500
+SEARCH_LIMIT = 10
+# Maintenance works in small steps and releases the archive lock between
+# them, so the poll cycle can keep writing: FTS5 merges MERGE_PAGES pages
+# at a time and incremental vacuum frees VACUUM_PAGES pages at a time.
+MERGE_PAGES = 64
+VACUUM_PAGES = 256
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS vacancies (
+    rowid INTEGER PRIMARY KEY,
+    id TEXT NOT NULL UNIQUE,
+    title TEXT NOT NULL,
+    company TEXT NOT NULL,
+    location TEXT NOT NULL,
+    description TEXT NOT NULL,
+    redirect_url TEXT NOT NULL,
+    salary_min REAL,
+    salary_max REAL,
+    created TEXT NOT NULL,
+    created_ts REAL NOT NULL,
+    fetched_ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS vacancies_created_ts ON vacancies (created_ts);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS vacancies_fts USING fts5(
+    title, company, description,
+    content='vacancies', content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS vacancies_ai AFTER INSERT ON vacancies BEGIN
+    INSERT INTO vacancies_fts (rowid, title, company, description)
+    VALUES (new.rowid, new.title, new.company, new.description);
+END;
+CREATE TRIGGER IF NOT EXISTS vacancies_ad AFTER DELETE ON vacancies BEGIN
+    INSERT INTO vacancies_fts (vacancies_fts, rowid, title, company,
+                               description)
+    VALUES ('delete', old.rowid, old.title, old.company, old.description);
+END;
+CREATE TRIGGER IF NOT EXISTS vacancies_au AFTER UPDATE ON vacancies BEGIN
+    INSERT INTO vacancies_fts (vacancies_fts, rowid, title, company,
+                               description)
+    VALUES ('delete', old.rowid, old.title, old.company, old.description);
+    INSERT INTO vacancies_fts (rowid, title, company, description)
+    VALUES (new.rowid, new.title, new.company, new.description);
+END;
+'''
+
+UPSERT = '''
+INSERT INTO vacancies (id, title, company, location, description,
+                       redirect_url, salary_min, salary_max, created,
+                       created_ts, fetched_ts)
+VALUES (:id, :title, :company, :location, :description, :redirect_url,
+        :salary_min, :salary_max, :created, :created_ts, :fetched_ts)
+ON CONFLICT (id) DO UPDATE SET
+    title = excluded.title,
+    company = excluded.company,
+    location = excluded.location,
+    description = excluded.description,
+    redirect_url = excluded.redirect_url,
+    salary_min = excluded.salary_min,
+    salary_max = excluded.salary_max,
+    fetched_ts = excluded.fetched_ts
+WHERE excluded.title != vacancies.title
+    OR excluded.description != vacancies.description
+    OR excluded.company != vacancies.company
+    OR excluded.location != vacancies.location
+    OR excluded.redirect_url != vacancies.redirect_url
+    OR excluded.salary_min IS NOT vacancies.salary_min
+    OR excluded.salary_max IS NOT vacancies.salary_max
+'''
+
+# Newest matches first: FTS5 walks its doclists in descending rowid order
+# and stops after LIMIT rows, so the cost does not grow with the number of
+# matching vacancies the way ranking every match by bm25() would.
+SEARCH = '''
+SELECT v.id, v.title, v.company, v.location, v.redirect_url,
+       v.salary_min, v.salary_max, v.created
+FROM (
+    SELECT rowid FROM vacancies_fts
+    WHERE vacancies_fts MATCH ?
+    ORDER BY rowid DESC
+    LIMIT ?
+) AS matches
+JOIN vacancies AS v ON v.rowid = matches.rowid
+ORDER BY v.rowid DESC
+'''
+
+TOKEN_PATTERN = re.compile(r'\w+\*?')
+
+
+def parse_created(created: str) -> float:
+    """Переводит дату публикации Adzuna (ISO 8601) в unix-время."""
+    try:
+        return datetime.strptime(
+            created, '%Y-%m-%dT%H:%M:%SZ'
+        ).replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+def normalize_vacancy(vacancy: Dict, fetched_ts: float) -> Dict:
+    """Приводит вакансию из ответа Adzuna к плоской записи для архива."""
+    created = vacancy.get('created') or ''
+    return {
+        'id': str(vacancy.get('id')),
+        'title': vacancy.get('title') or '',
+        'company': (vacancy.get('company') or {}).get('display_name') or '',
+        'location': (vacancy.get('location') or {}).get('display_name') or '',
+        'description': vacancy.get('description') or '',
+        'redirect_url': vacancy.get('redirect_url') or '',
+        'salary_min': vacancy.get('salary_min'),
+        'salary_max': vacancy.get('salary_max'),
+        'created': created,
+        'created_ts': parse_created(created),
+        'fetched_ts': fetched_ts,
+    }
+
+
+def build_match_query(text: str) -> str:
+    """
+    Превращает пользовательский запрос в выражение FTS5: каждое слово
+    берется в кавычки, `*` в конце слова означает поиск по префиксу.
+    """
+    terms = []
+    for token in TOKEN_PATTERN.findall(text):
+        if token.endswith('*'):
+            terms.append(f'"{token[:-1]}"*')
+        else:
+            terms.append(f'"{token}"')
+    return ' '.join(terms)
+
+
+class VacancyArchive:
+    """Архив всех полученных вакансий в SQLite с полнотекстовым индексом."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.row_factory = sqlite3.Row
+        # Takes effect for a new file; older files are converted by the
+        # first compact().
+        self._connection.execute('PRAGMA auto_vacuum=INCREMENTAL')
+        self._connection.execute('PRAGMA journal_mode=WAL')
+        self._connection.execute('PRAGMA synchronous=NORMAL')
+        with self._connection:
+            self._connection.executescript(SCHEMA)
+
+    def add_many(self, vacancies: Iterable[Dict]) -> int:
+        """
+        Добавляет вакансии в архив пачками по BATCH_SIZE, каждая пачка в
+        отдельной транзакции. Возвращает число обработанных вакансий.
+        """
+        fetched_ts = time.time()
+        records = (
+            normalize_vacancy(vacancy, fetched_ts) for vacancy in vacancies
+        )
+        total = 0
+        with self._lock:
+            while True:
+                batch = list(islice(records, BATCH_SIZE))
+                if not batch:
+                    break
+                with self._connection:
+                    self._connection.executemany(UPSERT, batch)
+                total += len(batch)
+        logging.debug(f'В архив записано вакансий: {total}.')
+        return total
+
+    def search(self, text: str, limit: int = SEARCH_LIMIT) -> List[Dict]:
+        """Ищет вакансии по названию, компании и описанию."""
+        query = build_match_query(text)
+        if not query:
+            return []
+        with self._lock:
+            rows = self._connection.execute(SEARCH, (query, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def rows_after(self, rowid: int,
+                   limit: int = BATCH_SIZE) -> List[sqlite3.Row]:
+        """
+        Возвращает до `limit` записей, добавленных в архив после записи
+        `rowid`, в порядке добавления. Нужна для инкрементальной обработки.
+        """
+        with self._lock:
+            return self._connection.execute(
+                'SELECT rowid, title, location, salary_min, salary_max, '
+                'created_ts FROM vacancies WHERE rowid > ? '
+                'ORDER BY rowid LIMIT ?',
+                (rowid, limit)
+            ).fetchall()
+
+    def count(self) -> int:
+        """Возвращает число вакансий в архиве."""
+        with self._lock:
+            return self._connection.execute(
+                'SELECT count(*) FROM vacancies'
+            ).fetchone()[0]
+
+    def get_meta(self, key: str) -> Optional[float]:
+        """Возвращает служебное значение архива или None."""
+        with self._lock:
+            row = self._connection.execute(
+                'SELECT value FROM meta WHERE key = ?', (key,)
+            ).fetchone()
+        return None if row is None else row[0]
+
+    def set_meta(self, key: str, value: float) -> None:
+        """Сохраняет служебное значение архива."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                'INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                (key, value)
+            )
+
+    def apply_retention(self, max_age_days: float,
+                        now: Optional[float] = None) -> int:
+        """
+        Удаляет вакансии, опубликованные раньше, чем max_age_days назад,
+        пачками по BATCH_SIZE.
+        """
+        threshold = (now or time.time()) - max_age_days * 24 * 60 * 60
+        deleted = 0
+        while True:
+            with self._lock, self._connection:
+                batch = self._connection.execute(
+                    'DELETE FROM vacancies WHERE rowid IN (SELECT rowid '
+                    'FROM vacancies WHERE created_ts < ? LIMIT ?)',
+                    (threshold, BATCH_SIZE)
+                ).rowcount
+            deleted += batch
+            if batch < BATCH_SIZE:
+                break
+        logging.info(f'Из архива удалено устаревших вакансий: {deleted}.')
+        return deleted
+
+    def compact(self) -> None:
+        """
+        Сливает сегменты полнотекстового индекса и возвращает системе
+        свободные страницы файла. Работа идет небольшими шагами, между
+        которыми архив доступен для записи. Файл, созданный без
+        auto_vacuum, один раз полностью перестраивается командой VACUUM.
+        """
+        while True:
+            with self._lock, self._connection:
+                before = self._connection.total_changes
+                self._connection.execute(
+                    "INSERT INTO vacancies_fts (vacancies_fts, rank) "
+                    "VALUES ('merge', ?)", (-MERGE_PAGES,)
+                )
+                # Fewer than two changes means there was nothing to merge.
+                if self._connection.total_changes - before < 2:
+                    break
+        with self._lock:
+            if not self._connection.execute(
+                'PRAGMA auto_vacuum'
+            ).fetchone()[0]:
+                self._connection.execute('PRAGMA auto_vacuum=INCREMENTAL')
+                self._connection.execute('VACUUM')
+        while True:
+            with self._lock:
+                if not self._connection.execute(
+                    'PRAGMA freelist_count'
+                ).fetchone()[0]:
+                    break
+                self._connection.execute(
+                    f'PRAGMA incremental_vacuum({VACUUM_PAGES})'
+                ).fetchall()
+        logging.info(f'Архив {self.path} сжат.')
+
+    def close(self) -> None:
+        """Закрывает соединение с базой."""
+        with self._lock:
+            self._connection.close()
+
+
+def format_search_results(results: List[Dict]) -> str:
+    """Формирует ответ на команду поиска по архиву."""
+    if not results:
+        return 'В архиве ничего не найдено.'
+    return '\n'.join(
+        f'{result["title"]} in {result["location"]}, for company: '
+        f'{result["company"]} ({result["created"][:10]}). '
+        f'Link: {result["redirect_url"]}'
+        for result in results
+    )
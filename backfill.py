@@ -0,0 +1,53 @@
+import logging
+import math
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Callable, Dict, Iterable, List, Optional
+
+SECONDS_PER_DAY = 60 * 60 * 24
+CREATED_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def window_days(last_created: str, now: Optional[float] = None) -> int:
+    """
+    Возвращает, за сколько дней нужно запросить вакансии (параметр Adzuna
+    max_days_old), чтобы покрыть все, что опубликовано после last_created.
+    """
+    since = datetime.strptime(last_created, CREATED_FORMAT).replace(
+        tzinfo=timezone.utc
+    ).timestamp()
+    elapsed = (now or time.time()) - since
+    return max(1, math.ceil(elapsed / SECONDS_PER_DAY))
+
+
+def fetch_pages(fetch_page: Callable[[int], Dict], page_size: int,
+                max_pages: int, workers: int) -> List[Dict]:
+    """
+    Загружает страницы выдачи: первую последовательно, чтобы узнать общее
+    число вакансий, остальные параллельно не более чем в `workers` потоков.
+    Запрашивается не больше `max_pages` страниц.
+    """
+    first = fetch_page(1)
+    pages = min(max_pages, math.ceil(first.get('count', 0) / page_size))
+    results = list(first['results'])
+    if pages > 1:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for response in executor.map(fetch_page, range(2, pages + 1)):
+                results.extend(response['results'])
+    logging.info(
+        f'Догрузка: получено {len(results)} вакансий со страниц 1-{pages}.'
+    )
+    return results
+
+
+def chronological(vacancies: Iterable[Dict], since: str) -> List[Dict]:
+    """
+    Оставляет вакансии, опубликованные позже since, без повторов, и
+    упорядочивает их от старых к новым.
+    """
+    unique = {}
+    for vacancy in vacancies:
+        if vacancy.get('created', '') > since:
+            unique.setdefault(str(vacancy.get('id')), vacancy)
+    return sorted(unique.values(), key=lambda vacancy: vacancy['created'])
@@ -0,0 +1,106 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from digest import compact_vacancy
+
+CACHE_CAPACITY = 256
+DESCRIPTION_LIMIT = 600
+
+# A keyboard is a list of button rows, a button is (label, callback data).
+Keyboard = List[List[Tuple[str, str]]]
+View = Tuple[str, Keyboard]
+
+
+def _salary(vacancy: Dict) -> str:
+    values = [
+        f'{value:,.0f}'.replace(',', ' ')
+        for value in (vacancy.get('salary_min'), vacancy.get('salary_max'))
+        if value
+    ]
+    return ' – '.join(dict.fromkeys(values))
+
+
+class ResultBrowser:
+    """
+    Постраничный просмотр вакансий, найденных за цикл: чату отправляется
+    одно сообщение с кнопками, а нажатия обрабатываются из кеша подборок.
+    Подборки хранятся по ключу (чат, цикл); при переполнении вытесняются
+    давно не просматривавшиеся.
+    """
+
+    def __init__(self, capacity: int = CACHE_CAPACITY) -> None:
+        self.capacity = capacity
+        self._results = OrderedDict()
+        self._lock = threading.Lock()
+
+    def publish(self, chat_id: str, cycle: int,
+                vacancies: Sequence[Dict]) -> View:
+        """Сохраняет подборку чата и возвращает ее первую страницу."""
+        results = [
+            dict(
+                compact_vacancy(vacancy),
+                description=(vacancy.get('description') or '')[
+                    :DESCRIPTION_LIMIT
+                ],
+            )
+            for vacancy in vacancies
+        ]
+        with self._lock:
+            self._results[(str(chat_id), cycle)] = results
+            self._results.move_to_end((str(chat_id), cycle))
+            while len(self._results) > self.capacity:
+                self._results.popitem(last=False)
+        return self.render(results, cycle, 0)
+
+    def handle(self, chat_id: str, data: str) -> Optional[View]:
+        """
+        Обрабатывает нажатие кнопки с данными `cycle:action:index` и
+        возвращает новое содержимое сообщения или None, если подборка уже
+        вытеснена из кеша или данные некорректны.
+        """
+        try:
+            cycle, action, index = data.split(':')
+            cycle, index = int(cycle), int(index)
+        except ValueError:
+            logging.warning(f'Некорректные данные кнопки: {data}')
+            return None
+        with self._lock:
+            results = self._results.get((str(chat_id), cycle))
+            if results is None:
+                return None
+            self._results.move_to_end((str(chat_id), cycle))
+        if not 0 <= index < len(results):
+            return None
+        return self.render(results, cycle, index, details=action == 'd')
+
+    @staticmethod
+    def render(results: List[Dict], cycle: int, index: int,
+               details: bool = False) -> View:
+        """Формирует текст и кнопки страницы с вакансией номер index."""
+        if not results:
+            return 'Новых вакансий нет.', []
+        vacancy = results[index]
+        lines = [
+            f'{index + 1}/{len(results)}. {vacancy["title"]}',
+            f'{vacancy["company"]}, {vacancy["location"]}',
+        ]
+        salary = _salary(vacancy)
+        if salary:
+            lines.append(salary)
+        if details:
+            if vacancy['description']:
+                lines.append('')
+                lines.append(vacancy['description'])
+            lines.append(vacancy['redirect_url'])
+        navigation = []
+        if index > 0:
+            navigation.append(('◀', f'{cycle}:p:{index - 1}'))
+        if details:
+            navigation.append(('Кратко', f'{cycle}:p:{index}'))
+        else:
+            navigation.append(('Подробнее', f'{cycle}:d:{index}'))
+        if index < len(results) - 1:
+            navigation.append(('▶', f'{cycle}:p:{index + 1}'))
+        return '\n'.join(lines), [navigation]
@@ -0,0 +1,161 @@
+import contextvars
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import deadline
+from exceptions import DeadlineExceededError
+
+# Query parameters that only track where the click came from.
+TRACKING_PARAMS = frozenset((
+    'gclid', 'fbclid', 'msclkid', 'yclid', 'mc_cid', 'mc_eid', '_hsenc',
+    '_hsmi', 'trk', 'trkid', 'ref', 'referrer',
+))
+TRACKING_PREFIXES = ('utm_',)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+CACHE_TTL = 60 * 60 * 24 * 7
+CACHE_LIMIT = 5000
+# Failed lookups are retried sooner than successful ones expire.
+FAILURE_TTL = 60 * 60
+MAX_REDIRECTS = 10
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 10
+
+
+def normalize_url(url: str) -> str:
+    """
+    Приводит адрес к каноническому виду: схема и хост в нижнем регистре,
+    без порта по умолчанию, фрагмента, завершающего слеша и параметров
+    отслеживания; остальные параметры отсортированы.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and parts.port != DEFAULT_PORTS.get(scheme):
+        host = f'{host}:{parts.port}'
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key.lower() not in TRACKING_PARAMS
+        and not key.lower().startswith(TRACKING_PREFIXES)
+    )
+    return urlunsplit((
+        scheme, host, parts.path.rstrip('/') or '', urlencode(query), ''
+    ))
+
+
+class UrlResolver:
+    """
+    Находит конечные адреса вакансий: проходит по перенаправлениям
+    HEAD-запросами в пуле из max_workers потоков и кеширует результат на ttl
+    секунд. Кеш хранится в state['url_cache'] и
+    сохраняется вместе с остальным состоянием.
+    """
+
+    def __init__(self, ttl: float = CACHE_TTL, max_workers: int = 8,
+                 limit: int = CACHE_LIMIT, clock=time.time) -> None:
+        self.ttl = ttl
+        self.max_workers = max_workers
+        self.limit = limit
+        self.clock = clock
+        self.cache = {}
+        self._lock = threading.Lock()
+
+    def bind(self, state: Dict) -> None:
+        """Переключает кеш на данные из переданного состояния бота."""
+        with self._lock:
+            self.cache = state.setdefault('url_cache', {})
+            now = self.clock()
+            for url in [
+                url for url, (_, expires) in self.cache.items()
+                if expires <= now
+            ]:
+                del self.cache[url]
+
+    def cached(self, url: str):
+        """Возвращает адрес из кеша или None, если его нет или он устарел."""
+        with self._lock:
+            entry = self.cache.get(url)
+            if entry is None or entry[1] <= self.clock():
+                return None
+            return entry[0]
+
+    def _store(self, url: str, final: str, ttl: float) -> None:
+        with self._lock:
+            self.cache.pop(url, None)
+            self.cache[url] = [final, self.clock() + ttl]
+            # Dicts keep insertion order, so the oldest entries go first.
+            for stale in list(self.cache)[:-self.limit]:
+                del self.cache[stale]
+
+    def final_url(self, url: str) -> str:
+        """
+        Проходит по перенаправлениям и возвращает конечный адрес. Серверам,
+        не поддерживающим HEAD, отправляется GET без чтения тела ответа.
+        """
+        import requests
+
+        timeout = (
+            deadline.timeout(CONNECT_TIMEOUT), deadline.timeout(READ_TIMEOUT)
+        )
+        with requests.Session() as session:
+            session.max_redirects = MAX_REDIRECTS
+            response = session.head(url, allow_redirects=True, timeout=timeout)
+            if response.status_code in (405, 501):
+                response = session.get(
+                    url, allow_redirects=True, stream=True, timeout=timeout
+                )
+                response.close()
+            return response.url
+
+    def resolve(self, url: str) -> str:
+        """
+        Возвращает конечный адрес вакансии в том виде, в каком его вернул
+        сервер. Если пройти по перенаправлениям не удалось, возвращает
+        исходный адрес без изменений.
+        """
+        final = self.cached(url)
+        if final is not None:
+            return final
+        try:
+            final, ttl = self.final_url(url), self.ttl
+        except DeadlineExceededError:
+            return url
+        except Exception as error:
+            logging.warning(f'Не удалось проверить адрес {url}: {error}')
+            final, ttl = url, FAILURE_TTL
+        self._store(url, final, ttl)
+        return final
+
+    def resolve_many(self, urls: Iterable[str]) -> Dict[str, str]:
+        """
+        Находит конечные адреса параллельно. Адреса, которые не успели
+        проверить до истечения активного срока, возвращаются без изменений.
+        """
+        resolved = {url: self.cached(url) for url in urls}
+        pending = [url for url, final in resolved.items() if not final]
+        if pending:
+            with ThreadPoolExecutor(
+                max_workers=min(self.max_workers, len(pending))
+            ) as executor:
+                futures = {
+                    url: executor.submit(
+                        contextvars.copy_context().run, self._resolve_in_time,
+                        url
+                    )
+                    for url in pending
+                }
+                for url, future in futures.items():
+                    resolved[url] = future.result()
+        return resolved
+
+    def _resolve_in_time(self, url: str) -> str:
+        current = deadline.current()
+        if current is not None and current.expired():
+            return url
+        return self.resolve(url)
@@ -0,0 +1,98 @@
+import logging
+import re
+from collections import defaultdict
+from typing import Dict, List
+
+from planner import QueryPlan
+
+MAX_MERGE = 10
+MAX_RESULTS_PER_PAGE = 50
+
+
+class MergedRequest:
+    """
+    Один запрос к Adzuna, обслуживающий несколько поисков: их ключевые
+    слова объединены в параметр what_or.
+    """
+
+    def __init__(self, params: Dict, keywords: Dict[str, str]) -> None:
+        self.params = params
+        self.keywords = keywords
+        self._patterns = {
+            name: re.compile(rf'\b{re.escape(word)}', re.IGNORECASE)
+            for name, word in keywords.items()
+        }
+
+    @property
+    def members(self) -> List[str]:
+        """Имена поисков, которые обслуживает запрос."""
+        return list(self.keywords)
+
+    def demultiplex(self, results: List[Dict]) -> Dict[str, List[Dict]]:
+        """
+        Распределяет вакансии из общего ответа по исходным поискам: вакансия
+        достается поискам, чье ключевое слово встречается в названии или
+        описании. Вакансия, в которой ни одно слово не нашлось (Adzuna ищет
+        и по словоформам), достается всем поискам запроса.
+        """
+        if len(self.keywords) == 1:
+            return {self.members[0]: list(results)}
+        demuxed = {name: [] for name in self.keywords}
+        for vacancy in results:
+            text = ' '.join((
+                vacancy.get('title') or '', vacancy.get('description') or ''
+            ))
+            owners = [
+                name for name, pattern in self._patterns.items()
+                if pattern.search(text)
+            ] or self.members
+            for name in owners:
+                demuxed[name].append(vacancy)
+        return demuxed
+
+
+def _merge_key(params: Dict) -> tuple:
+    return tuple(sorted(
+        (key, str(value)) for key, value in params.items()
+        if key not in ('what', 'results_per_page')
+    ))
+
+
+def coalesce(plans: Dict[str, QueryPlan],
+             max_merge: int = MAX_MERGE) -> List[MergedRequest]:
+    """
+    Объединяет совместимые поиски (одинаковые параметры, кроме what, и
+    what из одного слова) в запросы с what_or не более чем по max_merge
+    поисков. Остальные поиски выполняются отдельными запросами.
+    """
+    requests = []
+    groups = defaultdict(list)
+    for name, plan in plans.items():
+        what = str(plan.params.get('what', '')).strip()
+        if what and ' ' not in what:
+            groups[_merge_key(plan.params)].append(name)
+        else:
+            requests.append(MergedRequest(plan.params, {name: what}))
+
+    for names in groups.values():
+        for start in range(0, len(names), max_merge):
+            chunk = names[start:start + max_merge]
+            base = plans[chunk[0]].params
+            if len(chunk) == 1:
+                requests.append(MergedRequest(base, {chunk[0]: base['what']}))
+                continue
+            keywords = {name: plans[name].params['what'] for name in chunk}
+            params = {
+                key: value for key, value in base.items() if key != 'what'
+            }
+            params['what_or'] = ' '.join(dict.fromkeys(keywords.values()))
+            params['results_per_page'] = min(
+                MAX_RESULTS_PER_PAGE,
+                sum(plans[name].params.get('results_per_page', 10)
+                    for name in chunk)
+            )
+            requests.append(MergedRequest(params, keywords))
+    logging.debug(
+        f'{len(plans)} поисков объединены в {len(requests)} запросов.'
+    )
+    return requests
@@ -0,0 +1,158 @@
+import json
+import logging
+import os
+from numbers import Number
+from typing import Callable, Dict, List, Optional, Tuple
+
+from planner import plan_searches
+
+# Settings that can be changed without a restart.
+RELOADABLE = (
+    'country', 'params', 'retry_period', 'searches', 'feeds', 'template',
+    'locale',
+)
+
+
+def read_config(path: str) -> Dict:
+    """
+    Читает файл конфигурации в формате JSON и проверяет его структуру.
+    При ошибке выбрасывает ValueError или OSError.
+    """
+    with open(path, encoding='utf-8') as file:
+        config = json.load(file)
+    if not isinstance(config, dict):
+        raise ValueError(
+            f'Файл конфигурации {path}: ожидался словарь, '
+            f'получен {type(config)}.'
+        )
+    unknown = set(config) - set(RELOADABLE)
+    if unknown:
+        raise ValueError(
+            f'Неизвестные настройки: {sorted(unknown)}. '
+            f'Допустимые настройки: {list(RELOADABLE)}.'
+        )
+    for key in ('params', 'searches', 'feeds'):
+        if not isinstance(config.get(key, {}), dict):
+            raise ValueError(f'Настройка {key} должна быть словарем.')
+    for name, filters in config.get('searches', {}).items():
+        if not isinstance(filters, dict):
+            raise ValueError(
+                f'Поиск {name} должен быть словарем фильтров, '
+                f'получено {filters!r}.'
+            )
+    for name, urls in config.get('feeds', {}).items():
+        if not _is_urls(urls):
+            raise ValueError(
+                f'Лента {name} должна быть адресом или списком адресов, '
+                f'получено {urls!r}.'
+            )
+    period = config.get('retry_period', 1)
+    if not isinstance(period, Number) or period <= 0:
+        raise ValueError(
+            f'Настройка retry_period должна быть положительным числом, '
+            f'получено {period!r}.'
+        )
+    return config
+
+
+def _is_urls(urls) -> bool:
+    if isinstance(urls, str):
+        return bool(urls)
+    return isinstance(urls, list) and all(
+        isinstance(url, str) and url for url in urls
+    )
+
+
+def merge_config(defaults: Dict, overrides: Dict) -> Dict:
+    """
+    Накладывает настройки из файла на значения по умолчанию. Параметры
+    запроса (params) дополняют параметры по умолчанию, а не заменяют их,
+    чтобы ключи API оставались в переменных окружения.
+    """
+    config = dict(defaults)
+    config.update(overrides)
+    config['params'] = {**defaults['params'], **overrides.get('params', {})}
+    return config
+
+
+def _search_keys(config: Dict) -> Dict[str, str]:
+    plans = plan_searches(config['searches'], config['params'])
+    return {
+        name: json.dumps(
+            [config['country'], plan.params, plan.local_filters],
+            sort_keys=True, default=str
+        )
+        for name, plan in plans.items()
+    }
+
+
+def diff_searches(old: Dict, new: Dict
+                  ) -> Tuple[List[str], List[str], List[str]]:
+    """
+    Сравнивает поиски двух конфигураций по итоговым запросам к API и
+    возвращает списки добавленных, удаленных и измененных поисков.
+    Если новые поиски некорректны, выбрасывает ValueError.
+    """
+    old_keys, new_keys = _search_keys(old), _search_keys(new)
+    added = [name for name in new_keys if name not in old_keys]
+    removed = [name for name in old_keys if name not in new_keys]
+    changed = [
+        name for name in new_keys
+        if name in old_keys and new_keys[name] != old_keys[name]
+    ]
+    return added, removed, changed
+
+
+class ConfigReloader:
+    """
+    Следит за файлом конфигурации и применяет его при изменении файла или
+    по сигналу SIGHUP. Обработчик сигнала только ставит флаг, а сама
+    перезагрузка выполняется в check(), между циклами опроса. Если файл
+    некорректен, остается прежняя конфигурация.
+    """
+
+    def __init__(self, path: str, apply: Callable[[Dict], None],
+                 defaults: Dict) -> None:
+        self.path = path
+        self.apply = apply
+        self.defaults = defaults
+        self.requested = False
+        self._stamp = None
+
+    def request(self, *args) -> None:
+        """Просит перезагрузить конфигурацию; подходит для signal.signal."""
+        self.requested = True
+
+    def _current_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def reload(self) -> bool:
+        """Читает и применяет конфигурацию; возвращает True при успехе."""
+        self.requested = False
+        # Remember the stamp before reading, so a broken file is reported
+        # once and not on every check.
+        self._stamp = self._current_stamp()
+        try:
+            config = merge_config(self.defaults, read_config(self.path))
+            self.apply(config)
+        except Exception as error:
+            # Any error here must leave the running bot on the old config.
+            logging.error(
+                f'Не удалось применить конфигурацию {self.path}: {error}. '
+                'Продолжаем с прежней конфигурацией.'
+            )
+            return False
+        return True
+
+    def check(self) -> bool:
+        """
+        Перезагружает конфигурацию, если файл изменился или пришел
+        SIGHUP. Возвращает True, если новая конфигурация применена.
+        """
+        if not self.requested and self._current_stamp() == self._stamp:
+            return False
+        return self.reload()
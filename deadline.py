@@ -0,0 +1,66 @@
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from exceptions import DeadlineExceededError
+
+_current = ContextVar('deadline', default=None)
+
+
+class Deadline:
+    """
+    Крайний срок выполнения работы. Активный срок хранится в контексте,
+    поэтому сетевые вызовы берут из него свои таймауты без явной
+    передачи через все функции.
+    """
+
+    def __init__(self, budget: float, clock=time.monotonic) -> None:
+        self.clock = clock
+        self.expires_at = clock() + budget
+        self._tokens = []
+
+    def remaining(self) -> float:
+        """Возвращает оставшееся время в секундах, но не меньше нуля."""
+        return max(0.0, self.expires_at - self.clock())
+
+    def expired(self) -> bool:
+        """Проверяет, истек ли срок."""
+        return self.remaining() <= 0
+
+    def cancel(self) -> None:
+        """Досрочно завершает срок: следующие таймауты сразу истекают."""
+        self.expires_at = min(self.expires_at, self.clock())
+
+    def share(self, fraction: float) -> 'Deadline':
+        """
+        Выделяет из оставшегося времени долю `fraction` под отдельный этап.
+        Срок этапа никогда не превышает срок родителя.
+        """
+        return Deadline(self.remaining() * fraction, self.clock)
+
+    def __enter__(self) -> 'Deadline':
+        self._tokens.append(_current.set(self))
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        _current.reset(self._tokens.pop())
+
+
+def current() -> Optional[Deadline]:
+    """Возвращает активный срок или None, если он не задан."""
+    return _current.get()
+
+
+def timeout(cap: float) -> float:
+    """
+    Возвращает таймаут для очередного блокирующего вызова: не больше `cap`
+    и не больше времени, оставшегося до активного срока. Если срок уже
+    истек, выбрасывает DeadlineExceededError.
+    """
+    deadline = current()
+    if deadline is None:
+        return cap
+    remaining = deadline.remaining()
+    if remaining <= 0:
+        raise DeadlineExceededError('Время, отведенное на цикл, истекло.')
+    return min(cap, remaining)
@@ -0,0 +1,150 @@
+import logging
+import queue
+import threading
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional
+
+import deadline
+
+LANES = 4
+MAX_DEPTH = 100
+
+
+class DeliveryLanes:
+    """
+    Параллельная доставка сообщений по нескольким чатам. Каждый чат
+    закреплен за одной из `lanes` очередей по хешу своего id, поэтому
+    сообщения одного чата уходят строго по порядку, а медленный чат
+    задерживает только свою очередь. Очередь вмещает не больше max_depth
+    сообщений: если она заполнена, отправитель ждет (обратное давление).
+    Если отправка в чат не удалась, следующие сообщения этого чата
+    пропускаются до вызова reset_failures(), чтобы при повторе они не
+    обогнали неотправленное.
+    """
+
+    def __init__(self, send: Callable, lanes: int = LANES,
+                 max_depth: int = MAX_DEPTH, name: str = 'delivery') -> None:
+        self.send = send
+        self.name = name
+        self.queues = [queue.Queue(maxsize=max_depth) for _ in range(lanes)]
+        self.sent = [0] * lanes
+        self.peak_depth = [0] * lanes
+        self.failed_chats = set()
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._threads = []
+
+    def lane_for(self, chat_id) -> int:
+        """Возвращает номер очереди чата; он не меняется между запусками."""
+        return zlib.crc32(str(chat_id).encode()) % len(self.queues)
+
+    def start(self) -> None:
+        """Запускает потоки очередей, если они еще не запущены."""
+        with self._idle:
+            if self._threads:
+                return
+            for lane in range(len(self.queues)):
+                thread = threading.Thread(
+                    target=self._work, args=(lane,),
+                    name=f'{self.name}-{lane}', daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _work(self, lane: int) -> None:
+        while True:
+            chat_id, item, done, finished, expires = self.queues[lane].get()
+            try:
+                with self._idle:
+                    if chat_id in self.failed_chats:
+                        continue
+                if expires is None:
+                    self.send(chat_id, item)
+                elif not expires.expired():
+                    # Each send gets its own Deadline: one object cannot
+                    # be entered by several threads at once.
+                    with expires.share(1.0):
+                        self.send(chat_id, item)
+                else:
+                    continue
+                self.sent[lane] += 1
+                if done is not None:
+                    done(item)
+            except Exception as error:
+                with self._idle:
+                    self.failed_chats.add(chat_id)
+                logging.error(
+                    f'Сбой доставки сообщения в чат {chat_id}: {error}',
+                    exc_info=True
+                )
+            finally:
+                try:
+                    if finished is not None:
+                        finished(item)
+                finally:
+                    with self._idle:
+                        self._pending -= 1
+                        self._idle.notify_all()
+
+    def submit(self, chat_id, item, done: Optional[Callable] = None,
+               timeout: Optional[float] = None,
+               finished: Optional[Callable] = None) -> bool:
+        """
+        Ставит сообщение в очередь чата. После отправки вызывается done,
+        после любого исхода (отправлено, сбой, истек срок) — finished.
+        Если очередь заполнена, ждет не дольше timeout секунд и возвращает
+        False, если место так и не освободилось; timeout=0 — не ждать.
+        """
+        self.start()
+        lane = self.lane_for(chat_id)
+        with self._idle:
+            self._pending += 1
+        try:
+            self.queues[lane].put(
+                (chat_id, item, done, finished, deadline.current()),
+                timeout=timeout
+            )
+        except queue.Full:
+            with self._idle:
+                self._pending -= 1
+                self._idle.notify_all()
+            return False
+        self.peak_depth[lane] = max(
+            self.peak_depth[lane], self.queues[lane].qsize()
+        )
+        return True
+
+    def reset_failures(self) -> None:
+        """Снова разрешает отправку в чаты, где она не удалась."""
+        with self._idle:
+            self.failed_chats.clear()
+
+    def wait_room(self, lanes: Iterable[int],
+                  timeout: Optional[float] = None) -> bool:
+        """
+        Ждет, пока хотя бы в одной из очередей lanes освободится место;
+        возвращает False по таймауту.
+        """
+        lanes = list(lanes)
+        with self._idle:
+            return self._idle.wait_for(
+                lambda: any(not self.queues[lane].full() for lane in lanes),
+                timeout
+            )
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Ждет, пока все очереди опустеют; возвращает False по таймауту."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def stats(self) -> List[Dict]:
+        """Возвращает глубину очередей и число отправленных сообщений."""
+        return [
+            {
+                'lane': lane,
+                'depth': self.queues[lane].qsize(),
+                'peak_depth': self.peak_depth[lane],
+                'sent': self.sent[lane],
+            }
+            for lane in range(len(self.queues))
+        ]
@@ -0,0 +1,208 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Set
+
+MESSAGE_LIMIT = 4096
+GROUP_FIELDS = ('company', 'location')
+
+# Upper bound for the search of the next cron match: one leap year.
+SEARCH_LIMIT = timedelta(days=366)
+
+
+def _parse_cron_field(field: str, low: int, high: int) -> Set[int]:
+    """
+    Разбирает одно поле cron-выражения (`*`, `*/n`, `a-b`, `a-b/n`, `a/n`,
+    `a,b`) в множество допустимых значений. Как и в cron, `a/n` означает
+    значения от a до максимума поля с шагом n.
+    """
+    values = set()
+    for part in field.split(','):
+        part, stepped, raw_step = part.partition('/')
+        step = int(raw_step) if stepped else 1
+        if part == '*':
+            start, end = low, high
+        elif '-' in part:
+            start, end = (int(value) for value in part.split('-', 1))
+        elif stepped:
+            start, end = int(part), high
+        else:
+            start = end = int(part)
+        if start < low or end > high or start > end or step < 1:
+            raise ValueError(
+                f'Недопустимое значение поля cron-выражения: {field}.'
+            )
+        values.update(range(start, end + 1, step))
+    return values
+
+
+class CronSchedule:
+    """Расписание в формате cron: `минута час день месяц день_недели`."""
+
+    def __init__(self, expression: str) -> None:
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(
+                'Cron-выражение должно состоять из пяти полей, '
+                f'получено: {expression!r}.'
+            )
+        self.expression = expression
+        # As in cron, when both the day of month and the day of week are
+        # restricted, a day matching either of them fires.
+        self.either_day = not (
+            fields[2].startswith('*') or fields[4].startswith('*')
+        )
+        self.minutes = _parse_cron_field(fields[0], 0, 59)
+        self.hours = _parse_cron_field(fields[1], 0, 23)
+        self.days = _parse_cron_field(fields[2], 1, 31)
+        self.months = _parse_cron_field(fields[3], 1, 12)
+        # Both 0 and 7 mean Sunday, as in classic cron.
+        self.weekdays = {
+            day % 7 for day in _parse_cron_field(fields[4], 0, 7)
+        }
+
+    def _day_matches(self, moment: datetime) -> bool:
+        day = moment.day in self.days
+        weekday = moment.isoweekday() % 7 in self.weekdays
+        return moment.month in self.months and (
+            day or weekday if self.either_day else day and weekday
+        )
+
+    def next_after(self, moment: datetime) -> datetime:
+        """Возвращает ближайший момент срабатывания строго после `moment`."""
+        candidate = moment.replace(second=0, microsecond=0) + timedelta(
+            minutes=1
+        )
+        limit = moment + SEARCH_LIMIT
+        while candidate <= limit:
+            if not self._day_matches(candidate):
+                candidate = (candidate + timedelta(days=1)).replace(
+                    hour=0, minute=0
+                )
+            elif candidate.hour not in self.hours:
+                candidate = (candidate + timedelta(hours=1)).replace(minute=0)
+            elif candidate.minute not in self.minutes:
+                candidate += timedelta(minutes=1)
+            else:
+                return candidate
+        raise ValueError(
+            f'Cron-выражение {self.expression!r} никогда не срабатывает.'
+        )
+
+    def is_due(self, last_run: Optional[datetime], now: datetime) -> bool:
+        """Проверяет, было ли срабатывание в интервале (last_run, now]."""
+        if last_run is None:
+            return True
+        return self.next_after(last_run) <= now
+
+
+def compact_vacancy(vacancy: Dict) -> Dict:
+    """
+    Оставляет в вакансии только поля, нужные для дайджеста, чтобы буфер
+    занимал меньше места в состоянии.
+    """
+    return {
+        'id': str(vacancy.get('id')),
+        'title': vacancy.get('title', ''),
+        'company': (vacancy.get('company') or {}).get('display_name', ''),
+        'location': (vacancy.get('location') or {}).get('display_name', ''),
+        'redirect_url': vacancy.get('redirect_url', ''),
+        'salary_min': vacancy.get('salary_min'),
+        'salary_max': vacancy.get('salary_max'),
+        'created': vacancy.get('created', ''),
+    }
+
+
+def buffer_vacancy(state: Dict, chat_id: str, vacancy: Dict) -> None:
+    """Добавляет вакансию в буфер дайджеста указанного чата."""
+    buffers = state.setdefault('digest', {})
+    buffers.setdefault(str(chat_id), []).append(compact_vacancy(vacancy))
+
+
+def _salary(vacancy: Dict) -> float:
+    return vacancy.get('salary_max') or vacancy.get('salary_min') or 0
+
+
+def _format_vacancy(vacancy: Dict, group_by: str) -> str:
+    details = [vacancy['title']]
+    other_field = 'location' if group_by == 'company' else 'company'
+    if vacancy[other_field]:
+        details.append(vacancy[other_field])
+    salary = _salary(vacancy)
+    if salary:
+        details.append(f'до {salary:,.0f}')
+    return f'• {", ".join(details)}: {vacancy["redirect_url"]}'
+
+
+def build_digest(vacancies: List[Dict], group_by: str = 'company',
+                 limit: int = MESSAGE_LIMIT) -> List[str]:
+    """
+    Группирует вакансии по компании или локации и формирует из них
+    сообщения не длиннее `limit` символов. Группы с большим числом
+    вакансий идут первыми, внутри группы вакансии упорядочены по зарплате
+    и дате публикации.
+    """
+    if group_by not in GROUP_FIELDS:
+        raise ValueError(
+            f'Группировка возможна только по полям {GROUP_FIELDS}, '
+            f'получено: {group_by}.'
+        )
+    groups = defaultdict(list)
+    for vacancy in vacancies:
+        groups[vacancy[group_by] or '—'].append(vacancy)
+    ranked = sorted(groups.items(), key=lambda item: (-len(item[1]), item[0]))
+
+    messages = []
+    current = f'Новые вакансии: {len(vacancies)}'
+    for name, group in ranked:
+        group.sort(
+            key=lambda vacancy: (_salary(vacancy), vacancy['created']),
+            reverse=True
+        )
+        lines = [f'\n\n{name} ({len(group)}):'] + [
+            '\n' + _format_vacancy(vacancy, group_by) for vacancy in group
+        ]
+        for line in lines:
+            if len(current) + len(line) > limit:
+                messages.append(current)
+                current = line.lstrip('\n')[:limit]
+            else:
+                current += line
+    messages.append(current)
+    return messages
+
+
+def schedule_due(state: Dict, key: str, schedule: CronSchedule,
+                 now: Optional[datetime] = None) -> bool:
+    """
+    Проверяет, наступило ли время очередного срабатывания расписания, и
+    запоминает момент срабатывания в state[key]. Первый вызов только
+    запускает расписание, чтобы первое срабатывание охватывало полный
+    период, а не один цикл опроса.
+    """
+    now = now or datetime.now()
+    last_run = state.get(key)
+    if last_run is not None and not schedule.is_due(
+        datetime.fromisoformat(last_run), now
+    ):
+        return False
+    state[key] = now.isoformat()
+    return last_run is not None
+
+
+def flush_due_digests(state: Dict, schedule: CronSchedule,
+                      group_by: str = 'company',
+                      now: Optional[datetime] = None) -> Dict[str, List[str]]:
+    """
+    Если по расписанию пора отправлять дайджест, очищает буферы и
+    возвращает готовые сообщения по каждому чату.
+    """
+    if not schedule_due(state, 'digest_last_run', schedule, now):
+        return {}
+    buffers = state.pop('digest', {})
+    digests = {
+        chat_id: build_digest(vacancies, group_by)
+        for chat_id, vacancies in buffers.items() if vacancies
+    }
+    logging.info(f'Сформированы дайджесты для {len(digests)} чатов.')
+    return digests
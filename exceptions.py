@@ -8,3 +8,11 @@ class UnexpectedAPIResponseError(NotForSendingError):
 
 class NotOkAPIResponseCodeError(Exception):
     """Исключение когда код ответа сервера != 200."""
+
+
+class DeadlineExceededError(NotForSendingError):
+    """Исключение при исчерпании времени, отведенного на цикл работы."""
+
+
+class QuotaExceededError(NotForSendingError):
+    """Исключение при исчерпании лимита запросов к API Adzuna."""
@@ -0,0 +1,265 @@
+import json
+import logging
+import os
+import queue
+import socket
+import stat
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+from archive import normalize_vacancy
+
+BUFFER_SIZE = 1000
+BATCH_SIZE = 100
+MAX_BYTES = 10 * 1024 * 1024
+BACKUPS = 5
+WRITE_TIMEOUT = 10
+
+
+def encode_vacancies(vacancies: Iterable[Dict]) -> List[bytes]:
+    """
+    Приводит вакансии к плоским записям архива и кодирует их строками
+    JSON Lines. Строки кодируются один раз и передаются всем приемникам.
+    """
+    now = time.time()
+    lines = []
+    for vacancy in vacancies:
+        record = normalize_vacancy(vacancy, now)
+        if vacancy.get('canonical_url'):
+            record['canonical_url'] = vacancy['canonical_url']
+        lines.append(
+            (json.dumps(record, ensure_ascii=False) + '\n').encode()
+        )
+    return lines
+
+
+class JsonlFileSink:
+    """
+    Дописывает записи в файл JSON Lines. Когда файл превышает max_bytes,
+    он переименовывается в path.1 (path.1 — в path.2 и так далее, хранится
+    не больше backups старых файлов), и запись продолжается в новый файл.
+    """
+
+    name = 'jsonl'
+
+    def __init__(self, path: str, max_bytes: int = MAX_BYTES,
+                 backups: int = BACKUPS) -> None:
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._file = None
+
+    def _rotate(self) -> None:
+        self.close()
+        for number in range(self.backups - 1, 0, -1):
+            if os.path.exists(f'{self.path}.{number}'):
+                os.replace(f'{self.path}.{number}',
+                           f'{self.path}.{number + 1}')
+        if self.backups:
+            os.replace(self.path, f'{self.path}.1')
+        else:
+            os.remove(self.path)
+
+    def write(self, lines: List[bytes]) -> None:
+        """Записывает пачку строк одним вызовом write."""
+        data = b''.join(lines)
+        if self._file is None:
+            self._file = open(self.path, 'ab')
+        size = self._file.tell()
+        if self.max_bytes and size and size + len(data) > self.max_bytes:
+            self._rotate()
+            self._file = open(self.path, 'ab')
+        self._file.write(data)
+        self._file.flush()
+
+    def close(self) -> None:
+        """Закрывает файл."""
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+class UnixSocketSink:
+    """
+    Отправляет записи потребителю, который слушает Unix-сокет path.
+    Соединение устанавливается при первой записи и восстанавливается
+    после обрыва. Таймаут действует только на подключение: запись с
+    таймаутом могла бы оборвать строку на середине, поэтому медленный
+    потребитель, как и у канала, тормозит только поток этого приемника.
+    """
+
+    name = 'socket'
+
+    def __init__(self, path: str, timeout: float = WRITE_TIMEOUT) -> None:
+        self.path = path
+        self.timeout = timeout
+        self._socket = None
+
+    def write(self, lines: List[bytes]) -> None:
+        """Отправляет пачку строк; при ошибке закрывает соединение."""
+        try:
+            if self._socket is None:
+                self._socket = socket.socket(socket.AF_UNIX,
+                                             socket.SOCK_STREAM)
+                self._socket.settimeout(self.timeout)
+                self._socket.connect(self.path)
+                self._socket.settimeout(None)
+            self._socket.sendall(b''.join(lines))
+        except OSError:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """Закрывает соединение."""
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+
+
+class NamedPipeSink:
+    """
+    Пишет записи в именованный канал path (создается, если его нет; если
+    по этому пути уже есть не канал, выбрасывает ValueError). Пока канал
+    никто не читает, запись завершается ошибкой, и пачка
+    теряется; медленный читатель тормозит только поток этого приемника.
+    """
+
+    name = 'fifo'
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._fd = None
+        if not os.path.exists(path):
+            os.mkfifo(path)
+        elif not stat.S_ISFIFO(os.stat(path).st_mode):
+            raise ValueError(f'{path} не является именованным каналом.')
+
+    def write(self, lines: List[bytes]) -> None:
+        """Записывает пачку строк; при ошибке закрывает канал."""
+        data = memoryview(b''.join(lines))
+        try:
+            if self._fd is None:
+                # Non-blocking open fails at once when there is no reader.
+                self._fd = os.open(self.path, os.O_WRONLY | os.O_NONBLOCK)
+                os.set_blocking(self._fd, True)
+            while data:
+                data = data[os.write(self._fd, data):]
+        except OSError:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        """Закрывает канал."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+
+class StreamExporter:
+    """
+    Передает записи в приемник из фонового потока. Записи ждут в очереди
+    не больше buffer_size штук и пишутся пачками до batch_size. Если
+    очередь заполнена, publish ждет (обратное давление), а по истечении
+    таймаута отбрасывает записи, чтобы не задерживать цикл опроса.
+    Пачка, которую не удалось записать, теряется.
+    """
+
+    def __init__(self, sink, buffer_size: int = BUFFER_SIZE,
+                 batch_size: int = BATCH_SIZE) -> None:
+        self.sink = sink
+        self.batch_size = batch_size
+        self.queue = queue.Queue(maxsize=buffer_size)
+        self.written = 0
+        self.dropped = 0
+        self.failed = 0
+        self._pending = 0
+        self._idle = threading.Condition()
+        self._thread = None
+
+    def start(self) -> None:
+        """Запускает поток записи, если он еще не запущен."""
+        with self._idle:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name=f'export-{self.sink.name}',
+                    daemon=True
+                )
+                self._thread.start()
+
+    def _run(self) -> None:
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self.sink.write(batch)
+                self.written += len(batch)
+            except OSError as error:
+                self.failed += len(batch)
+                logging.warning(
+                    f'Не удалось передать {len(batch)} вакансий в '
+                    f'{self.sink.name} {self.sink.path}: {error}'
+                )
+            finally:
+                with self._idle:
+                    self._pending -= len(batch)
+                    self._idle.notify_all()
+
+    def publish(self, lines: List[bytes],
+                timeout: Optional[float] = None) -> int:
+        """
+        Ставит строки в очередь, ожидая места не дольше timeout секунд на
+        все строки, и возвращает число принятых строк.
+        """
+        self.start()
+        expires = None if timeout is None else time.monotonic() + timeout
+        for accepted, line in enumerate(lines):
+            with self._idle:
+                self._pending += 1
+            try:
+                self.queue.put(line, timeout=(
+                    None if expires is None
+                    else max(0.0, expires - time.monotonic())
+                ))
+            except queue.Full:
+                with self._idle:
+                    self._pending -= 1
+                    self._idle.notify_all()
+                self.dropped += len(lines) - accepted
+                logging.warning(
+                    f'Очередь экспорта в {self.sink.name} переполнена, '
+                    f'отброшено {len(lines) - accepted} вакансий.'
+                )
+                return accepted
+        return len(lines)
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Ждет, пока очередь будет записана; False по таймауту."""
+        with self._idle:
+            return self._idle.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self, timeout: Optional[float] = None) -> bool:
+        """
+        Ждет не дольше timeout секунд, пока очередь будет записана, и
+        закрывает приемник. Возвращает False, если очередь не успела
+        опустеть; приемник тогда остается открытым, так как поток записи
+        еще работает с ним.
+        """
+        if not self.wait_idle(timeout):
+            return False
+        self.sink.close()
+        return True
+
+    def stats(self) -> Dict:
+        """Возвращает глубину очереди и счетчики записанных строк."""
+        return {
+            'sink': self.sink.name,
+            'depth': self.queue.qsize(),
+            'written': self.written,
+            'dropped': self.dropped,
+            'failed': self.failed,
+        }
@@ -0,0 +1,167 @@
+import math
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.radians(EARTH_RADIUS_KM)
+# Grid levels: as in a geohash, level k splits the 360 degrees of longitude
+# (and latitude, with the same cell size) into 2 ** k cells, so the cells
+# wrap around the antimeridian exactly. Level 15 cells are about a kilometre.
+MAX_LEVEL = 15
+# Subscriber settings the index is built from.
+GEO_FILTERS = ('near', 'radius_km', 'area')
+
+
+def haversine_km(lat1: float, lon1: float,
+                 lat2: float, lon2: float) -> float:
+    """Возвращает расстояние между двумя точками по поверхности Земли."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = (math.sin(dphi / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def area_path(area: Iterable[str]) -> Tuple[str, ...]:
+    """Приводит иерархию location.area к кортежу в нижнем регистре."""
+    return tuple(str(part).strip().lower() for part in area)
+
+
+def vacancy_point(vacancy: Dict) -> Optional[Tuple[float, float]]:
+    """Возвращает координаты вакансии или None, если их нет."""
+    try:
+        return float(vacancy['latitude']), float(vacancy['longitude'])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _size(level: int) -> float:
+    return 360 / 2 ** level
+
+
+def _level_for(radius_km: float) -> int:
+    for level in range(MAX_LEVEL, 0, -1):
+        if _size(level) * KM_PER_DEGREE >= radius_km:
+            return level
+    return 0
+
+
+def _cell(level: int, lat: float, lon: float) -> Tuple[int, int, int]:
+    size = _size(level)
+    column = math.floor((lon + 180) / size) % 2 ** level
+    return level, math.floor((lat + 90) / size), column
+
+
+class SubscriberGeoIndex:
+    """
+    Индекс подписчиков с фильтрами по месту: радиус вокруг точки
+    (near: [широта, долгота] и radius_km) и префикс иерархии location.area
+    (area: ['UK', 'Scotland']). Круги подписчиков разложены по сетке с
+    уровнями разного размера ячеек: каждый круг попадает на уровень, где
+    ячейка не меньше радиуса, и занимает там несколько соседних ячеек.
+    Для вакансии проверяется одна ячейка на уровень, а точное расстояние
+    считается только для подписчиков из этих ячеек. Префиксы областей
+    хранятся в дереве, которое проходится по иерархии вакансии.
+    Подписчик с обоими фильтрами получает вакансию, если она проходит оба.
+    """
+
+    def __init__(self, subscribers: Dict[str, Dict]) -> None:
+        self.cells = {}
+        self.levels = set()
+        self.areas = {}
+        self.circles = {}
+        self.restricted = {}
+        for chat_id, settings in subscribers.items():
+            filters = set()
+            if settings.get('near') and settings.get('radius_km'):
+                self._add_circle(chat_id, settings['near'],
+                                 float(settings['radius_km']))
+                filters.add('near')
+            if settings.get('area'):
+                node = self.areas
+                for part in area_path(settings['area']):
+                    node = node.setdefault(part, {})
+                node.setdefault(None, []).append(chat_id)
+                filters.add('area')
+            if filters:
+                self.restricted[chat_id] = filters
+
+    def _add_circle(self, chat_id: str, near: List[float],
+                    radius_km: float) -> None:
+        lat, lon = float(near[0]), float(near[1])
+        self.circles[chat_id] = (lat, lon, radius_km)
+        level = _level_for(radius_km)
+        self.levels.add(level)
+        size = _size(level)
+        dlat = radius_km / KM_PER_DEGREE
+        if abs(lat) + dlat >= 90:
+            # The circle covers a pole and so every longitude.
+            lon_cells = range(2 ** level)
+        else:
+            # Exact longitude half-width of a circle on the sphere.
+            dlon = math.degrees(math.asin(
+                math.sin(math.radians(dlat)) / math.cos(math.radians(lat))
+            ))
+            first = _cell(level, lat, lon - dlon)[2]
+            count = math.floor((lon + dlon + 180) / size) - math.floor(
+                (lon - dlon + 180) / size
+            ) + 1
+            lon_cells = [
+                (first + step) % 2 ** level for step in range(count)
+            ]
+        rows = range(
+            _cell(level, max(-90.0, lat - dlat), lon)[1],
+            _cell(level, min(90.0, lat + dlat), lon)[1] + 1
+        )
+        for row in rows:
+            for column in lon_cells:
+                self.cells.setdefault((level, row, column), []).append(
+                    chat_id
+                )
+
+    def _near(self, point: Tuple[float, float]) -> Set[str]:
+        found = set()
+        for level in self.levels:
+            for chat_id in self.cells.get(_cell(level, *point), ()):
+                lat, lon, radius_km = self.circles[chat_id]
+                if haversine_km(lat, lon, *point) <= radius_km:
+                    found.add(chat_id)
+        return found
+
+    def _in_area(self, area: Iterable[str]) -> Set[str]:
+        found = set()
+        node = self.areas
+        for part in area_path(area):
+            node = node.get(part)
+            if node is None:
+                break
+            found.update(node.get(None, ()))
+        return found
+
+    def match(self, vacancy: Dict) -> Set[str]:
+        """
+        Возвращает подписчиков с фильтрами по месту, которым подходит
+        вакансия. Вакансия без координат не проходит фильтр по радиусу.
+        """
+        point = vacancy_point(vacancy)
+        near = self._near(point) if point and self.levels else set()
+        area = (vacancy.get('location') or {}).get('area')
+        in_area = self._in_area(area) if area and self.areas else set()
+        return {
+            chat_id for chat_id in near | in_area
+            if ('near' not in self.restricted[chat_id] or chat_id in near)
+            and ('area' not in self.restricted[chat_id] or chat_id in in_area)
+        }
+
+    def allowed(self, vacancies: List[Dict]) -> Dict[str, Set[int]]:
+        """
+        Возвращает для каждого подписчика с фильтрами по месту номера
+        подходящих ему вакансий из списка.
+        """
+        allowed = {chat_id: set() for chat_id in self.restricted}
+        if not allowed:
+            return allowed
+        for position, vacancy in enumerate(vacancies):
+            for chat_id in self.match(vacancy):
+                allowed[chat_id].add(position)
+        return allowed
@@ -0,0 +1,167 @@
+import json
+import logging
+import sys
+import threading
+import time
+import traceback
+from contextlib import contextmanager
+from http import HTTPStatus
+from typing import Dict, Optional
+
+
+def dump_stacks() -> str:
+    """Возвращает текущие стеки вызовов всех потоков процесса."""
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    chunks = []
+    for ident, frame in sys._current_frames().items():
+        chunks.append(f'Поток {names.get(ident, "?")} ({ident}):\n')
+        chunks.extend(traceback.format_stack(frame))
+    return ''.join(chunks)
+
+
+class Watchdog:
+    """
+    Следит за тем, что цикл опроса продвигается: каждый этап (fetch, parse,
+    send, sleep) отмечает начало и успешное завершение. Если этап длится
+    дольше своего лимита, цикл считается зависшим, а стеки всех потоков
+    выводятся в лог.
+    """
+
+    def __init__(self, stall_threshold: float,
+                 stage_limits: Optional[Dict[str, float]] = None,
+                 clock=time.time) -> None:
+        self.stall_threshold = stall_threshold
+        self.stage_limits = stage_limits or {}
+        self.clock = clock
+        self.started_at = clock()
+        self.stage_name = None
+        self.stage_started = None
+        self.last_success = {}
+        self.last_cycle = None
+        self.stalled = False
+        # Extra metrics for the health endpoints: name -> callable.
+        self.probes = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name: str):
+        """Отмечает выполнение этапа цикла и время его успешного окончания."""
+        previous = self.stage_name
+        with self._lock:
+            self.stage_name, self.stage_started = name, self.clock()
+        succeeded = False
+        try:
+            yield
+            succeeded = True
+        finally:
+            with self._lock:
+                now = self.clock()
+                if succeeded:
+                    self.last_success[name] = now
+                # Finishing a nested stage counts as progress of the outer
+                # one, so its stall timer restarts.
+                self.stage_name = previous
+                self.stage_started = now if previous is not None else None
+
+    def cycle_completed(self) -> None:
+        """Отмечает успешное завершение цикла опроса."""
+        with self._lock:
+            self.last_cycle = self.last_success['cycle'] = self.clock()
+
+    def check(self) -> bool:
+        """
+        Проверяет, не завис ли текущий этап. При обнаружении зависания
+        один раз выводит в лог стеки всех потоков. Возвращает True, если
+        цикл завис.
+        """
+        with self._lock:
+            name, started = self.stage_name, self.stage_started
+            limit = self.stage_limits.get(name, self.stall_threshold)
+            stalled = started is not None and self.clock() - started > limit
+            was_stalled, self.stalled = self.stalled, stalled
+        if stalled and not was_stalled:
+            logging.critical(
+                f'Этап {name} выполняется дольше {limit} с, цикл опроса '
+                f'завис. Стеки потоков:\n{dump_stacks()}'
+            )
+        elif was_stalled and not stalled:
+            logging.warning('Цикл опроса снова продвигается.')
+        return stalled
+
+    def status(self) -> Dict:
+        """
+        Возвращает состояние цикла опроса и показания дополнительных
+        метрик (probes) для health-эндпоинтов.
+        """
+        with self._lock:
+            status = {
+                'stalled': self.stalled,
+                'stage': self.stage_name,
+                'stage_started': self.stage_started,
+                'last_cycle': self.last_cycle,
+                'last_success': dict(self.last_success),
+                'uptime': self.clock() - self.started_at,
+            }
+        status.update({name: probe() for name, probe in self.probes.items()})
+        return status
+
+    def is_ready(self, max_age: float) -> bool:
+        """Проверяет, что успешный цикл был не раньше, чем max_age назад."""
+        with self._lock:
+            return (
+                self.last_cycle is not None
+                and self.clock() - self.last_cycle <= max_age
+                and not self.stalled
+            )
+
+    def start(self, interval: float) -> threading.Thread:
+        """Запускает фоновый поток, проверяющий зависание раз в interval с."""
+        def run() -> None:
+            while True:
+                time.sleep(interval)
+                self.check()
+
+        thread = threading.Thread(target=run, name='watchdog', daemon=True)
+        thread.start()
+        return thread
+
+
+def start_health_server(watchdog: Watchdog, host: str, port: int,
+                        ready_max_age: float):
+    """
+    Запускает в фоновом потоке HTTP-сервер с эндпоинтами /healthz (процесс
+    не завис) и /readyz (недавно был успешный цикл опроса).
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class HealthHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path == '/healthz':
+                ok = not watchdog.check()
+            elif self.path == '/readyz':
+                ok = watchdog.is_ready(ready_max_age)
+            else:
+                self.send_error(HTTPStatus.NOT_FOUND)
+                return
+            body = json.dumps(watchdog.status()).encode()
+            self.send_response(
+                HTTPStatus.OK if ok else HTTPStatus.SERVICE_UNAVAILABLE
+            )
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args) -> None:
+            logging.debug(f'Health: {format % args}')
+
+    server = ThreadingHTTPServer((host, port), HealthHandler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name='health-server', daemon=True
+    ).start()
+    logging.info(
+        f'Health-эндпоинты доступны на http://{host}:'
+        f'{server.server_address[1]}/healthz и /readyz.'
+    )
+    return server
@@ -1,30 +1,87 @@
+import argparse
+import atexit
 import json
 import logging
 import os
+import signal
 import sys
+import threading
 import time
+from functools import lru_cache
 from http import HTTPStatus
-from typing import Dict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+from urllib.parse import urlparse
 
-import requests
-import telegram
-from dotenv import load_dotenv
-
-from exceptions import (NotForSendingError, NotOkAPIResponseCodeError,
-                        UnexpectedAPIResponseError)
-
-load_dotenv()
+from alerts import AlertAggregator
+from browse import ResultBrowser
+from canonical import UrlResolver, normalize_url
+from coalesce import coalesce
+from config import ConfigReloader, diff_searches
+import deadline
+from delivery import DeliveryLanes
+from digest import (CronSchedule, buffer_vacancy, flush_due_digests,
+                    schedule_due)
+from exceptions import (DeadlineExceededError, NotForSendingError,
+                        NotOkAPIResponseCodeError, UnexpectedAPIResponseError)
+from geo import GEO_FILTERS, SubscriberGeoIndex
+from healthcheck import Watchdog
+from planner import plan_searches
+from providers import (AdzunaProvider, FeedProvider, Provider,
+                       poll_providers)
+from quota import QuotaManager
+from render import PARSE_MODES, MessageRenderer, check_template
+from state import load_state, mark_seen, new_vacancies, save_state
 
 TOKENS = ('TELEGRAM_TOKEN', 'TELEGRAM_CHAT_ID', 'API_KEY', 'API_ID')
 
+# python-dotenv is only needed when the environment is not fully configured
+# (local runs); cron and serverless deployments skip the import entirely.
+if not all(os.getenv(token) for token in TOKENS):
+    from dotenv import load_dotenv
+    load_dotenv()
+
 TELEGRAM_TOKEN = os.getenv(TOKENS[0])
 TELEGRAM_CHAT_ID = os.getenv(TOKENS[1])
 API_KEY = os.getenv(TOKENS[2])
 API_ID = os.getenv(TOKENS[3])
 
 RETRY_PERIOD = 60 * 10
+# Time budget of one poll cycle: FETCH_SHARE of it goes to Adzuna requests,
+# the rest (plus whatever fetching left unused) to Telegram delivery.
+# Network timeouts are capped by the *_TIMEOUT values and by the time left.
+CYCLE_BUDGET = 60 * 2
+FETCH_SHARE = 0.6
+CONNECT_TIMEOUT = 3.05
+READ_TIMEOUT = 20
+SEND_TIMEOUT = 10
+# Liveness: a stage running STALL_GRACE seconds past its time budget means
+# the loop is stuck; stages without a budget of their own (parse) get
+# STALL_THRESHOLD. /healthz and /readyz are served on
+# HEALTH_HOST:HEALTH_PORT when it is set.
+STALL_GRACE = 15
+STALL_THRESHOLD = 30
+WATCHDOG_INTERVAL = 5
+HEALTH_HOST = os.getenv('HEALTH_HOST', '127.0.0.1')
+HEALTH_PORT = os.getenv('HEALTH_PORT')
+WATCHDOG = Watchdog(STALL_THRESHOLD, {
+    'fetch': CYCLE_BUDGET * FETCH_SHARE + STALL_GRACE,
+    # Delivery gets what is left of the cycle plus one send timeout.
+    'send': CYCLE_BUDGET + SEND_TIMEOUT + STALL_GRACE,
+    # Archive maintenance is started in the background, analytics sync
+    # and reports are not bounded by the cycle deadline.
+    'maintenance': CYCLE_BUDGET + STALL_GRACE,
+    'sleep': RETRY_PERIOD + STALL_GRACE,
+})
+# Adzuna call limits, unlimited unless set (the free tier allows 250 calls
+# a day and 2500 a month). The budget left is spread over the searches by
+# how many new vacancies each of them brings, so tight limits poll less
+# often than every RETRY_PERIOD.
+ADZUNA_DAILY_LIMIT = int(os.getenv('ADZUNA_DAILY_LIMIT', 0)) or None
+ADZUNA_MONTHLY_LIMIT = int(os.getenv('ADZUNA_MONTHLY_LIMIT', 0)) or None
+QUOTA = QuotaManager(ADZUNA_DAILY_LIMIT, ADZUNA_MONTHLY_LIMIT)
 COUNTRY = 'mx'  # Change this to the relevant country code.
-ENDPOINT = 'https://api.adzuna.com/v1/api/jobs/' + COUNTRY + '/search/1'
+ENDPOINT_TEMPLATE = 'https://api.adzuna.com/v1/api/jobs/{country}/search/1'
+ENDPOINT = ENDPOINT_TEMPLATE.format(country=COUNTRY)
 PARAMS = {
     'app_id': API_ID,
     'app_key': API_KEY,
@@ -33,6 +90,164 @@ PARAMS = {
     'sort_by': 'date',
     'content-type': 'application/json'
 }
+# Each search is a set of filters on top of PARAMS: what, where, distance,
+# category, salary_min, salary_max, max_days_old, company, contract_type,
+# contract_time, exclude (words or phrases) and exclude_companies.
+# Whatever Adzuna can filter itself is sent as query parameters.
+SEARCHES = {
+    'default': {},
+}
+# Extra vacancy sources polled alongside Adzuna in the same cycle: name ->
+# URL (or list of URLs) of an RSS, Atom or JSON Feed. Each source gets
+# FEED_TIMEOUT seconds and downloads at most FEED_CONCURRENCY feeds at once.
+FEEDS = {}
+FEED_TIMEOUT = 20
+FEED_CONCURRENCY = 4
+# Follow each new vacancy's redirect_url to the employer's page: its
+# normalized form becomes an extra dedup key (the same job found through
+# several aggregators is sent once), and with SEND_CANONICAL_URLS the final
+# address, as the server returned it, is sent instead of the tracking link.
+# Resolved addresses are cached in the state.
+RESOLVE_URLS = bool(os.getenv('RESOLVE_URLS'))
+SEND_CANONICAL_URLS = bool(os.getenv('SEND_CANONICAL_URLS'))
+RESOLVE_SHARE = 0.5
+RESOLVE_WORKERS = 8
+URL_RESOLVER = UrlResolver(max_workers=RESOLVE_WORKERS)
+WATCHDOG.stage_limits['resolve'] = CYCLE_BUDGET * RESOLVE_SHARE + STALL_GRACE
+# Subscribers: chat id -> {'profile': words describing the wanted vacancies,
+# 'top_k': at most this many vacancies per cycle, 'min_score': relevance
+# threshold from 0 to 1, and optionally 'near': [latitude, longitude] with
+# 'radius_km', and 'area': a prefix of Adzuna's location.area such as
+# ['UK', 'Scotland']}. When there are subscribers, new vacancies are
+# ranked against their profiles (TF-IDF, requires numpy) and each chat gets
+# only the relevant ones; otherwise everything goes to TELEGRAM_CHAT_ID,
+# which also keeps getting everything when only chats subscribed through
+# the webhook are there.
+SUBSCRIBERS = {}
+# Browse mode: instead of a message per vacancy every chat gets one message
+# per cycle with ◀ / ▶ / details buttons. Presses are answered from an
+# in-memory cache of the last BROWSE_CACHE_SIZE result sets by editing that
+# message, so this mode needs the long-running loop.
+BROWSE_MODE = bool(os.getenv('BROWSE_MODE'))
+BROWSE_CACHE_SIZE = 256
+BROWSER = ResultBrowser(BROWSE_CACHE_SIZE)
+UPDATES_TIMEOUT = 30
+# Webhook mode: when WEBHOOK_URL (the public https address Telegram posts
+# updates to; put a hard-to-guess secret into its path) is set, updates are
+# received by a local HTTP server on WEBHOOK_HOST:WEBHOOK_PORT instead of
+# long polling. Chats can then manage their subscriptions with /subscribe,
+# /unsubscribe and /filters. Updates are handled by WEBHOOK_WORKERS threads,
+# in order within a chat; at most WEBHOOK_QUEUE_DEPTH wait per thread.
+# /search, /stats and /quota answer only TELEGRAM_CHAT_ID, subscribed chats
+# and the comma-separated chat ids of COMMAND_CHATS. Other chats may
+# /subscribe only when OPEN_SUBSCRIPTIONS is set.
+WEBHOOK_URL = os.getenv('WEBHOOK_URL')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '127.0.0.1')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', 8443))
+WEBHOOK_WORKERS = 8
+WEBHOOK_QUEUE_DEPTH = 250
+COMMAND_CHATS = {
+    chat_id.strip() for chat_id in os.getenv('COMMAND_CHATS', '').split(',')
+    if chat_id.strip()
+}
+OPEN_SUBSCRIPTIONS = bool(os.getenv('OPEN_SUBSCRIPTIONS'))
+# Delivery lanes: every chat is pinned to one of DELIVERY_LANES sender
+# threads, so chats are served in parallel while each chat keeps its order.
+# A lane holds at most DELIVERY_QUEUE_DEPTH messages; while it is full its
+# chats wait and the other lanes keep going. Lane depths are reported by
+# /healthz.
+DELIVERY_LANES = 4
+DELIVERY_QUEUE_DEPTH = 100
+DELIVERY = DeliveryLanes(
+    lambda chat_id, item: send_entry(*item),
+    DELIVERY_LANES, DELIVERY_QUEUE_DEPTH
+)
+WATCHDOG.probes['delivery'] = DELIVERY.stats
+# Ids of outbox entries handed to the lanes and not yet finished: a send
+# that outlives its cycle is not queued again by the next one.
+IN_FLIGHT = set()
+# Monotonic time until which Telegram asked (RetryAfter) not to send.
+SEND_PAUSED_UNTIL = 0.0
+# Vacancy messages: MESSAGE_TEMPLATE is plain, markdown or html and
+# MESSAGE_LOCALE is en or ru; a subscriber may override both with
+# 'template' and 'locale'. Rendered messages are cached per vacancy,
+# template and locale, at most RENDER_CACHE_SIZE of them.
+MESSAGE_TEMPLATE = os.getenv('MESSAGE_TEMPLATE', 'plain')
+MESSAGE_LOCALE = os.getenv('MESSAGE_LOCALE', 'en')
+RENDER_CACHE_SIZE = 1024
+RENDERER = MessageRenderer(RENDER_CACHE_SIZE)
+WATCHDOG.probes['render'] = RENDERER.stats
+# Error alerts: a failure is reported once, repeats of the same failure are
+# summarized at most every ALERT_WINDOW seconds, and no more than
+# ALERT_BUDGET alerts are sent per ALERT_BUDGET_PERIOD.
+ALERT_WINDOW = 60 * 60
+ALERT_BUDGET = 5
+ALERT_BUDGET_PERIOD = 60 * 60
+ALERTS = AlertAggregator(ALERT_WINDOW, ALERT_BUDGET, ALERT_BUDGET_PERIOD)
+STATE_FILE = os.getenv('STATE_FILE', 'jobsearch_state.json')
+# The polling loop keeps its state on disk when STATE_FILE is set
+# explicitly and whenever the state holds what a restart must not lose:
+# the call counters of the Adzuna limits and the subscriptions made through
+# the webhook. --once mode always does.
+PERSIST_STATE = 'STATE_FILE' in os.environ or bool(
+    ADZUNA_DAILY_LIMIT or ADZUNA_MONTHLY_LIMIT or WEBHOOK_URL
+)
+# Catch-up after downtime: everything published since the newest vacancy
+# seen before is fetched in parallel and queued oldest first in the outbox,
+# alongside regular polling.
+BACKFILL_AFTER = 2 * RETRY_PERIOD
+BACKFILL_PAGE_SIZE = 50
+BACKFILL_MAX_PAGES = 10
+BACKFILL_WORKERS = 4
+# Set to 'company' or 'location' to send grouped digests on DIGEST_SCHEDULE
+# instead of a separate message per vacancy.
+DIGEST_GROUP_BY = os.getenv('DIGEST_GROUP_BY')
+DIGEST_SCHEDULE = os.getenv('DIGEST_SCHEDULE', '0 * * * *')
+# SQLite archive of every fetched vacancy; disabled when not set.
+ARCHIVE_FILE = os.getenv('ARCHIVE_FILE')
+ARCHIVE_RETENTION_DAYS = 180
+ARCHIVE_MAINTENANCE_PERIOD = 60 * 60 * 24
+# Salary and posting-volume analytics over the archive (requires numpy and
+# ARCHIVE_FILE); the report is sent on ANALYTICS_SCHEDULE.
+ANALYTICS_DIR = os.getenv('ANALYTICS_DIR')
+ANALYTICS_SCHEDULE = os.getenv('ANALYTICS_SCHEDULE', '0 9 * * 1')
+# Export of the deduplicated vacancy stream for other local services: a
+# JSON Lines file rotated at EXPORT_MAX_BYTES, a Unix socket a consumer
+# listens on and a named pipe; each is enabled by its path. A sink buffers
+# at most EXPORT_BUFFER vacancies and writes them in batches of up to
+# EXPORT_BATCH. When the buffer is full, the cycle waits up to
+# EXPORT_TIMEOUT seconds for room and then drops the rest.
+EXPORT_JSONL = os.getenv('EXPORT_JSONL')
+EXPORT_SOCKET = os.getenv('EXPORT_SOCKET')
+EXPORT_FIFO = os.getenv('EXPORT_FIFO')
+EXPORT_MAX_BYTES = 10 * 1024 * 1024
+EXPORT_BACKUPS = 5
+EXPORT_BUFFER = 1000
+EXPORT_BATCH = 100
+EXPORT_TIMEOUT = 5
+# How long the queues may take to drain before the process exits.
+EXPORT_DRAIN_TIMEOUT = 30
+# One wait for room per sink.
+WATCHDOG.stage_limits['export'] = 3 * EXPORT_TIMEOUT + STALL_GRACE
+# JSON file overriding COUNTRY, PARAMS, RETRY_PERIOD, SEARCHES, FEEDS,
+# MESSAGE_TEMPLATE and MESSAGE_LOCALE (as country, params, retry_period,
+# searches, feeds, template, locale). The polling loop
+# re-reads it on SIGHUP or when the file changes, checking every
+# CONFIG_CHECK_INTERVAL seconds between cycles.
+CONFIG_FILE = os.getenv('CONFIG_FILE')
+CONFIG_CHECK_INTERVAL = 5
+DEFAULT_CONFIG = {
+    'country': COUNTRY,
+    'params': PARAMS,
+    'retry_period': RETRY_PERIOD,
+    'searches': SEARCHES,
+    'feeds': FEEDS,
+    'template': MESSAGE_TEMPLATE,
+    'locale': MESSAGE_LOCALE,
+}
+CONFIG = ConfigReloader(
+    CONFIG_FILE, lambda config: apply_config(config), DEFAULT_CONFIG
+) if CONFIG_FILE else None
 
 
 def check_tokens() -> None:
@@ -48,15 +263,78 @@ def check_tokens() -> None:
     raise ValueError(message)
 
 
-def send_message(bot, message: str) -> None:
-    """Отправляет сообщение в Telegram чат."""
+def check_message_template() -> None:
+    """
+    Проверяет шаблон и язык сообщений по умолчанию и подписчиков из
+    SUBSCRIBERS до первого цикла, чтобы ошибка в них не сорвала отправку
+    уже найденных вакансий.
+    """
+    try:
+        check_template(MESSAGE_TEMPLATE, MESSAGE_LOCALE)
+        for chat_id, settings in SUBSCRIBERS.items():
+            try:
+                check_template(
+                    settings.get('template', MESSAGE_TEMPLATE),
+                    settings.get('locale', MESSAGE_LOCALE)
+                )
+            except ValueError as error:
+                raise ValueError(f'Подписчик {chat_id}: {error}') from error
+    except ValueError as error:
+        logging.critical(error)
+        raise
+
+
+def inline_keyboard(keyboard: List):
+    """Собирает клавиатуру Telegram из рядов кнопок (текст, данные)."""
+    import telegram
+
+    return telegram.InlineKeyboardMarkup([
+        [
+            telegram.InlineKeyboardButton(label, callback_data=data)
+            for label, data in row
+        ]
+        for row in keyboard
+    ])
+
+
+def send_message(bot, message: str, chat_id: Optional[str] = None,
+                 keyboard: Optional[List] = None,
+                 parse_mode: Optional[str] = None) -> None:
+    """
+    Отправляет сообщение в Telegram чат. По умолчанию используется чат
+    TELEGRAM_CHAT_ID. Если передана клавиатура, к сообщению добавляются
+    кнопки; parse_mode задает разметку текста. Постоянные ошибки Telegram
+    (например, BadRequest) логируются, а временные (сеть, таймаут,
+    ограничение частоты) выбрасываются, чтобы сообщение осталось в очереди
+    и было отправлено позже; после RetryAfter отправка приостанавливается
+    на указанное Telegram время.
+    """
+    import telegram
+
+    extra = {'reply_markup': inline_keyboard(keyboard)} if keyboard else {}
+    if parse_mode:
+        extra['parse_mode'] = parse_mode
+    wait_for_flood_control()
     try:
         logging.debug(f'Начало отправки сообщения в Telegram: {message}')
         bot.send_message(
-            chat_id=TELEGRAM_CHAT_ID,
-            text=json.dumps(message, ensure_ascii=False)
+            chat_id=chat_id or TELEGRAM_CHAT_ID,
+            text=message,
+            timeout=deadline.timeout(SEND_TIMEOUT),
+            **extra
         )
     except telegram.error.TelegramError as error:
+        if isinstance(error, telegram.error.RetryAfter):
+            global SEND_PAUSED_UNTIL
+            SEND_PAUSED_UNTIL = max(
+                SEND_PAUSED_UNTIL, time.monotonic() + error.retry_after
+            )
+        if is_transient(error):
+            logging.warning(
+                f'Сообщение {message} не отправлено в Telegram, повторим '
+                f'позже: {error}'
+            )
+            raise
         logging.error(
             f'При отправке в Telegram сообщения {message} '
             f'возникла ошибка: {error}'
@@ -65,14 +343,66 @@ def send_message(bot, message: str) -> None:
         logging.debug(f'В Telegram отправлено сообщение {message}.')
 
 
-def get_api_answer() -> Dict:
+def is_transient(error: Exception) -> bool:
+    """
+    Проверяет, что ошибка Telegram временная и отправку стоит повторить:
+    сбой сети, таймаут или ограничение частоты, но не BadRequest, который
+    в python-telegram-bot тоже наследует NetworkError.
+    """
+    import telegram
+
+    errors = telegram.error
+    return isinstance(error, (errors.RetryAfter, errors.TimedOut)) or (
+        isinstance(error, errors.NetworkError)
+        and not isinstance(error, errors.BadRequest)
+    )
+
+
+def wait_for_flood_control() -> None:
+    """
+    Ждет окончания паузы, которую Telegram назначил ответом RetryAfter.
+    Если пауза длиннее оставшегося времени цикла, выбрасывает
+    DeadlineExceededError, не дожидаясь ее.
+    """
+    pause = SEND_PAUSED_UNTIL - time.monotonic()
+    if pause <= 0:
+        return
+    current = deadline.current()
+    if current is not None and current.remaining() < pause:
+        raise DeadlineExceededError(
+            f'Telegram ограничил частоту отправки еще на {pause:.0f} с.'
+        )
+    time.sleep(pause)
+
+
+def notify(bot, message: str) -> None:
+    """
+    Отправляет служебное сообщение в чат TELEGRAM_CHAT_ID. Такие сообщения
+    не ставятся в очередь, поэтому временные сбои Telegram только
+    логируются.
+    """
+    import telegram
+
+    try:
+        send_message(bot, message)
+    except (telegram.error.TelegramError, DeadlineExceededError) as error:
+        logging.warning(f'Служебное сообщение не отправлено: {error}')
+
+
+def get_api_answer(params: Optional[Dict] = None, page: int = 1) -> Dict:
     """
     Делает GET-запрос к эндпоинту API-сервиса и возвращает
-    ответ, приведенный к типам данных Python.
+    ответ, приведенный к типам данных Python. По умолчанию используются
+    параметры PARAMS и запрашивается первая страница выдачи.
     """
+    import requests
+
     request_params = dict(
-        url=ENDPOINT,
-        params=PARAMS
+        url=ENDPOINT if page == 1 else f'{ENDPOINT.rsplit("/", 1)[0]}/{page}',
+        params=PARAMS if params is None else params,
+        timeout=(
+            deadline.timeout(CONNECT_TIMEOUT), deadline.timeout(READ_TIMEOUT)
+        )
     )
     logging.info(
         (
@@ -80,6 +410,7 @@ def get_api_answer() -> Dict:
             'с параметрами: params= {params}.'
         ).format(**request_params)
     )
+    QUOTA.record_call()
     try:
         response = requests.get(**request_params)
     except requests.RequestException as error:
@@ -100,10 +431,11 @@ def get_api_answer() -> Dict:
     return response.json()
 
 
-def parse_vacancy(vacancy: Dict) -> str:
+def parse_vacancy(vacancy: Dict, template: str = 'plain',
+                  locale: str = 'en') -> str:
     """
     Извлекает из информации о конкретной вакансии нужные детали и формирует
-    сообщение для дальнейшей отправки.
+    сообщение для дальнейшей отправки в шаблоне template на языке locale.
     """
     if 'title' not in vacancy:
         raise KeyError(
@@ -111,35 +443,25 @@ def parse_vacancy(vacancy: Dict) -> str:
             f'vacancy = {vacancy}.'
         )
 
-    title = vacancy['title']
-
     if 'location' not in vacancy:
         raise KeyError(
             'В ответе API отсутствуют ключ "location": '
             f'vacancy = {vacancy}.'
         )
 
-    location = vacancy['location']['display_name']
-
     if 'company' not in vacancy:
         raise KeyError(
             'В ответе API отсутствуют ключ "company": '
             f'vacancy = {vacancy}.'
         )
 
-    company = vacancy['company']['display_name']
-
     if 'redirect_url' not in vacancy:
         raise KeyError(
             'В ответе API отсутствуют ключ "redirect_url": '
             f'vacancy = {vacancy}.'
         )
 
-    redirect_url = vacancy['redirect_url']
-
-    return (
-        f'{title} in {location}, for company: {company}. Link: {redirect_url}'
-    )
+    return RENDERER.render(vacancy, template, locale)
 
 
 def check_response(response: Dict) -> None:
@@ -166,46 +488,1095 @@ def check_response(response: Dict) -> None:
     logging.debug('Проверка ответа API завершена.')
 
 
+def fetch_vacancies() -> List[Dict]:
+    """
+    Выполняет запросы по всем поискам из SEARCHES и возвращает вакансии,
+    прошедшие локальные фильтры. Поиски, отличающиеся только ключевым
+    словом, объединяются в один запрос с what_or. Если время на запросы
+    истекло, возвращается то, что успели получить.
+    """
+    vacancies = []
+    fetched = []
+    plans = plan_searches(SEARCHES, PARAMS)
+    planned = {
+        name: plans[name] for name in QUOTA.plan_cycle(plans, RETRY_PERIOD)
+    }
+    for request in coalesce(planned):
+        current = deadline.current()
+        try:
+            if current and current.expired():
+                raise DeadlineExceededError('Время на запросы истекло.')
+            response = get_api_answer(request.params)
+        except (DeadlineExceededError, ConnectionError) as error:
+            # A timeout cut short by the deadline counts as running out
+            # of time, not as a failure of the API.
+            if isinstance(error, ConnectionError) and not (
+                current and current.expired()
+            ):
+                raise
+            logging.warning(
+                f'Время на запросы к API истекло, поиски '
+                f'{", ".join(request.members)} и следующие за ними '
+                'перенесены на следующий цикл; получено вакансий: '
+                f'{len(vacancies)}.'
+            )
+            break
+        check_response(response)
+        fetched.extend(response['results'])
+        for name, results in request.demultiplex(response['results']).items():
+            QUOTA.record_fetch(
+                name, (vacancy.get('id') for vacancy in results)
+            )
+            matched = plans[name].filter(results)
+            logging.debug(
+                f'Поиск {name}: получено {len(results)} вакансий, '
+                f'после локальной фильтрации осталось {len(matched)}.'
+            )
+            vacancies.extend(matched)
+    archive_vacancies(fetched)
+    return vacancies
+
+
+def get_providers() -> List[Provider]:
+    """Возвращает источники вакансий: Adzuna и ленты из FEEDS."""
+    providers = [AdzunaProvider(lambda: fetch_vacancies(), CYCLE_BUDGET)]
+    providers.extend(feed_providers(FEEDS))
+    return providers
+
+
+def feed_providers(feeds: Dict) -> List[Provider]:
+    """
+    Создает источники для лент; для некорректных адресов выбрасывает
+    ValueError.
+    """
+    return [
+        FeedProvider(name, urls, FEED_CONCURRENCY, FEED_TIMEOUT)
+        for name, urls in feeds.items()
+    ]
+
+
+def fetch_all_sources() -> Tuple[List[Dict], List[Exception]]:
+    """
+    Опрашивает все источники одновременно и возвращает их вакансии и
+    ошибки источников, которые не помешали остальным. Вакансии из лент
+    сохраняются в архив (Adzuna сохраняет свои сама).
+    """
+    results, errors = poll_providers(get_providers())
+    vacancies = []
+    for name, found in results.items():
+        if name != AdzunaProvider.name:
+            archive_vacancies(found)
+        vacancies.extend(found)
+    return vacancies, list(errors.values())
+
+
+@lru_cache(maxsize=None)
+def get_archive(path: str):
+    """Открывает архив вакансий; соединение переиспользуется между циклами."""
+    from archive import VacancyArchive
+
+    return VacancyArchive(path)
+
+
+def archive_vacancies(vacancies: List[Dict]) -> None:
+    """
+    Сохраняет все полученные вакансии в архив, если он включен. Ошибки
+    архива не мешают отправке вакансий.
+    """
+    if not ARCHIVE_FILE or not vacancies:
+        return
+    import sqlite3
+
+    try:
+        get_archive(ARCHIVE_FILE).add_many(vacancies)
+    except sqlite3.Error as error:
+        logging.error(f'Не удалось сохранить вакансии в архив: {error}')
+
+
+@lru_cache(maxsize=None)
+def get_exporters(jsonl: Optional[str], socket_path: Optional[str],
+                  fifo: Optional[str]) -> tuple:
+    """
+    Создает экспортеры для заданных приемников; их очереди и потоки
+    переиспользуются между циклами.
+    """
+    from export import (JsonlFileSink, NamedPipeSink, StreamExporter,
+                        UnixSocketSink)
+
+    sinks = []
+    if jsonl:
+        sinks.append(JsonlFileSink(jsonl, EXPORT_MAX_BYTES, EXPORT_BACKUPS))
+    if socket_path:
+        sinks.append(UnixSocketSink(socket_path))
+    if fifo:
+        sinks.append(NamedPipeSink(fifo))
+    exporters = tuple(
+        StreamExporter(sink, EXPORT_BUFFER, EXPORT_BATCH) for sink in sinks
+    )
+    WATCHDOG.probes['export'] = lambda: [
+        exporter.stats() for exporter in exporters
+    ]
+    return exporters
+
+
+def check_exporters() -> None:
+    """
+    Создает приемники экспорта до первого цикла, чтобы ошибка в их
+    настройке (например, по пути EXPORT_FIFO лежит обычный файл)
+    обнаружилась при запуске.
+    """
+    if not (EXPORT_JSONL or EXPORT_SOCKET or EXPORT_FIFO):
+        return
+    try:
+        get_exporters(EXPORT_JSONL, EXPORT_SOCKET, EXPORT_FIFO)
+    except (OSError, ValueError) as error:
+        logging.critical(f'Не удалось подготовить экспорт вакансий: {error}')
+        raise
+
+
+def export_vacancies(vacancies: List[Dict]) -> None:
+    """
+    Передает новые вакансии в приемники экспорта, если они настроены.
+    Ожидание места в очередях ограничено EXPORT_TIMEOUT и временем цикла.
+    Ошибка в настройке экспорта только записывается в лог и не мешает
+    отправке вакансий в Telegram.
+    """
+    if not vacancies or not (EXPORT_JSONL or EXPORT_SOCKET or EXPORT_FIFO):
+        return
+    from export import encode_vacancies
+
+    try:
+        exporters = get_exporters(EXPORT_JSONL, EXPORT_SOCKET, EXPORT_FIFO)
+    except (OSError, ValueError) as error:
+        logging.error(f'Не удалось подготовить экспорт вакансий: {error}')
+        return
+    lines = encode_vacancies(vacancies)
+    for exporter in exporters:
+        current = deadline.current()
+        exporter.publish(lines, max(0.0, min(
+            EXPORT_TIMEOUT, current.remaining() if current else EXPORT_TIMEOUT
+        )))
+
+
+def close_exporters() -> None:
+    """
+    Дописывает очереди экспорта и закрывает приемники; вызывается перед
+    завершением процесса, так как потоки записи фоновые и завершились бы
+    вместе с ним, а вакансии из очереди уже отмечены как отправленные.
+    """
+    if not (EXPORT_JSONL or EXPORT_SOCKET or EXPORT_FIFO):
+        return
+    try:
+        exporters = get_exporters(EXPORT_JSONL, EXPORT_SOCKET, EXPORT_FIFO)
+    except (OSError, ValueError):
+        # The sinks were never created, so there is nothing to drain.
+        return
+    for exporter in exporters:
+        if not exporter.close(EXPORT_DRAIN_TIMEOUT):
+            logging.warning(
+                f'Экспорт в {exporter.sink.name} не завершен, '
+                f'{exporter.stats()["depth"]} вакансий не записаны.'
+            )
+
+
+# Held while archive maintenance runs; run_once waits for it before exit.
+ARCHIVE_MAINTENANCE = threading.Lock()
+
+
+def maintain_archive() -> None:
+    """
+    Раз в ARCHIVE_MAINTENANCE_PERIOD запускает в фоновом потоке
+    обслуживание архива: удаление устаревших вакансий и сжатие базы.
+    Время последнего обслуживания хранится в самом архиве, поэтому
+    перезапуск бота не приводит к внеочередному обслуживанию.
+    """
+    import sqlite3
+
+    try:
+        archive = get_archive(ARCHIVE_FILE)
+        maintained = archive.get_meta('maintained')
+        if maintained is None:
+            # A new archive has nothing to clean up yet.
+            archive.set_meta('maintained', time.time())
+            return
+    except sqlite3.Error as error:
+        logging.error(f'Не удалось прочитать данные архива: {error}')
+        return
+    if time.time() - maintained < ARCHIVE_MAINTENANCE_PERIOD:
+        return
+    if not ARCHIVE_MAINTENANCE.acquire(blocking=False):
+        return
+
+    def maintain() -> None:
+        try:
+            try:
+                archive.apply_retention(ARCHIVE_RETENTION_DAYS)
+                archive.compact()
+            finally:
+                # A failed run is retried on schedule, not every cycle.
+                archive.set_meta('maintained', time.time())
+        except sqlite3.Error as error:
+            logging.error(f'Не удалось обслужить архив вакансий: {error}')
+        finally:
+            ARCHIVE_MAINTENANCE.release()
+
+    threading.Thread(
+        target=maintain, name='archive-maintenance', daemon=True
+    ).start()
+
+
+def search_archive(query: str) -> str:
+    """Обрабатывает команду /search: ищет вакансии в архиве."""
+    from archive import format_search_results
+
+    if not ARCHIVE_FILE:
+        return 'Архив вакансий не включен.'
+    if not query.strip():
+        return 'Укажите, что искать: /search python django'
+    return format_search_results(get_archive(ARCHIVE_FILE).search(query))
+
+
+def analytics_keywords() -> tuple:
+    """Возвращает ключевые слова аналитики: слова из запросов всех поисков."""
+    queries = [PARAMS['what']] + [
+        filters.get('what', '') for filters in SEARCHES.values()
+    ]
+    return tuple(dict.fromkeys(
+        word.lower() for query in queries for word in query.split()
+    ))
+
+
+# The open analytics store as (directory, keywords, store): its files may
+# be owned by one store at a time.
+ANALYTICS = None
+ANALYTICS_LOCK = threading.Lock()
+
+
+def get_analytics(directory: str, keywords: tuple):
+    """
+    Открывает хранилище аналитики; оно переиспользуется между циклами.
+    Если ключевые слова изменились, прежнее хранилище закрывается и
+    открывается новое, которое пересчитывает те же файлы.
+    """
+    from analytics import AnalyticsStore
+
+    global ANALYTICS
+    with ANALYTICS_LOCK:
+        if ANALYTICS is not None and ANALYTICS[:2] == (directory, keywords):
+            return ANALYTICS[2]
+        if ANALYTICS is not None:
+            ANALYTICS[2].close()
+        ANALYTICS = (directory, keywords, AnalyticsStore(directory, keywords))
+        return ANALYTICS[2]
+
+
+def update_analytics(bot, state: Dict) -> None:
+    """
+    Догружает в аналитику новые вакансии из архива и по расписанию
+    отправляет отчет.
+    """
+    store = get_analytics(ANALYTICS_DIR, analytics_keywords())
+    archive = get_archive(ARCHIVE_FILE)
+    # Retention and compaction delete and rewrite archived rows, which an
+    # append-only sync never sees.
+    maintained = archive.get_meta('maintained')
+    if store.meta.get('archive_version') != maintained:
+        store.rebuild(archive, maintained)
+    else:
+        store.sync(archive)
+    if schedule_due(
+        state, 'analytics_last_report', CronSchedule(ANALYTICS_SCHEDULE)
+    ):
+        notify(bot, analytics_report())
+
+
+def analytics_report(query: str = '') -> str:
+    """Обрабатывает команду /stats: возвращает отчет аналитики."""
+    from analytics import format_report
+
+    if not (ARCHIVE_FILE and ANALYTICS_DIR):
+        return 'Аналитика не включена.'
+    return format_report(get_analytics(ANALYTICS_DIR, analytics_keywords()))
+
+
+def warn_quota_exhaustion() -> None:
+    """Предупреждает, если при текущем темпе лимит Adzuna закончится."""
+    exhausted_at = QUOTA.projection()['exhausted_at']
+    if exhausted_at:
+        logging.warning(
+            f'При текущем темпе лимит запросов к Adzuna закончится '
+            f'{exhausted_at}.'
+        )
+
+
+def quota_report(query: str = '') -> str:
+    """Обрабатывает команду /quota: возвращает расход лимита запросов."""
+    from quota import format_quota_report
+
+    return format_quota_report(QUOTA)
+
+
+# Guards the bot state shared by the polling loop and background threads.
+STATE_LOCK = threading.RLock()
+
+# Bot commands: name -> handler taking the command arguments and returning
+# the reply text.
+COMMANDS = {
+    'search': search_archive,
+    'stats': analytics_report,
+    'quota': quota_report,
+}
+
+
+def resolve_urls(state: Dict, vacancies: List[Dict]) -> None:
+    """
+    Находит конечные адреса вакансий, которые еще не отправлялись: адрес
+    для отправки сохраняется в поле direct_url, нормализованный ключ для
+    поиска повторов — в canonical_url.
+    """
+    with STATE_LOCK:
+        seen = set(state.get('seen_ids', []))
+    fresh = [
+        vacancy for vacancy in vacancies
+        if str(vacancy.get('id')) not in seen and vacancy.get('redirect_url')
+    ]
+    resolved = URL_RESOLVER.resolve_many(
+        vacancy['redirect_url'] for vacancy in fresh
+    )
+    for vacancy in fresh:
+        final = resolved[vacancy['redirect_url']]
+        vacancy['canonical_url'] = normalize_url(final)
+        if final != vacancy['redirect_url']:
+            vacancy['direct_url'] = final
+
+
+def with_direct_link(vacancy: Dict) -> Dict:
+    """
+    Подменяет ссылку на вакансию конечным адресом, если это включено и
+    адрес удалось найти.
+    """
+    if SEND_CANONICAL_URLS and vacancy.get('direct_url'):
+        return dict(vacancy, redirect_url=vacancy['direct_url'])
+    return vacancy
+
+
+def get_subscribers(state: Dict) -> Dict[str, Dict]:
+    """Возвращает подписчиков из SUBSCRIBERS и из состояния бота."""
+    return {**SUBSCRIBERS, **state.get('subscribers', {})}
+
+
+@lru_cache(maxsize=None)
+def get_ranker():
+    """
+    Создает ранжировщик вакансий; словарь и IDF накапливаются между
+    циклами.
+    """
+    from ranking import TfidfRanker
+
+    return TfidfRanker()
+
+
+def get_geo_index(subscribers: Dict[str, Dict]) -> SubscriberGeoIndex:
+    """
+    Возвращает индекс подписчиков по месту. Индекс перестраивается, только
+    когда меняются фильтры по месту (near, radius_km, area).
+    """
+    return _build_geo_index(json.dumps({
+        chat_id: {key: settings[key] for key in GEO_FILTERS if key in settings}
+        for chat_id, settings in subscribers.items()
+        if any(settings.get(key) for key in GEO_FILTERS)
+    }, sort_keys=True, default=str))
+
+
+@lru_cache(maxsize=1)
+def _build_geo_index(filters: str) -> SubscriberGeoIndex:
+    return SubscriberGeoIndex(json.loads(filters))
+
+
+def route_vacancies(state: Dict,
+                    vacancies: List[Dict]) -> List[Tuple[Optional[str], Dict]]:
+    """
+    Распределяет новые вакансии по чатам: при наличии подписчиков каждый
+    получает релевантные его профилю вакансии, от лучших к худшим, иначе
+    все вакансии идут в чат по умолчанию (chat_id None). Если подписчики
+    заданы только командами в чатах, чат по умолчанию по-прежнему
+    получает все вакансии. Подписчикам с фильтрами по месту достаются
+    только вакансии, которые их проходят.
+    """
+    subscribers = get_subscribers(state)
+    routed = []
+    if not SUBSCRIBERS and str(TELEGRAM_CHAT_ID) not in subscribers:
+        # Chats subscribed through the webhook must not take the vacancies
+        # away from the bot's own chat.
+        routed = [(None, vacancy) for vacancy in vacancies]
+    if not subscribers:
+        return routed
+    selected = get_ranker().select(
+        vacancies, subscribers,
+        get_geo_index(subscribers).allowed(vacancies)
+    )
+    return routed + [
+        (chat_id, vacancies[index])
+        for chat_id, indices in selected.items() for index in indices
+    ]
+
+
+def vacancy_entry(chat_id: Optional[str], vacancy: Dict,
+                  subscribers: Dict[str, Dict]) -> List:
+    """
+    Формирует запись очереди отправки о вакансии в шаблоне и на языке,
+    выбранных подписчиком. Если они неизвестны, используются шаблон и язык
+    по умолчанию.
+    """
+    settings = subscribers.get(chat_id) or {}
+    template = settings.get('template', MESSAGE_TEMPLATE)
+    locale = settings.get('locale', MESSAGE_LOCALE)
+    try:
+        check_template(template, locale)
+    except ValueError as error:
+        logging.warning(
+            f'Чат {chat_id}: {error} Используется шаблон по умолчанию.'
+        )
+        template, locale = MESSAGE_TEMPLATE, MESSAGE_LOCALE
+    message = parse_vacancy(vacancy, template, locale)
+    if PARSE_MODES[template]:
+        return [chat_id, message, None, PARSE_MODES[template]]
+    return [chat_id, message]
+
+
+def collect_backfill(since: str) -> List[Dict]:
+    """
+    Загружает по всем поискам вакансии, опубликованные после since, и
+    возвращает их без повторов в хронологическом порядке.
+    """
+    from backfill import chronological, fetch_pages, window_days
+
+    vacancies = []
+    for plan in plan_searches(SEARCHES, PARAMS).values():
+        # Catch-up may spend at most half of what is left of today's quota.
+        max_pages = int(min(BACKFILL_MAX_PAGES, QUOTA.remaining() // 2))
+        if not max_pages:
+            logging.warning('Лимит запросов не позволяет догрузить вакансии.')
+            break
+        params = dict(
+            plan.params,
+            results_per_page=BACKFILL_PAGE_SIZE,
+            max_days_old=window_days(since)
+        )
+
+        def fetch_page(page: int, params: Dict = params) -> Dict:
+            response = get_api_answer(params, page)
+            check_response(response)
+            return response
+
+        vacancies.extend(plan.filter(fetch_pages(
+            fetch_page, BACKFILL_PAGE_SIZE, max_pages, BACKFILL_WORKERS
+        )))
+    archive_vacancies(vacancies)
+    return chronological(vacancies, since)
+
+
+def queue_backfill(state: Dict, since: str) -> None:
+    """
+    Догружает вакансии, опубликованные после since, и ставит сообщения о
+    тех, что еще не отправлялись, в общую очередь отправки (в дайджесты
+    или подборки просмотра) так же, как основной цикл. Сбой догрузки не
+    мешает основному циклу опроса.
+    """
+    try:
+        vacancies = collect_backfill(since)
+    except Exception as error:
+        logging.error(f'Сбой догрузки вакансий: {error}', exc_info=True)
+        return
+    if RESOLVE_URLS:
+        resolve_urls(state, vacancies)
+    with STATE_LOCK:
+        fresh = list(new_vacancies(state, vacancies))
+        malformed = queue_vacancies(state, [
+            (chat_id, with_direct_link(vacancy))
+            for chat_id, vacancy in route_vacancies(state, fresh)
+        ])
+        mark_seen(state, fresh)
+    for error in malformed:
+        logging.error(f'Догруженная вакансия пропущена: {error}')
+    export_vacancies(fresh)
+
+
+def run_backfill(bot, state: Dict, background: bool = True) -> None:
+    """
+    Догружает вакансии, пропущенные за время простоя. В фоновом режиме
+    загрузка идет в отдельном потоке и не задерживает основной цикл;
+    сообщения отправляются из общей очереди ближайшими циклами.
+    """
+    since = state.get('last_created')
+    downtime = time.time() - state.get('last_poll', time.time())
+    if not since or downtime < BACKFILL_AFTER:
+        return
+    logging.info(f'Догрузка вакансий, опубликованных после {since}.')
+    if not background:
+        queue_backfill(state, since)
+        return
+    threading.Thread(
+        target=queue_backfill, args=(state, since), name='backfill',
+        daemon=True
+    ).start()
+
+
+def run_cycle(bot, state: Dict) -> bool:
+    """
+    Выполняет один цикл работы бота: запрашивает вакансии, отбирает новые
+    и отправляет их в Telegram. Сбои, не остановившие цикл (ошибка одного
+    из источников, вакансия без нужных полей), сообщаются так же, как
+    сбой всего цикла. Возвращает True, если цикл прошел без сбоев.
+    """
+    cycle = deadline.Deadline(CYCLE_BUDGET)
+    with cycle.share(FETCH_SHARE), WATCHDOG.stage('fetch'):
+        vacancies, failures = fetch_all_sources()
+    if RESOLVE_URLS:
+        with cycle.share(RESOLVE_SHARE), WATCHDOG.stage('resolve'):
+            resolve_urls(state, vacancies)
+    with cycle:
+        with STATE_LOCK, WATCHDOG.stage('parse'):
+            fresh = list(new_vacancies(state, vacancies))
+            new_ids = [vacancy.get('id') for vacancy in fresh]
+            malformed = queue_vacancies(state, [
+                (chat_id, with_direct_link(vacancy))
+                for chat_id, vacancy in route_vacancies(state, fresh)
+            ])
+            # Only now, with the messages in the outbox (which is saved
+            # with the state), the vacancies count as sent.
+            mark_seen(state, fresh)
+        for error in failures + malformed:
+            handle_cycle_error(bot, error)
+        if EXPORT_JSONL or EXPORT_SOCKET or EXPORT_FIFO:
+            with WATCHDOG.stage('export'):
+                export_vacancies(fresh)
+        QUOTA.settle(new_ids)
+        with WATCHDOG.stage('send'):
+            if DIGEST_GROUP_BY:
+                queue_digests(state)
+            deliver_outbox(bot, state)
+    state['last_poll'] = time.time()
+    WATCHDOG.cycle_completed()
+    warn_quota_exhaustion()
+    if ARCHIVE_FILE:
+        with WATCHDOG.stage('maintenance'):
+            maintain_archive()
+            if ANALYTICS_DIR:
+                update_analytics(bot, state)
+    return not (failures or malformed)
+
+
+def queue_vacancies(
+    state: Dict, routed: List[Tuple[Optional[str], Dict]]
+) -> List[Exception]:
+    """
+    Ставит сообщения о вакансиях в очередь state['outbox'], в дайджесты
+    или в подборки режима просмотра. Вакансии без нужных полей
+    пропускаются, а ошибки о них возвращаются, чтобы остальные вакансии
+    пачки не потерялись.
+    """
+    outbox = state.setdefault('outbox', [])
+    subscribers = get_subscribers(state)
+    accepted, malformed = [], []
+    for chat_id, vacancy in routed:
+        try:
+            entry = vacancy_entry(chat_id, vacancy, subscribers)
+        except KeyError as error:
+            malformed.append(error)
+            continue
+        accepted.append((chat_id, vacancy, entry))
+    if DIGEST_GROUP_BY:
+        for chat_id, vacancy, _ in accepted:
+            buffer_vacancy(state, chat_id or TELEGRAM_CHAT_ID, vacancy)
+    elif BROWSE_MODE:
+        queue_browse_pages(outbox, [
+            (chat_id, vacancy) for chat_id, vacancy, _ in accepted
+        ])
+    else:
+        outbox.extend(entry for _, _, entry in accepted)
+    return malformed
+
+
+def queue_browse_pages(outbox: List,
+                       routed: List[Tuple[Optional[str], Dict]]) -> None:
+    """
+    Ставит в очередь по одному сообщению с кнопками просмотра на каждый
+    чат, получивший новые вакансии.
+    """
+    cycle = int(time.time())
+    by_chat = {}
+    for chat_id, vacancy in routed:
+        by_chat.setdefault(chat_id, []).append(vacancy)
+    for chat_id, vacancies in by_chat.items():
+        message, keyboard = BROWSER.publish(
+            chat_id or TELEGRAM_CHAT_ID, cycle, vacancies
+        )
+        outbox.append([chat_id, message, keyboard])
+
+
+def answer_callback(bot, callback_query) -> None:
+    """
+    Обрабатывает нажатие кнопки просмотра: редактирует сообщение, на
+    котором нажата кнопка, данными из кеша подборок. На нажатие отвечается
+    всегда, чтобы клиент Telegram не ждал ответа бесконечно.
+    """
+    import telegram
+
+    notice = None
+    try:
+        message = callback_query.message
+        view = BROWSER.handle(message.chat_id, callback_query.data)
+        if view is None:
+            notice = 'Подборка устарела.'
+            return
+        text, keyboard = view
+        bot.edit_message_text(
+            text,
+            chat_id=message.chat_id,
+            message_id=message.message_id,
+            reply_markup=inline_keyboard(keyboard) if keyboard else None,
+            timeout=SEND_TIMEOUT
+        )
+    except telegram.error.TelegramError as error:
+        logging.error(f'Не удалось обработать нажатие кнопки: {error}')
+        notice = 'Не удалось открыть страницу, попробуйте еще раз.'
+    finally:
+        try:
+            bot.answer_callback_query(callback_query.id, text=notice)
+        except telegram.error.TelegramError as error:
+            logging.error(f'Не удалось ответить на нажатие кнопки: {error}')
+
+
+def poll_updates(bot) -> None:
+    """
+    Получает нажатия кнопок через long polling и обрабатывает их. Сбой
+    обработки одного нажатия записывается в журнал и не останавливает
+    поток.
+    """
+    import telegram
+
+    offset = None
+    while True:
+        try:
+            updates = bot.get_updates(
+                offset=offset, timeout=UPDATES_TIMEOUT,
+                allowed_updates=['callback_query']
+            )
+        except telegram.error.TelegramError as error:
+            logging.error(f'Не удалось получить обновления: {error}')
+            time.sleep(UPDATES_TIMEOUT)
+            continue
+        for update in updates:
+            offset = update.update_id + 1
+            if not update.callback_query:
+                continue
+            try:
+                answer_callback(bot, update.callback_query)
+            except Exception as error:
+                logging.error(
+                    f'Сбой обработки нажатия кнопки: {error}', exc_info=True
+                )
+
+
+def handle_command(state: Dict, chat_id: str, text: str) -> Optional[str]:
+    """
+    Выполняет команду из сообщения чата и возвращает ответ. Команды
+    подписки меняют state['subscribers'] и действуют с ближайшего цикла;
+    подписаться могут основной чат и чаты из COMMAND_CHATS, а при
+    OPEN_SUBSCRIPTIONS — любой чат. Остальные команды тратят квоту API и
+    раскрывают статистику, поэтому доступны только основному чату,
+    подписчикам и чатам из COMMAND_CHATS.
+    """
+    from webhook import SUBSCRIPTION_COMMANDS, USAGE, parse_command
+
+    parsed = parse_command(text)
+    if parsed is None:
+        return None
+    command, argument = parsed
+    trusted = chat_id == str(TELEGRAM_CHAT_ID) or chat_id in COMMAND_CHATS
+    if command in SUBSCRIPTION_COMMANDS:
+        with STATE_LOCK:
+            subscribers = state.setdefault('subscribers', {})
+            # Chats already subscribed can still unsubscribe.
+            if not (OPEN_SUBSCRIPTIONS or trusted or chat_id in subscribers):
+                return 'Подписка в этом чате недоступна.'
+            return SUBSCRIPTION_COMMANDS[command](
+                subscribers, chat_id, argument
+            )
+    if command in COMMANDS:
+        with STATE_LOCK:
+            allowed = trusted or chat_id in get_subscribers(state)
+        if not allowed:
+            return 'Команда в этом чате недоступна.'
+        return COMMANDS[command](argument)
+    return USAGE
+
+
+def handle_update(bot, state: Dict, data: Dict) -> None:
+    """Обрабатывает обновление Telegram: команду или нажатие кнопки."""
+    import telegram
+
+    try:
+        update = telegram.Update.de_json(data, bot)
+        if update.callback_query:
+            answer_callback(bot, update.callback_query)
+            return
+        message = update.effective_message
+        if message is None or not message.text:
+            return
+        reply = handle_command(state, str(message.chat_id), message.text)
+        if reply:
+            send_message(bot, reply, str(message.chat_id))
+    except Exception as error:
+        logging.error(
+            f'Сбой обработки обновления {data}: {error}', exc_info=True
+        )
+
+
+def start_webhook(bot, state: Dict):
+    """
+    Запускает прием обновлений через webhook: HTTP-сервер раскладывает
+    их по потокам обработки (по одному потоку на чат) и сразу отвечает
+    Telegram, после чего адрес регистрируется в Telegram.
+    """
+    from webhook import chat_of, start_webhook_server
+
+    lanes = DeliveryLanes(
+        lambda chat_id, data: handle_update(bot, state, data),
+        WEBHOOK_WORKERS, WEBHOOK_QUEUE_DEPTH, name='webhook'
+    )
+    WATCHDOG.probes['webhook'] = lanes.stats
+    server = start_webhook_server(
+        lambda data: lanes.submit(chat_of(data), data, timeout=0),
+        WEBHOOK_HOST, WEBHOOK_PORT, urlparse(WEBHOOK_URL).path or '/'
+    )
+    bot.set_webhook(
+        url=WEBHOOK_URL, allowed_updates=['message', 'callback_query']
+    )
+    return server
+
+
+def queue_digests(state: Dict) -> None:
+    """
+    Ставит в очередь на отправку накопленные дайджесты, если подошло время
+    по расписанию.
+    """
+    # Backfill buffers vacancies from its own thread under STATE_LOCK.
+    with STATE_LOCK:
+        digests = flush_due_digests(
+            state, CronSchedule(DIGEST_SCHEDULE), DIGEST_GROUP_BY
+        )
+        for chat_id, messages in digests.items():
+            state['outbox'].extend(
+                [chat_id, message] for message in messages
+            )
+
+
+def send_entry(bot, entry: List) -> None:
+    """Отправляет одно сообщение из очереди state['outbox']."""
+    chat_id, message, *extra = entry
+    if extra:
+        send_message(bot, message, chat_id, *extra)
+    elif chat_id is None:
+        send_message(bot, message)
+    else:
+        send_message(bot, message, chat_id)
+
+
+def release_entry(item: Tuple) -> None:
+    """Снимает с сообщения отметку об отправке, чем бы она ни кончилась."""
+    with STATE_LOCK:
+        IN_FLIGHT.discard(id(item[1]))
+
+
+def submit_entries(bot, entries: List[List],
+                   delivered: Callable) -> Tuple[List[List], Set[int]]:
+    """
+    Передает сообщения в очереди потоков, не дожидаясь места. Возвращает
+    сообщения, для которых места не нашлось (вместе со всеми следующими
+    сообщениями тех же потоков, чтобы не нарушить порядок), и номера
+    заполненных потоков.
+    """
+    full, deferred = set(), []
+    for entry in entries:
+        lane = DELIVERY.lane_for(entry[0])
+        if lane not in full:
+            with STATE_LOCK:
+                IN_FLIGHT.add(id(entry))
+            if DELIVERY.submit(entry[0], (bot, entry), done=delivered,
+                               timeout=0, finished=release_entry):
+                continue
+            release_entry((bot, entry))
+            full.add(lane)
+        deferred.append(entry)
+    return deferred, full
+
+
+def deliver_outbox(bot, state: Dict) -> None:
+    """
+    Отправляет сообщения из очереди state['outbox']: разным чатам
+    параллельно, одному чату — в порядке постановки. Пока очередь потока
+    заполнена, сообщения его чатов ждут, а остальные чаты обслуживаются.
+    После сбоя отправки в чат его остальные сообщения откладываются до
+    следующего цикла, чтобы сохранить порядок. Если время цикла истекло,
+    неотправленные сообщения остаются в очереди до следующего цикла;
+    сообщения, которые еще отправляются, повторно не ставятся и убираются
+    из очереди, как только уйдут.
+    """
+    outbox = state['outbox']
+
+    def delivered(item):
+        with STATE_LOCK:
+            for position, entry in enumerate(outbox):
+                if entry is item[1]:
+                    del outbox[position]
+                    break
+
+    # A chat whose send failed last cycle is retried from its oldest entry.
+    DELIVERY.reset_failures()
+    with STATE_LOCK:
+        pending = [entry for entry in outbox if id(entry) not in IN_FLIGHT]
+    while pending:
+        current = deadline.current()
+        if current and current.expired():
+            break
+        pending, full = submit_entries(bot, pending, delivered)
+        if pending and not DELIVERY.wait_room(
+            full, current.remaining() if current else None
+        ):
+            break
+    current = deadline.current()
+    # Sends are bounded by the deadline, so the lanes drain soon after it.
+    DELIVERY.wait_idle(current.remaining() + SEND_TIMEOUT if current else None)
+    if outbox:
+        logging.warning(
+            f'Время на отправку истекло, {len(outbox)} сообщений '
+            'отложены до следующего цикла.'
+        )
+
+
+def current_config() -> Dict:
+    """Возвращает действующие перезагружаемые настройки."""
+    return {
+        'country': COUNTRY,
+        'params': PARAMS,
+        'retry_period': RETRY_PERIOD,
+        'searches': SEARCHES,
+        'feeds': FEEDS,
+        'template': MESSAGE_TEMPLATE,
+        'locale': MESSAGE_LOCALE,
+    }
+
+
+def apply_config(config: Dict) -> None:
+    """
+    Применяет новую конфигурацию без перезапуска. Состояние бота, кеши и
+    соединения сохраняются; у поисков, которые удалены или стали
+    отправлять другой запрос, сбрасывается статистика квоты, поэтому
+    новые и измененные поиски опрашиваются в ближайшем цикле, а остальные
+    продолжают по прежнему расписанию. Неизвестный шаблон или язык
+    сообщений отклоняет всю конфигурацию.
+    """
+    global COUNTRY, ENDPOINT, PARAMS, RETRY_PERIOD, BACKFILL_AFTER
+    global SEARCHES, FEEDS, MESSAGE_TEMPLATE, MESSAGE_LOCALE
+
+    # Everything that can fail is built before any setting changes.
+    check_template(config['template'], config['locale'])
+    feed_providers(config['feeds'])
+    added, removed, changed = diff_searches(current_config(), config)
+    COUNTRY = config['country']
+    ENDPOINT = ENDPOINT_TEMPLATE.format(country=COUNTRY)
+    PARAMS = config['params']
+    RETRY_PERIOD = config['retry_period']
+    BACKFILL_AFTER = 2 * RETRY_PERIOD
+    SEARCHES = config['searches']
+    FEEDS = config['feeds']
+    MESSAGE_TEMPLATE = config['template']
+    MESSAGE_LOCALE = config['locale']
+    WATCHDOG.stage_limits['sleep'] = RETRY_PERIOD + STALL_GRACE
+    QUOTA.forget(removed + changed)
+    logging.info(
+        f'Конфигурация применена: добавлены поиски {added}, удалены '
+        f'{removed}, изменены {changed}; период опроса {RETRY_PERIOD} с.'
+    )
+
+
+def wait_for_next_cycle() -> None:
+    """
+    Ждет RETRY_PERIOD секунд до следующего цикла, по пути применяя
+    изменения файла конфигурации. Новый период опроса действует сразу.
+    """
+    started = time.monotonic()
+    while True:
+        CONFIG.check()
+        left = started + RETRY_PERIOD - time.monotonic()
+        if left <= 0:
+            return
+        time.sleep(min(left, CONFIG_CHECK_INTERVAL))
+
+
+def handle_cycle_error(bot, error: Exception) -> None:
+    """
+    Логирует сбой цикла и, если нужно, сообщает о нем в Telegram.
+    Повторяющиеся сбои сообщаются сводками, см. AlertAggregator.
+    """
+    message = f'Сбой в работе программы: {error}'
+    if isinstance(error, NotForSendingError):
+        logging.error(message)
+        return
+    logging.error(message, exc_info=error)
+    alert = ALERTS.record(error)
+    if alert:
+        notify(bot, alert)
+
+
+def report_recovery(bot) -> None:
+    """Сообщает в Telegram о восстановлении работы после сбоев."""
+    message = ALERTS.recovered()
+    if message:
+        logging.info(message)
+        notify(bot, message)
+
+
+def persist_state(state: Dict) -> None:
+    """Сохраняет состояние цикла опроса, если задан STATE_FILE."""
+    if not PERSIST_STATE:
+        return
+    try:
+        with STATE_LOCK:
+            save_state(STATE_FILE, state)
+    except (OSError, TypeError, ValueError) as error:
+        logging.error(f'Не удалось сохранить состояние: {error}')
+
+
+def run_once(state_file: str = STATE_FILE) -> int:
+    """
+    Загружает сохраненное состояние, выполняет ровно один цикл, сохраняет
+    состояние и возвращает код завершения процесса. Предназначена для
+    запуска из cron или serverless-функции.
+    """
+    started = time.monotonic()
+    check_tokens()
+    check_message_template()
+    check_exporters()
+    import telegram
+
+    bot = telegram.Bot(token=TELEGRAM_TOKEN)
+    if CONFIG:
+        CONFIG.reload()
+    state = load_state(state_file)
+    QUOTA.bind(state)
+    URL_RESOLVER.bind(state)
+    ALERTS.bind(state)
+    exit_code = 0
+    try:
+        run_backfill(bot, state, background=False)
+        if run_cycle(bot, state):
+            report_recovery(bot)
+        else:
+            exit_code = 1
+    except Exception as error:
+        handle_cycle_error(bot, error)
+        exit_code = 1
+    finally:
+        save_state(state_file, state)
+        # Let archive maintenance started by the cycle finish.
+        with ARCHIVE_MAINTENANCE:
+            pass
+        close_exporters()
+    logging.info(
+        'Однократный запуск завершен за '
+        f'{time.monotonic() - started:.3f} с.'
+    )
+    return exit_code
+
+
+def start_health_checks() -> None:
+    """
+    Запускает поток проверки зависаний и, если задан HEALTH_PORT,
+    HTTP-сервер с эндпоинтами /healthz и /readyz.
+    """
+    from healthcheck import start_health_server
+
+    WATCHDOG.start(WATCHDOG_INTERVAL)
+    if HEALTH_PORT:
+        start_health_server(
+            WATCHDOG, HEALTH_HOST, int(HEALTH_PORT),
+            ready_max_age=2 * RETRY_PERIOD + CYCLE_BUDGET
+        )
+
+
 def main() -> None:
     """Запускает Telegram бот."""
     check_tokens()
+    check_message_template()
+    check_exporters()
+    import telegram
 
     bot = telegram.Bot(token=TELEGRAM_TOKEN)
     message = 'Бот начал работу.'
     logging.info(message)
-    send_message(bot, message)
+    notify(bot, message)
 
-    last_vacancy_id = None
+    if CONFIG:
+        CONFIG.reload()
+        if hasattr(signal, 'SIGHUP'):
+            signal.signal(signal.SIGHUP, CONFIG.request)
+    state = load_state(STATE_FILE) if PERSIST_STATE else {'seen_ids': []}
+    atexit.register(close_exporters)
+    QUOTA.bind(state)
+    URL_RESOLVER.bind(state)
+    ALERTS.bind(state)
+    run_backfill(bot, state)
+    start_health_checks()
+    if WEBHOOK_URL:
+        start_webhook(bot, state)
+    elif BROWSE_MODE:
+        threading.Thread(
+            target=poll_updates, args=(bot,), name='updates', daemon=True
+        ).start()
 
     while True:
         try:
-            response = get_api_answer()
-            check_response(response)
-            vacancies = response['results']
-            new_vacancies_found = False
-
-            for vacancy in vacancies:
-                if last_vacancy_id is None or vacancy['id'] != last_vacancy_id:
-                    send_message(bot, parse_vacancy(vacancy))
-                    new_vacancies_found = True
+            if run_cycle(bot, state):
+                report_recovery(bot)
+        except Exception as error:
+            handle_cycle_error(bot, error)
+        finally:
+            persist_state(state)
+            with WATCHDOG.stage('sleep'):
+                if CONFIG:
+                    wait_for_next_cycle()
                 else:
-                    break
+                    time.sleep(RETRY_PERIOD)
 
-            if new_vacancies_found:
-                last_vacancy_id = vacancies[0]['id']
 
-        except NotForSendingError as error:
-            message = f'Сбой в работе программы: {error}'
-            logging.error(message)
-        except Exception as error:
-            message = f'Сбой в работе программы: {error}'
-            logging.error(message, exc_info=True)
-            send_message(bot, message)
-        finally:
-            time.sleep(RETRY_PERIOD)
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    """Разбирает аргументы командной строки."""
+    parser = argparse.ArgumentParser(
+        description='Telegram бот для поиска вакансий через Adzuna API.'
+    )
+    parser.add_argument(
+        '--once',
+        action='store_true',
+        help='выполнить один цикл с сохранением состояния и завершиться'
+    )
+    parser.add_argument(
+        '--state-file',
+        default=STATE_FILE,
+        help='путь к файлу состояния для режима --once'
+    )
+    parser.add_argument(
+        '--search',
+        metavar='QUERY',
+        help='найти вакансии в архиве ARCHIVE_FILE и завершиться'
+    )
+    return parser.parse_args(argv)
 
 
 if __name__ == '__main__':
+    args = parse_args()
     logging.basicConfig(
         level=logging.INFO,
         format=(
@@ -216,4 +1587,9 @@ if __name__ == '__main__':
             logging.StreamHandler(sys.stdout)
         ]
     )
+    if args.search is not None:
+        print(search_archive(args.search))
+        sys.exit()
+    if args.once:
+        sys.exit(run_once(args.state_file))
     main()
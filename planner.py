@@ -0,0 +1,157 @@
+import logging
+from typing import Callable, Dict, Iterable, List
+
+CONTRACT_TYPES = {'permanent', 'contract'}
+CONTRACT_TIMES = {'full_time', 'part_time'}
+
+# Filters that map one-to-one onto Adzuna query parameters.
+DIRECT_PARAMS = {
+    'what': 'what',
+    'where': 'where',
+    'distance': 'distance',
+    'category': 'category',
+    'salary_min': 'salary_min',
+    'salary_max': 'salary_max',
+    'max_days_old': 'max_days_old',
+    'company': 'company',
+}
+FILTER_KEYS = set(DIRECT_PARAMS) | {
+    'contract_type', 'contract_time', 'exclude', 'exclude_companies',
+}
+
+Predicate = Callable[[Dict], bool]
+
+
+class QueryPlan:
+    """
+    План запроса одного поиска: параметры, которые фильтруют вакансии на
+    стороне Adzuna, и предикаты, которые остается проверить локально.
+    """
+
+    def __init__(self, params: Dict, predicates: List[Predicate],
+                 local_filters: Dict) -> None:
+        self.params = params
+        self.predicates = predicates
+        self.local_filters = local_filters
+
+    def matches(self, vacancy: Dict) -> bool:
+        """Проверяет вакансию по предикатам, не ушедшим на сервер."""
+        return all(predicate(vacancy) for predicate in self.predicates)
+
+    def filter(self, vacancies: Iterable[Dict]) -> List[Dict]:
+        """Оставляет только вакансии, удовлетворяющие локальным фильтрам."""
+        if not self.predicates:
+            return list(vacancies)
+        return [vacancy for vacancy in vacancies if self.matches(vacancy)]
+
+
+def _vacancy_text(vacancy: Dict) -> str:
+    return ' '.join(
+        (vacancy.get('title') or '', vacancy.get('description') or '')
+    ).lower()
+
+
+def _excludes_phrases(phrases: List[str]) -> Predicate:
+    phrases = [phrase.lower() for phrase in phrases]
+
+    def predicate(vacancy: Dict) -> bool:
+        text = _vacancy_text(vacancy)
+        return not any(phrase in text for phrase in phrases)
+
+    return predicate
+
+
+def _excludes_companies(companies: List[str]) -> Predicate:
+    companies = {company.lower() for company in companies}
+
+    def predicate(vacancy: Dict) -> bool:
+        name = (vacancy.get('company') or {}).get('display_name') or ''
+        return name.lower() not in companies
+
+    return predicate
+
+
+def _push_flag(value, allowed: set, name: str, params: Dict) -> None:
+    values = {value} if isinstance(value, str) else set(value)
+    if not values <= allowed:
+        raise ValueError(
+            f'Недопустимое значение фильтра "{name}": {value}. '
+            f'Допустимые значения: {sorted(allowed)}.'
+        )
+    # Asking for every option is the same as not filtering at all.
+    if len(values) == 1:
+        params[values.pop()] = 1
+
+
+def _as_list(value, name: str) -> List[str]:
+    # A single string means one item, not a list of its characters.
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, (list, tuple)) and all(
+        isinstance(item, str) for item in value
+    ):
+        return list(value)
+    raise ValueError(
+        f'Фильтр "{name}" должен быть строкой или списком строк, '
+        f'получено {value!r}.'
+    )
+
+
+def plan_search(filters: Dict, base_params: Dict) -> QueryPlan:
+    """
+    Переводит фильтры поиска в параметры запроса к Adzuna. То, что API не
+    умеет фильтровать само, превращается в локальные предикаты.
+    """
+    unknown = set(filters) - FILTER_KEYS
+    if unknown:
+        raise ValueError(
+            f'Неизвестные фильтры поиска: {sorted(unknown)}. '
+            f'Допустимые фильтры: {sorted(FILTER_KEYS)}.'
+        )
+    params = dict(base_params)
+    predicates = []
+    local_filters = {}
+
+    for key, param in DIRECT_PARAMS.items():
+        if filters.get(key) is not None:
+            params[param] = filters[key]
+    if filters.get('contract_type'):
+        _push_flag(
+            filters['contract_type'], CONTRACT_TYPES, 'contract_type', params
+        )
+    if filters.get('contract_time'):
+        _push_flag(
+            filters['contract_time'], CONTRACT_TIMES, 'contract_time', params
+        )
+
+    # Adzuna's what_exclude takes single space-separated words, so only
+    # phrases of several words have to be checked locally.
+    excluded = _as_list(filters.get('exclude') or [], 'exclude')
+    words = [word for word in excluded if ' ' not in word]
+    phrases = [word for word in excluded if ' ' in word]
+    if words:
+        params['what_exclude'] = ' '.join(words)
+    if phrases:
+        predicates.append(_excludes_phrases(phrases))
+        local_filters['exclude'] = phrases
+    if filters.get('exclude_companies'):
+        companies = _as_list(
+            filters['exclude_companies'], 'exclude_companies'
+        )
+        predicates.append(_excludes_companies(companies))
+        local_filters['exclude_companies'] = companies
+
+    logging.debug(
+        f'План запроса: params = {params}; '
+        f'локальные фильтры = {local_filters}.'
+    )
+    return QueryPlan(params, predicates, local_filters)
+
+
+def plan_searches(searches: Dict[str, Dict],
+                  base_params: Dict) -> Dict[str, QueryPlan]:
+    """Строит планы запросов для всех настроенных поисков."""
+    return {
+        name: plan_search(filters, base_params)
+        for name, filters in searches.items()
+    }
@@ -0,0 +1,331 @@
+import contextvars
+import json
+import logging
+import xml.etree.ElementTree as ElementTree
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, List, Sequence, Tuple
+
+import deadline
+from exceptions import DeadlineExceededError, UnexpectedAPIResponseError
+
+REQUIRED_FIELDS = ('title', 'location', 'company', 'redirect_url')
+CREATED_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+ATOM = '{http://www.w3.org/2005/Atom}'
+DC_CREATOR = '{http://purl.org/dc/elements/1.1/}creator'
+FEED_CONNECT_TIMEOUT = 3.05
+# A source that hits its deadline needs a moment to return what it has.
+POLL_GRACE = 1.0
+
+
+class Provider(ABC):
+    """
+    Источник вакансий. Провайдер загружает записи (fetch), приводит каждую
+    к общему виду (normalize) — словарю в формате выдачи Adzuna: id, title,
+    company.display_name, location.display_name, redirect_url, created и
+    description — и проверяет результат (validate). Записи, не прошедшие
+    проверку, пропускаются.
+    """
+
+    name = 'provider'
+
+    def __init__(self, max_concurrency: int = 1, timeout: float = 20) -> None:
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+
+    @abstractmethod
+    def fetch(self) -> List[Dict]:
+        """Загружает записи о вакансиях в формате источника."""
+
+    def validate(self, record: Dict) -> None:
+        """Проверяет обязательные поля вакансии."""
+        missing = [field for field in REQUIRED_FIELDS if not record.get(field)]
+        if missing:
+            raise UnexpectedAPIResponseError(
+                f'В записи источника {self.name} отсутствуют поля {missing}: '
+                f'record = {record}.'
+            )
+
+    def normalize(self, record: Dict) -> Dict:
+        """Приводит запись к общему виду вакансии."""
+        return record
+
+    def poll(self) -> List[Dict]:
+        """Загружает, проверяет и нормализует вакансии источника."""
+        vacancies = []
+        for record in self.fetch():
+            vacancy = self.normalize(record)
+            try:
+                self.validate(vacancy)
+            except UnexpectedAPIResponseError as error:
+                logging.warning(f'Запись пропущена: {error}')
+                continue
+            vacancies.append(vacancy)
+        logging.debug(
+            f'Источник {self.name}: получено {len(vacancies)} вакансий.'
+        )
+        return vacancies
+
+
+class AdzunaProvider(Provider):
+    """
+    Adzuna: запросы, учет лимита и локальные фильтры выполняет переданная
+    функция fetch, записи уже имеют общий вид.
+    """
+
+    name = 'adzuna'
+
+    def __init__(self, fetch: Callable[[], List[Dict]],
+                 timeout: float = 20) -> None:
+        # Calls share the quota and are coalesced, so they go one by one.
+        super().__init__(max_concurrency=1, timeout=timeout)
+        self._fetch = fetch
+
+    def fetch(self) -> List[Dict]:
+        """Выполняет запросы к Adzuna по всем поискам."""
+        return self._fetch()
+
+
+def _text(element, *tags: str) -> str:
+    for tag in tags:
+        child = element.find(tag)
+        if child is not None and (child.text or '').strip():
+            return child.text.strip()
+    return ''
+
+
+def _created(value: str) -> str:
+    if not value:
+        return ''
+    try:
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except ValueError:
+        try:
+            moment = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return ''
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.astimezone(timezone.utc).strftime(CREATED_FORMAT)
+
+
+def _parse_json_feed(body: str) -> List[Dict]:
+    try:
+        feed = json.loads(body)
+    except ValueError as error:
+        raise UnexpectedAPIResponseError(
+            f'Лента не является корректным JSON: {error}.'
+        ) from error
+    if not isinstance(feed, dict) or not isinstance(feed.get('items'), list):
+        raise UnexpectedAPIResponseError(
+            'В JSON-ленте отсутствует список "items".'
+        )
+    items = []
+    for item in feed['items']:
+        if not isinstance(item, dict):
+            continue
+        # JSON Feed 1.1 has a list of authors, 1.0 a single author.
+        authors = item.get('authors') or [item.get('author') or {}]
+        items.append({
+            'id': item.get('id'),
+            'title': item.get('title'),
+            'url': item.get('url') or item.get('external_url'),
+            'author': ', '.join(
+                author['name'] for author in authors if author.get('name')
+            ) or feed.get('title'),
+            'summary': item.get('summary') or item.get('content_text'),
+            'published': item.get('date_published'),
+            'location': item.get('_location'),
+        })
+    return items
+
+
+def _parse_atom(root) -> List[Dict]:
+    feed_title = _text(root, f'{ATOM}title')
+    items = []
+    for entry in root.iter(f'{ATOM}entry'):
+        link = entry.find(f'{ATOM}link')
+        items.append({
+            'id': _text(entry, f'{ATOM}id'),
+            'title': _text(entry, f'{ATOM}title'),
+            'url': link.get('href') if link is not None else '',
+            'author': _text(entry, f'{ATOM}author/{ATOM}name') or feed_title,
+            'summary': _text(entry, f'{ATOM}summary', f'{ATOM}content'),
+            'published': _text(entry, f'{ATOM}published', f'{ATOM}updated'),
+            'location': '',
+        })
+    return items
+
+
+def _parse_rss(channel) -> List[Dict]:
+    feed_title = _text(channel, 'title')
+    return [
+        {
+            'id': _text(item, 'guid'),
+            'title': _text(item, 'title'),
+            'url': _text(item, 'link'),
+            'author': _text(item, DC_CREATOR, 'author') or feed_title,
+            'summary': _text(item, 'description'),
+            'published': _text(item, 'pubDate'),
+            'location': _text(item, 'location'),
+        }
+        for item in channel.iter('item')
+    ]
+
+
+def parse_feed(body: str) -> List[Dict]:
+    """
+    Разбирает ленту JSON Feed, RSS 2.0 или Atom и возвращает ее элементы
+    в виде словарей с полями id, title, url, author, summary, published и
+    location.
+    """
+    body = body.strip()
+    if body.startswith('{'):
+        return _parse_json_feed(body)
+    try:
+        root = ElementTree.fromstring(body)
+    except ElementTree.ParseError as error:
+        raise UnexpectedAPIResponseError(
+            f'Лента не является корректным XML: {error}.'
+        ) from error
+    if root.tag == f'{ATOM}feed':
+        return _parse_atom(root)
+    channel = root.find('channel')
+    if channel is None:
+        raise UnexpectedAPIResponseError(
+            f'Неизвестный формат ленты: корневой элемент {root.tag}.'
+        )
+    return _parse_rss(channel)
+
+
+class FeedProvider(Provider):
+    """
+    Вакансии из лент RSS, Atom или JSON Feed. Ленты загружаются
+    параллельно, не более max_concurrency одновременно; ошибка одной ленты
+    не мешает остальным.
+    """
+
+    def __init__(self, name: str, urls: Sequence[str],
+                 max_concurrency: int = 4, timeout: float = 20) -> None:
+        super().__init__(max_concurrency, timeout)
+        self.name = name
+        if isinstance(urls, str):
+            urls = [urls]
+        if not isinstance(urls, (list, tuple)) or not urls or not all(
+            isinstance(url, str) and url for url in urls
+        ):
+            raise ValueError(
+                f'Лента {name}: ожидался адрес или список адресов, '
+                f'получено {urls!r}.'
+            )
+        self.urls = list(urls)
+
+    def download(self, url: str) -> str:
+        """Загружает ленту по адресу url."""
+        import requests
+
+        try:
+            response = requests.get(url, timeout=(
+                deadline.timeout(FEED_CONNECT_TIMEOUT),
+                deadline.timeout(self.timeout)
+            ))
+            response.raise_for_status()
+        except requests.RequestException as error:
+            raise ConnectionError(
+                f'Не удалось загрузить ленту {url}: {error}.'
+            ) from error
+        return response.text
+
+    def _fetch_one(self, url: str) -> List[Dict]:
+        try:
+            return parse_feed(self.download(url))
+        except (ConnectionError, UnexpectedAPIResponseError) as error:
+            logging.error(f'Источник {self.name}: {error}')
+            return []
+        except DeadlineExceededError:
+            logging.warning(
+                f'Источник {self.name}: время истекло до загрузки ленты '
+                f'{url}, она перенесена на следующий цикл.'
+            )
+            return []
+
+    def fetch(self) -> List[Dict]:
+        """Загружает и разбирает все ленты источника."""
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_concurrency, len(self.urls)) or 1
+        ) as executor:
+            futures = [
+                executor.submit(
+                    contextvars.copy_context().run, self._fetch_one, url
+                )
+                for url in self.urls
+            ]
+            return [item for future in futures for item in future.result()]
+
+    def normalize(self, record: Dict) -> Dict:
+        """Приводит элемент ленты к общему виду вакансии."""
+        return {
+            'id': f'{self.name}:{record.get("id") or record.get("url")}',
+            'title': record.get('title') or '',
+            'company': {'display_name': record.get('author') or self.name},
+            'location': {'display_name': record.get('location') or '-'},
+            'redirect_url': record.get('url') or '',
+            'created': _created(record.get('published') or ''),
+            'description': record.get('summary') or '',
+        }
+
+
+def _budget(provider: Provider) -> float:
+    budget = provider.timeout
+    if deadline.current() is not None:
+        budget = min(budget, deadline.current().remaining())
+    return budget
+
+
+def _poll(provider: Provider, limit: deadline.Deadline) -> List[Dict]:
+    with limit:
+        return provider.poll()
+
+
+def poll_providers(
+    providers: Sequence[Provider]
+) -> Tuple[Dict[str, List[Dict]], Dict[str, Exception]]:
+    """
+    Опрашивает все источники одновременно, каждый в рамках своего таймаута
+    и активного срока цикла, и возвращает их вакансии и ошибки по именам
+    источников. Источники, не уложившиеся в срок, в результат не попадают,
+    а их срок отменяется, чтобы они не начинали новых запросов. Если
+    ошибкой завершились все источники, выбрасывается первая из них.
+    """
+    limits = [deadline.Deadline(_budget(provider)) for provider in providers]
+    executor = ThreadPoolExecutor(max_workers=len(providers))
+    futures = [
+        executor.submit(
+            contextvars.copy_context().run, _poll, provider, limit
+        )
+        for provider, limit in zip(providers, limits)
+    ]
+    results = {}
+    errors = {}
+    for provider, limit, future in zip(providers, limits, futures):
+        if not wait([future], timeout=limit.remaining() + POLL_GRACE).done:
+            # Every network call takes its timeout from the deadline, so
+            # the straggler stops after the call in flight.
+            limit.cancel()
+            future.cancel()
+            logging.warning(
+                f'Источник {provider.name} не ответил вовремя, его '
+                'вакансии перенесены на следующий цикл.'
+            )
+        elif future.exception() is not None:
+            errors[provider.name] = future.exception()
+        else:
+            results[provider.name] = future.result()
+    executor.shutdown(wait=False)
+    if errors and len(errors) == len(providers):
+        raise next(iter(errors.values()))
+    for name, error in errors.items():
+        logging.error(f'Ошибка при опросе источника {name}: {error}')
+    return results, errors
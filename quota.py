@@ -0,0 +1,241 @@
+import calendar
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional
+
+from exceptions import QuotaExceededError
+
+SECONDS_PER_DAY = 60 * 60 * 24
+# Exponential moving average of new vacancies per call; the prior keeps a
+# search that has been quiet for a while from being starved completely.
+YIELD_SMOOTHING = 0.2
+YIELD_PRIOR = 0.5
+MAX_CREDIT = 2.0
+
+
+class QuotaManager:
+    """
+    Учитывает запросы к Adzuna за день и месяц и распределяет оставшийся
+    бюджет между поисками пропорционально тому, сколько новых вакансий
+    каждый из них приносит. Счетчики хранятся в state['quota'] и
+    сохраняются вместе с остальным состоянием. Дни и месяцы считаются по
+    UTC, как и лимиты Adzuna.
+    """
+
+    def __init__(self, daily_limit: Optional[int] = None,
+                 monthly_limit: Optional[int] = None,
+                 clock=time.time) -> None:
+        self.daily_limit = daily_limit
+        self.monthly_limit = monthly_limit
+        self.clock = clock
+        self.data = {}
+        self._fetched = {}
+        self._lock = threading.RLock()
+
+    def bind(self, state: Dict) -> None:
+        """Переключает учет на счетчики из переданного состояния бота."""
+        with self._lock:
+            self.data = state.setdefault('quota', {})
+            self._fetched = {}
+
+    def _now(self) -> datetime:
+        return datetime.fromtimestamp(self.clock(), timezone.utc)
+
+    def _roll_periods(self) -> None:
+        now = self._now()
+        day, month = now.strftime('%Y-%m-%d'), now.strftime('%Y-%m')
+        if self.data.get('day') != day:
+            self.data['day'], self.data['day_calls'] = day, 0
+        if self.data.get('month') != month:
+            self.data['month'], self.data['month_calls'] = month, 0
+
+    def remaining(self) -> float:
+        """Возвращает число запросов, которые еще можно сделать сегодня."""
+        with self._lock:
+            self._roll_periods()
+            limits = [float('inf')]
+            if self.daily_limit is not None:
+                limits.append(self.daily_limit - self.data['day_calls'])
+            if self.monthly_limit is not None:
+                limits.append(self.monthly_limit - self.data['month_calls'])
+            return max(0, min(limits))
+
+    def record_call(self) -> None:
+        """
+        Учитывает очередной запрос к API. Если лимит исчерпан, выбрасывает
+        QuotaExceededError, и запрос не выполняется.
+        """
+        with self._lock:
+            if self.remaining() <= 0:
+                raise QuotaExceededError(
+                    'Исчерпан лимит запросов к Adzuna: '
+                    f'за день {self.data["day_calls"]}, '
+                    f'за месяц {self.data["month_calls"]}.'
+                )
+            self.data['day_calls'] += 1
+            self.data['month_calls'] += 1
+
+    def _cycle_budget(self, period: float) -> float:
+        now = self._now()
+        midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        day_left = SECONDS_PER_DAY - (now - midnight).total_seconds()
+        month_days = calendar.monthrange(now.year, now.month)[1]
+        month_left = (month_days - now.day) * SECONDS_PER_DAY + day_left
+        budgets = [float('inf')]
+        if self.daily_limit is not None:
+            budgets.append(
+                (self.daily_limit - self.data['day_calls'])
+                / max(1.0, day_left / period)
+            )
+        if self.monthly_limit is not None:
+            budgets.append(
+                (self.monthly_limit - self.data['month_calls'])
+                / max(1.0, month_left / period)
+            )
+        return max(0.0, min(budgets))
+
+    def plan_cycle(self, searches: Iterable[str], period: float) -> List[str]:
+        """
+        Выбирает поиски, которые стоит опросить в этом цикле. Бюджет цикла
+        (остаток лимита, поделенный на оставшиеся до конца дня и месяца
+        циклы) начисляется поискам как кредит пропорционально их
+        полезности; опрашиваются поиски, накопившие целый запрос.
+        """
+        searches = list(searches)
+        with self._lock:
+            self._roll_periods()
+            budget = self._cycle_budget(period)
+            if budget >= len(searches):
+                return searches
+            yields = self.data.setdefault('yield', {})
+            credits = self.data.setdefault('credit', {})
+            weights = {
+                name: yields.get(name, 0.0) + YIELD_PRIOR for name in searches
+            }
+            total = sum(weights.values())
+            planned = []
+            for name in sorted(searches, key=weights.get, reverse=True):
+                share = budget * weights[name] / total
+                # New searches start with a full credit and are polled at once.
+                credit = min(MAX_CREDIT, credits.get(name, 1 - share) + share)
+                if credit >= 1:
+                    credit -= 1
+                    planned.append(name)
+                credits[name] = credit
+        skipped = len(searches) - len(planned)
+        if skipped:
+            logging.info(
+                f'Бюджет цикла {budget:.2f} запроса: пропущено '
+                f'{skipped} из {len(searches)} поисков.'
+            )
+        return planned
+
+    def forget(self, searches: Iterable[str]) -> None:
+        """
+        Сбрасывает полезность и кредит поисков, например удаленных или
+        измененных в конфигурации. Сброшенный поиск опрашивается в
+        ближайшем цикле, как новый.
+        """
+        with self._lock:
+            for name in searches:
+                self.data.get('yield', {}).pop(name, None)
+                self.data.get('credit', {}).pop(name, None)
+
+    def record_fetch(self, search: str, ids: Iterable) -> None:
+        """Запоминает id вакансий, полученных поиском в текущем цикле."""
+        with self._lock:
+            self._fetched[search] = {str(vacancy_id) for vacancy_id in ids}
+
+    def settle(self, new_ids: Iterable) -> None:
+        """
+        Обновляет полезность поисков текущего цикла по тому, сколько новых
+        вакансий принес каждый из них.
+        """
+        new_ids = {str(vacancy_id) for vacancy_id in new_ids}
+        with self._lock:
+            yields = self.data.setdefault('yield', {})
+            for search, ids in self._fetched.items():
+                found = len(ids & new_ids)
+                yields[search] = (
+                    (1 - YIELD_SMOOTHING) * yields.get(search, found)
+                    + YIELD_SMOOTHING * found
+                )
+            self._fetched = {}
+
+    def projection(self) -> Dict:
+        """
+        Оценивает расход лимита: сколько запросов сделано, сколько будет
+        сделано к концу дня и месяца при текущем темпе, и когда закончится
+        дневной или месячный лимит (тот, что раньше), если темп его
+        превышает.
+        """
+        with self._lock:
+            self._roll_periods()
+            now = self._now()
+            midnight = now.replace(hour=0, minute=0, second=0, microsecond=0)
+            # An hour of history at least, so that a couple of calls right
+            # after midnight do not project an absurd rate.
+            day_elapsed = max(3600.0, (now - midnight).total_seconds())
+            month_days = calendar.monthrange(now.year, now.month)[1]
+            month_elapsed = (now.day - 1) * SECONDS_PER_DAY + day_elapsed
+            result = {
+                'day_calls': self.data['day_calls'],
+                'month_calls': self.data['month_calls'],
+                'day_projected': round(
+                    self.data['day_calls'] * SECONDS_PER_DAY / day_elapsed
+                ),
+                'month_projected': round(
+                    self.data['month_calls'] * month_days * SECONDS_PER_DAY
+                    / month_elapsed
+                ),
+                'exhausted_at': None,
+            }
+            # The daily limit usually runs out first, the monthly one may
+            # still end the month early: report whichever comes sooner.
+            exhausted = [
+                moment for moment in (
+                    self._exhaustion(self.daily_limit, 'day_calls',
+                                     result['day_projected'], day_elapsed),
+                    self._exhaustion(self.monthly_limit, 'month_calls',
+                                     result['month_projected'], month_elapsed),
+                ) if moment is not None
+            ]
+            if exhausted:
+                result['exhausted_at'] = datetime.fromtimestamp(
+                    min(exhausted), timezone.utc
+                ).strftime('%Y-%m-%dT%H:%M UTC')
+            return result
+
+    def _exhaustion(self, limit: Optional[int], counter: str,
+                    projected: int, elapsed: float) -> Optional[float]:
+        if limit is None or projected <= limit:
+            return None
+        rate = self.data[counter] / elapsed
+        return self.clock() + max(0, limit - self.data[counter]) / rate
+
+
+def format_quota_report(manager: QuotaManager) -> str:
+    """Формирует отчет о расходе лимита запросов к Adzuna."""
+    projection = manager.projection()
+    lines = [
+        f'Запросов к Adzuna сегодня: {projection["day_calls"]} '
+        f'из {manager.daily_limit or "∞"} '
+        f'(прогноз на день: {projection["day_projected"]}).',
+        f'За месяц: {projection["month_calls"]} '
+        f'из {manager.monthly_limit or "∞"} '
+        f'(прогноз на месяц: {projection["month_projected"]}).',
+    ]
+    if projection['exhausted_at']:
+        lines.append(
+            f'При текущем темпе лимит закончится {projection["exhausted_at"]}.'
+        )
+    yields = manager.data.get('yield', {})
+    if yields:
+        lines.append('Новых вакансий за запрос: ' + ', '.join(
+            f'{name}: {value:.2f}' for name, value in sorted(
+                yields.items(), key=lambda item: item[1], reverse=True
+            )
+        ))
+    return '\n'.join(lines)
@@ -0,0 +1,181 @@
+import logging
+import re
+from itertools import chain
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+import numpy as np
+
+WORD_PATTERN = re.compile(r'\w\w+')
+INITIAL_CAPACITY = 4096
+DEFAULT_MIN_SCORE = 0.05
+
+
+def tokenize(text: str) -> List[str]:
+    """Разбивает текст на слова в нижнем регистре, не короче двух букв."""
+    return WORD_PATTERN.findall(text.lower())
+
+
+def vacancy_text(vacancy: Dict) -> str:
+    """Возвращает текст вакансии, по которому считается релевантность."""
+    return ' '.join((
+        vacancy.get('title') or '', vacancy.get('description') or ''
+    ))
+
+
+class TfidfRanker:
+    """
+    Оценивает релевантность вакансий профилям подписчиков по TF-IDF.
+    Словарь и таблица документных частот пополняются с каждой партией
+    вакансий, так что IDF отражает все вакансии, виденные ботом. Вакансии
+    партии и профили подписчиков — разреженные матрицы весов, оценки
+    считаются их произведением без циклов на Python.
+    """
+
+    def __init__(self) -> None:
+        self.vocabulary = {}
+        self.document_counts = np.zeros(INITIAL_CAPACITY, dtype=np.int64)
+        self.documents = 0
+
+    def _add_terms(self, tokens: Sequence[str]) -> None:
+        vocabulary = self.vocabulary
+        new_terms = [
+            token for token in dict.fromkeys(tokens) if token not in vocabulary
+        ]
+        vocabulary.update(zip(
+            new_terms, range(len(vocabulary), len(vocabulary) + len(new_terms))
+        ))
+        if len(vocabulary) > len(self.document_counts):
+            grown = np.zeros(
+                max(len(vocabulary), 2 * len(self.document_counts)),
+                dtype=np.int64
+            )
+            grown[:len(self.document_counts)] = self.document_counts
+            self.document_counts = grown
+
+    def idf(self) -> np.ndarray:
+        """Возвращает сглаженный IDF для всех слов словаря."""
+        counts = self.document_counts[:len(self.vocabulary)]
+        return np.log((1 + self.documents) / (1 + counts)) + 1
+
+    def _documents(self, texts: Sequence[str], update: bool):
+        """
+        Переводит тексты в разреженные строки (номер строки, номер слова,
+        число вхождений) и при update учитывает их в документных частотах.
+        """
+        token_lists = [tokenize(text) for text in texts]
+        tokens = list(chain.from_iterable(token_lists))
+        self._add_terms(tokens)
+        lengths = np.fromiter(map(len, token_lists), dtype=np.int64,
+                              count=len(token_lists))
+        columns = np.fromiter(map(self.vocabulary.__getitem__, tokens),
+                              dtype=np.int64, count=len(tokens))
+        rows = np.repeat(np.arange(len(texts)), lengths)
+        width = max(len(self.vocabulary), 1)
+        keys, counts = np.unique(rows * width + columns, return_counts=True)
+        rows, columns = keys // width, keys % width
+        if update:
+            np.add.at(self.document_counts, columns, 1)
+            self.documents += len(texts)
+        return rows, columns, counts
+
+    def score(self, vacancies: Sequence[Dict], profiles: Sequence[str]
+              ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Обновляет словарь и IDF вакансиями партии и возвращает ненулевые
+        косинусные оценки вакансий по профилям в виде трех массивов:
+        номера вакансий, номера профилей и оценки.
+        """
+        rows, columns, counts = self._documents(
+            [vacancy_text(vacancy) for vacancy in vacancies], update=True
+        )
+        profile_rows, profile_columns, _ = self._documents(
+            profiles, update=False
+        )
+        idf = self.idf()
+        weights = (1 + np.log(counts)) * idf[columns]
+        weights /= np.sqrt(np.bincount(
+            rows, weights ** 2, minlength=len(vacancies)
+        ))[rows]
+        profile_weights = idf[profile_columns]
+        profile_weights /= np.sqrt(np.bincount(
+            profile_rows, profile_weights ** 2, minlength=len(profiles)
+        ))[profile_rows]
+
+        # Sparse product: every vacancy word is joined with the profiles
+        # containing it, and the products are summed per (vacancy, profile).
+        order = np.argsort(profile_columns, kind='stable')
+        profile_rows = profile_rows[order]
+        profile_columns = profile_columns[order]
+        profile_weights = profile_weights[order]
+        starts = np.searchsorted(profile_columns, columns, side='left')
+        matches = np.searchsorted(profile_columns, columns, side='right')
+        matches -= starts
+        total = int(matches.sum())
+        offsets = (
+            np.arange(total)
+            - np.repeat(np.cumsum(matches) - matches, matches)
+            + np.repeat(starts, matches)
+        )
+        cells = (
+            np.repeat(rows, matches) * len(profiles) + profile_rows[offsets]
+        )
+        products = np.repeat(weights, matches) * profile_weights[offsets]
+        cells, positions = np.unique(cells, return_inverse=True)
+        scores = np.bincount(positions, products, minlength=len(cells))
+        return cells // len(profiles), cells % len(profiles), scores
+
+    def select(self, vacancies: Sequence[Dict], subscribers: Dict[str, Dict],
+               restrict: Optional[Dict[str, Set[int]]] = None
+               ) -> Dict[str, List[int]]:
+        """
+        Отбирает для каждого подписчика номера подходящих вакансий партии:
+        с оценкой не ниже min_score и не больше top_k лучших, от более
+        релевантных к менее. Вакансии без общих с профилем слов не
+        отбираются никогда. Подписчикам из restrict достаются только
+        вакансии с перечисленными там номерами.
+        """
+        if not vacancies or not subscribers:
+            return {chat_id: [] for chat_id in subscribers}
+        chat_ids = list(subscribers)
+        rows, columns, scores = self.score(
+            vacancies,
+            [subscribers[chat_id].get('profile', '') for chat_id in chat_ids]
+        )
+        min_scores = np.array([
+            subscribers[chat_id].get('min_score', DEFAULT_MIN_SCORE)
+            for chat_id in chat_ids
+        ])
+        relevant = scores >= min_scores[columns]
+        if restrict:
+            column_of = {chat_id: column for column, chat_id in
+                         enumerate(chat_ids)}
+            restricted = np.zeros(len(chat_ids), dtype=bool)
+            restricted[[column_of[chat_id] for chat_id in restrict]] = True
+            allowed = np.fromiter(
+                (
+                    index * len(chat_ids) + column_of[chat_id]
+                    for chat_id, indices in restrict.items()
+                    for index in indices
+                ),
+                dtype=np.int64
+            )
+            relevant &= ~restricted[columns] | np.isin(
+                rows * len(chat_ids) + columns, allowed
+            )
+        rows, columns, scores = (
+            rows[relevant], columns[relevant], scores[relevant]
+        )
+        order = np.lexsort((-scores, columns))
+        rows, columns = rows[order], columns[order]
+        bounds = np.searchsorted(columns, np.arange(len(chat_ids) + 1))
+        selected = {}
+        for column, chat_id in enumerate(chat_ids):
+            top_k: Optional[int] = subscribers[chat_id].get('top_k')
+            chosen = rows[bounds[column]:bounds[column + 1]]
+            selected[chat_id] = chosen[:top_k].tolist()
+        logging.debug(
+            f'Ранжирование: {len(vacancies)} вакансий, '
+            f'{len(chat_ids)} подписчиков, отобрано '
+            f'{sum(map(len, selected.values()))}.'
+        )
+        return selected
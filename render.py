@@ -0,0 +1,147 @@
+import html
+import re
+import threading
+from collections import OrderedDict
+from string import Template
+from typing import Callable, Dict, Tuple
+
+CACHE_CAPACITY = 1024
+
+# Telegram parse_mode for every template.
+PARSE_MODES = {'plain': None, 'markdown': 'MarkdownV2', 'html': 'HTML'}
+# Message layouts: $name is a locale phrase, filled in once when the
+# template is compiled; {name} is a vacancy field, filled in per vacancy.
+LAYOUTS = {
+    'plain': '{title} $in {location}, $company {company}. $link: {url}',
+    'markdown': (
+        '*{title}* $in {location}, $company {company}\\. [$link]({url})'
+    ),
+    'html': (
+        '<b>{title}</b> $in {location}, $company {company}. '
+        '<a href="{url}">$link</a>'
+    ),
+}
+PHRASES = {
+    'en': {'in': 'in', 'company': 'for company:', 'link': 'Link'},
+    'ru': {'in': '—', 'company': 'компания:', 'link': 'Ссылка'},
+}
+
+MARKDOWN_SPECIAL = re.compile(r'([_*\[\]()~`>#+\-=|{}.!\\])')
+MARKDOWN_URL_SPECIAL = re.compile(r'([)\\])')
+
+
+def escape_markdown(text: str) -> str:
+    """Экранирует спецсимволы MarkdownV2 в тексте сообщения."""
+    return MARKDOWN_SPECIAL.sub(r'\\\1', text)
+
+
+def _escape_markdown_url(url: str) -> str:
+    return MARKDOWN_URL_SPECIAL.sub(r'\\\1', url)
+
+
+def _keep(text: str) -> str:
+    return text
+
+
+# Escapers for the text fields and for the link of every template.
+ESCAPERS = {
+    'plain': (_keep, _keep),
+    'markdown': (escape_markdown, _escape_markdown_url),
+    'html': (html.escape, html.escape),
+}
+
+
+def compile_template(template: str, locale: str) -> Callable[..., str]:
+    """
+    Подставляет в макет шаблона фразы языка locale и возвращает функцию,
+    которая формирует сообщение по полям вакансии.
+    """
+    escape = ESCAPERS[template][0]
+    phrases = {
+        name: escape(text).replace('{', '{{').replace('}', '}}')
+        for name, text in PHRASES[locale].items()
+    }
+    return Template(LAYOUTS[template]).substitute(phrases).format
+
+
+def check_template(template: str, locale: str) -> None:
+    """Выбрасывает ValueError, если шаблон или язык неизвестны."""
+    if template not in LAYOUTS or locale not in PHRASES:
+        raise ValueError(
+            f'Неизвестный шаблон {template!r} или язык {locale!r}. '
+            f'Доступны шаблоны {sorted(LAYOUTS)} и языки '
+            f'{sorted(PHRASES)}.'
+        )
+
+
+class MessageRenderer:
+    """
+    Формирует сообщения о вакансиях по заранее скомпилированным шаблонам
+    (plain, markdown, html) с экранированием полей. Готовые сообщения
+    кешируются по ключу (id вакансии, шаблон, язык), так что вакансия,
+    отправляемая во многие чаты, форматируется один раз. При переполнении
+    вытесняются давно не использованные сообщения.
+    """
+
+    def __init__(self, capacity: int = CACHE_CAPACITY) -> None:
+        self.capacity = capacity
+        self.hits = 0
+        self.misses = 0
+        self._formats = {
+            (template, locale): compile_template(template, locale)
+            for template in LAYOUTS for locale in PHRASES
+        }
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+
+    def render(self, vacancy: Dict, template: str = 'plain',
+               locale: str = 'en') -> str:
+        """
+        Возвращает сообщение о вакансии в заданном шаблоне и на заданном
+        языке. Для неизвестного шаблона или языка выбрасывает ValueError.
+        """
+        fields = (
+            str(vacancy['title']),
+            str(vacancy['location']['display_name']),
+            str(vacancy['company']['display_name']),
+            str(vacancy['redirect_url']),
+        )
+        key = (vacancy.get('id'), template, locale)
+        if key[0] is not None:
+            with self._lock:
+                cached = self._cache.get(key)
+                # The fields are compared too: a vacancy may come back with
+                # another link, e.g. the resolved canonical one.
+                if cached is not None and cached[0] == fields:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return cached[1]
+        message = self._format(fields, template, locale)
+        with self._lock:
+            self.misses += 1
+            if key[0] is not None:
+                self._cache[key] = (fields, message)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.capacity:
+                    self._cache.popitem(last=False)
+        return message
+
+    def _format(self, fields: Tuple[str, ...], template: str,
+                locale: str) -> str:
+        check_template(template, locale)
+        format_message = self._formats[(template, locale)]
+        escape, escape_url = ESCAPERS[template]
+        title, location, company, url = fields
+        return format_message(
+            title=escape(title), location=escape(location),
+            company=escape(company), url=escape_url(url)
+        )
+
+    def stats(self) -> Dict:
+        """Возвращает размер кеша и число попаданий и промахов."""
+        with self._lock:
+            return {
+                'size': len(self._cache),
+                'hits': self.hits,
+                'misses': self.misses,
+            }
@@ -0,0 +1,93 @@
+import json
+import logging
+import os
+import tempfile
+from typing import Dict, Iterable, Iterator
+
+SEEN_IDS_LIMIT = 1000
+
+
+def load_state(path: str) -> Dict:
+    """
+    Загружает сохраненное состояние бота из JSON-файла. При отсутствии файла
+    возвращает пустое состояние.
+    """
+    try:
+        with open(path, encoding='utf-8') as file:
+            state = json.load(file)
+    except FileNotFoundError:
+        logging.info(f'Файл состояния {path} не найден, начинаем с нуля.')
+        return {'seen_ids': []}
+    except (OSError, ValueError) as error:
+        logging.error(
+            f'Не удалось прочитать файл состояния {path}: {error}. '
+            'Начинаем с нуля.'
+        )
+        return {'seen_ids': []}
+    if not isinstance(state, dict):
+        logging.error(
+            f'Файл состояния {path} поврежден: ожидался словарь, '
+            f'получен {type(state)}. Начинаем с нуля.'
+        )
+        return {'seen_ids': []}
+    state.setdefault('seen_ids', [])
+    return state
+
+
+def save_state(path: str, state: Dict) -> None:
+    """
+    Атомарно сохраняет состояние бота в JSON-файл: данные пишутся во
+    временный файл, который затем подменяет основной.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    descriptor, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix='.state-', suffix='.tmp'
+    )
+    try:
+        with os.fdopen(descriptor, 'w', encoding='utf-8') as file:
+            json.dump(state, file, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    logging.debug(f'Состояние сохранено в {path}.')
+
+
+def new_vacancies(state: Dict, vacancies: Iterable[Dict]) -> Iterator[Dict]:
+    """
+    Отдает вакансии, которые еще не отправлялись, без повторов внутри
+    пачки. Вакансии с каноническим адресом (canonical_url) дополнительно
+    сравниваются по нему: так отсеиваются одни и те же вакансии с разных
+    агрегаторов. Состояние не меняется: вакансии запоминаются вызовом
+    mark_seen, когда сообщения о них поставлены в очередь отправки.
+    """
+    known = set(state.get('seen_ids', []))
+    known_urls = set(state.get('seen_urls', []))
+    for vacancy in vacancies:
+        vacancy_id = str(vacancy.get('id'))
+        canonical_url = vacancy.get('canonical_url')
+        if vacancy_id in known or canonical_url in known_urls:
+            continue
+        known.add(vacancy_id)
+        if canonical_url:
+            known_urls.add(canonical_url)
+        yield vacancy
+
+
+def mark_seen(state: Dict, vacancies: Iterable[Dict]) -> None:
+    """
+    Запоминает идентификаторы и канонические адреса вакансий. Хранится не
+    более SEEN_IDS_LIMIT последних id, а также дата публикации самой
+    свежей из них (last_created).
+    """
+    seen_ids = state.setdefault('seen_ids', [])
+    for vacancy in vacancies:
+        seen_ids.append(str(vacancy.get('id')))
+        if vacancy.get('canonical_url'):
+            state.setdefault('seen_urls', []).append(vacancy['canonical_url'])
+        created = vacancy.get('created')
+        if created and created > state.get('last_created', ''):
+            state['last_created'] = created
+    del seen_ids[:-SEEN_IDS_LIMIT]
+    if 'seen_urls' in state:
+        del state['seen_urls'][:-SEEN_IDS_LIMIT]
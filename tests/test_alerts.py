@@ -0,0 +1,92 @@
+import alerts
+import utils
+
+
+class TestFingerprint:
+
+    def test_volatile_parts_ignored(self):
+        first = ConnectionError(
+            "HTTPSConnectionPool(host='api.adzuna.com', port=443): Read timed "
+            "out. (read timeout=19.87) /search/1?app_id=1&what=python"
+        )
+        second = ConnectionError(
+            "HTTPSConnectionPool(host='api.adzuna.com', port=443): Read timed "
+            "out. (read timeout=4.2) /search/1?app_id=1&what=django"
+        )
+        assert alerts.fingerprint(first) == alerts.fingerprint(second)
+        assert alerts.fingerprint(first) != alerts.fingerprint(
+            ValueError(str(first))
+        ), 'Убедитесь, что отпечаток учитывает тип исключения.'
+
+
+class TestAlertAggregator:
+
+    def test_repeats_suppressed_and_summarized(self):
+        clock = utils.FakeClock(1_700_000_000.0)
+        aggregator = alerts.AlertAggregator(window=600, clock=clock)
+        assert aggregator.record(ValueError('Код ответа 500')) == (
+            'Сбой в работе программы: Код ответа 500'
+        )
+        for code in (502, 503):
+            clock.now += 60
+            assert aggregator.record(ValueError(f'Код ответа {code}')) is None
+        clock.now += 600
+        summary = aggregator.record(ValueError('Код ответа 504'))
+        assert summary.startswith(
+            'Сбой в работе программы повторяется: Код ответа 504'
+        )
+        assert '4 раз, с прошлого уведомления — 3.' in summary, (
+            'Убедитесь, что сводка содержит число повторов сбоя.'
+        )
+
+    def test_budget_and_recovery(self):
+        clock = utils.FakeClock(1_700_000_000.0)
+        aggregator = alerts.AlertAggregator(
+            budget=2, budget_period=3600, clock=clock
+        )
+        sent = [aggregator.record(KeyError(name)) for name in 'abc']
+        assert sent[:2] != [None, None] and sent[2] is None, (
+            'Убедитесь, что число уведомлений ограничено своим лимитом.'
+        )
+        recovery = aggregator.recovered()
+        assert recovery.startswith('Работа восстановлена.')
+        assert "KeyError: 'c' — 1 раз" in recovery
+        assert aggregator.recovered() is None
+        clock.now += 3600
+        assert aggregator.record(KeyError('a')) is not None
+
+    def test_state_survives_restart(self):
+        clock = utils.FakeClock(1_700_000_000.0)
+        state = {}
+        aggregator = alerts.AlertAggregator(clock=clock)
+        aggregator.bind(state)
+        assert aggregator.record(RuntimeError('boom')) is not None
+        restarted = alerts.AlertAggregator(clock=clock)
+        restarted.bind(state)
+        assert restarted.record(RuntimeError('boom')) is None
+        assert state['alerts']['incidents']['RuntimeError: boom'][
+            'count'
+        ] == 2
+
+
+class TestAlertsIntegration:
+
+    def test_persistent_failure_alerted_once(self, monkeypatch,
+                                             homework_module):
+        monkeypatch.setattr(
+            homework_module, 'ALERTS', alerts.AlertAggregator()
+        )
+        sent = []
+        monkeypatch.setattr(
+            homework_module, 'send_message',
+            lambda bot, message: sent.append(message)
+        )
+        bot = utils.MockTelegramBot()
+        for _ in range(3):
+            homework_module.handle_cycle_error(bot, RuntimeError('down'))
+        assert sent == ['Сбой в работе программы: down'], (
+            'Убедитесь, что повторяющийся сбой не отправляется каждый цикл.'
+        )
+        homework_module.report_recovery(bot)
+        homework_module.report_recovery(bot)
+        assert len(sent) == 2 and sent[1].startswith('Работа восстановлена.')
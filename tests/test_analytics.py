@@ -0,0 +1,159 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import analytics  # noqa: E402
+import archive  # noqa: E402
+import utils  # noqa: E402
+
+DAY = 60 * 60 * 24
+START = 1760000000
+
+
+def make_rows(count, start_rowid=1):
+    rng = np.random.default_rng(start_rowid)
+    return [
+        (
+            start_rowid + i,
+            ('Python developer', 'Django engineer', 'Java developer')[i % 3],
+            ('CDMX', 'Monterrey')[i % 2],
+            float(rng.uniform(10000, 50000)) if i % 5 else None,
+            None,
+            START + i * DAY / 10,
+        )
+        for i in range(count)
+    ]
+
+
+class TestAnalytics:
+
+    def test_percentiles_close_to_exact(self, tmp_path):
+        rows = make_rows(5000)
+        store = analytics.AnalyticsStore(
+            str(tmp_path), ['python', 'django', 'java']
+        )
+        store.append(rows)
+        stats = store.salary_percentiles('location')
+        salaries = np.array([
+            row[3] for row in rows if row[3] and row[2] == 'CDMX'
+        ])
+        expected = np.percentile(salaries, analytics.PERCENTILES)
+        actual = [stats['CDMX'][f'p{p}'] for p in analytics.PERCENTILES]
+        assert stats['CDMX']['count'] == len(salaries)
+        assert np.allclose(actual, expected, rtol=0.03), (
+            'Убедитесь, что перцентили по гистограмме близки к точным.'
+        )
+        by_keyword = store.salary_percentiles('keyword')
+        assert sum(item['count'] for item in by_keyword.values()) == 4000
+
+    def test_incremental_updates_match_full_load(self, tmp_path):
+        rows = make_rows(3000)
+        full = analytics.AnalyticsStore(str(tmp_path / 'full'), ['python'])
+        full.append(rows)
+        incremental = analytics.AnalyticsStore(
+            str(tmp_path / 'incremental'), ['python']
+        )
+        for start in range(0, len(rows), 700):
+            incremental.append(rows[start:start + 700])
+        assert np.array_equal(
+            full.location_histogram, incremental.location_histogram
+        )
+        assert np.array_equal(full.daily_counts, incremental.daily_counts)
+        assert full.rolling_counts() == incremental.rolling_counts()
+
+    def test_rolling_counts(self, tmp_path):
+        store = analytics.AnalyticsStore(str(tmp_path), [])
+        store.append(make_rows(300))
+        now = START + 29 * DAY
+        current, previous = store.rolling_counts(7, now)['CDMX']
+        assert (current, previous) == (35, 35), (
+            'Убедитесь, что публикации считаются за последние `window` '
+            'дней и за предыдущий такой же период.'
+        )
+
+    def test_sync_persists_and_resumes(self, tmp_path):
+        storage = archive.VacancyArchive(str(tmp_path / 'archive.db'))
+        storage.add_many([
+            {'id': i, 'title': 'Python developer',
+             'location': {'display_name': 'CDMX'}, 'salary_min': 20000,
+             'created': '2026-10-19T10:00:00Z'}
+            for i in range(25)
+        ])
+        directory = str(tmp_path / 'analytics')
+        store = analytics.AnalyticsStore(directory, ['python'])
+        assert store.sync(storage, batch=10) == 25
+        storage.add_many([{'id': 'new', 'title': 'Python developer'}])
+
+        reopened = analytics.AnalyticsStore(directory, ['python'])
+        assert reopened.rows == 25
+        assert reopened.sync(storage) == 1, (
+            'Убедитесь, что при синхронизации загружаются только новые '
+            'строки архива.'
+        )
+        assert reopened.rows == 26
+        assert analytics.AnalyticsStore(directory, ['rust']).rows == 0
+
+    def test_report(self, tmp_path):
+        store = analytics.AnalyticsStore(str(tmp_path), ['python', 'java'])
+        assert analytics.format_report(store)
+        store.append(make_rows(1000))
+        report = analytics.format_report(store)
+        assert 'CDMX' in report and 'python' in report
+
+
+class TestAnalyticsIntegration:
+
+    def test_one_store_per_directory(self, monkeypatch, tmp_path,
+                                     homework_module):
+        monkeypatch.setattr(homework_module, 'ANALYTICS', None)
+        storage = archive.VacancyArchive(str(tmp_path / 'archive.db'))
+        storage.add_many([
+            utils.make_vacancy(i, 'Python developer', location='CDMX',
+                               salary_min=20000,
+                               created='2026-10-19T10:00:00Z')
+            for i in range(3)
+        ])
+        directory = str(tmp_path / 'analytics')
+        first = homework_module.get_analytics(directory, ('python',))
+        first.sync(storage)
+        assert homework_module.get_analytics(directory, ('python',)) is first
+        second = homework_module.get_analytics(directory, ('rust',))
+        second.sync(storage)
+        third = homework_module.get_analytics(directory, ('python',))
+        assert third is not first, (
+            'Убедитесь, что при смене ключевых слов прежнее хранилище не '
+            'возвращается из кеша.'
+        )
+        assert third.rows == 0
+        third.sync(storage)
+        assert third.salary_percentiles('keyword')['python']['count'] == 3
+
+    def test_rebuild_after_maintenance(self, monkeypatch, tmp_path,
+                                       homework_module):
+        storage = archive.VacancyArchive(str(tmp_path / 'archive.db'))
+        storage.add_many([
+            utils.make_vacancy(1, 'Python developer', location='CDMX',
+                               salary_min=20000,
+                               created='2020-01-01T10:00:00Z'),
+            utils.make_vacancy(2, 'Python developer', location='CDMX',
+                               salary_min=40000,
+                               created='2026-10-19T10:00:00Z'),
+        ])
+        store = analytics.AnalyticsStore(str(tmp_path / 'analytics'),
+                                         ['python'])
+        monkeypatch.setattr(homework_module, 'get_archive',
+                            lambda path: storage)
+        monkeypatch.setattr(homework_module, 'get_analytics',
+                            lambda directory, keywords: store)
+        monkeypatch.setattr(homework_module, 'schedule_due',
+                            lambda *args: False)
+        homework_module.update_analytics(None, {})
+        assert store.salary_percentiles('keyword')['python']['count'] == 2
+        storage.apply_retention(365)
+        storage.set_meta('maintained', 1.0)
+        homework_module.update_analytics(None, {})
+        assert store.rows == 1
+        assert store.salary_percentiles('keyword')['python']['count'] == 1, (
+            'Убедитесь, что после обслуживания архива аналитика '
+            'пересчитывается и не учитывает удаленные вакансии.'
+        )
@@ -0,0 +1,119 @@
+from functools import partial
+
+import archive
+import utils
+
+make_vacancy = partial(utils.make_vacancy, created='2026-10-19T10:00:00Z')
+
+
+class TestArchive:
+
+    def test_add_and_search(self, tmp_path):
+        storage = archive.VacancyArchive(str(tmp_path / 'archive.db'))
+        added = storage.add_many([
+            make_vacancy(1, 'Python Engineer', description='Django, REST'),
+            make_vacancy(2, 'Rust Engineer', company='Ferris Ltd'),
+            make_vacancy(3, 'Data Scientist', description='python, pandas'),
+        ])
+        assert added == 3
+        ids = [result['id'] for result in storage.search('python')]
+        assert ids == ['3', '1'], (
+            'Убедитесь, что поиск идет по названию и описанию, а новые '
+            'вакансии возвращаются первыми.'
+        )
+        assert [result['id'] for result in storage.search('ferris')] == ['2']
+        assert [result['id'] for result in storage.search('engin*')] == [
+            '2', '1'
+        ]
+        assert storage.search('"; DROP TABLE vacancies; --') == []
+        assert storage.count() == 3
+
+    def test_upsert_keeps_index_consistent(self, tmp_path):
+        storage = archive.VacancyArchive(str(tmp_path / 'archive.db'))
+        storage.add_many([make_vacancy(1, 'Python Engineer')])
+        storage.add_many([make_vacancy(1, 'Golang Engineer')])
+        assert storage.count() == 1
+        assert storage.search('python') == [], (
+            'Убедитесь, что при обновлении вакансии обновляется и '
+            'полнотекстовый индекс.'
+        )
+        assert len(storage.search('golang')) == 1
+
+    def test_upsert_updates_salary(self, tmp_path):
+        storage = archive.VacancyArchive(str(tmp_path / 'archive.db'))
+        storage.add_many([make_vacancy(1, 'Python Engineer')])
+        storage.add_many([dict(make_vacancy(1, 'Python Engineer'),
+                               salary_min=50000, salary_max=60000)])
+        assert storage.rows_after(0)[0]['salary_max'] == 60000, (
+            'Убедитесь, что изменение зарплаты сохраняется в архиве.'
+        )
+
+    def test_batches(self, monkeypatch, tmp_path):
+        monkeypatch.setattr(archive, 'BATCH_SIZE', 7)
+        storage = archive.VacancyArchive(str(tmp_path / 'archive.db'))
+        vacancies = (make_vacancy(i, f'Job {i}') for i in range(50))
+        assert storage.add_many(vacancies) == 50
+        assert storage.count() == 50
+
+    def test_retention_and_compaction(self, tmp_path):
+        storage = archive.VacancyArchive(str(tmp_path / 'archive.db'))
+        storage.add_many([
+            make_vacancy(1, 'Old Python', created='2020-01-01T00:00:00Z'),
+            make_vacancy(2, 'New Python', created='2026-10-19T00:00:00Z'),
+        ])
+        now = archive.parse_created('2026-10-20T00:00:00Z')
+        assert storage.apply_retention(30, now=now) == 1
+        storage.compact()
+        assert [result['id'] for result in storage.search('python')] == ['2']
+        assert storage.get_meta('maintained') is None
+        storage.set_meta('maintained', now)
+        assert storage.get_meta('maintained') == now
+
+
+class TestArchiveIntegration:
+
+    def test_fetched_vacancies_archived(self, monkeypatch, tmp_path,
+                                        homework_module):
+        path = str(tmp_path / 'archive.db')
+        monkeypatch.setattr(homework_module, 'ARCHIVE_FILE', path)
+        monkeypatch.setattr(homework_module, 'SEARCHES', {
+            'default': {'exclude_companies': ['Hidden']}
+        })
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer',
+            lambda params=None: {'results': [
+                make_vacancy(1, 'Python Engineer'),
+                make_vacancy(2, 'Python Lead', company='Hidden'),
+            ]}
+        )
+        vacancies = homework_module.fetch_vacancies()
+        assert len(vacancies) == 1
+        assert homework_module.get_archive(path).count() == 2, (
+            'Убедитесь, что в архив попадают все полученные вакансии.'
+        )
+        reply = homework_module.COMMANDS['search']('lead')
+        assert 'Python Lead' in reply
+
+    def test_search_command_without_archive(self, monkeypatch,
+                                            homework_module):
+        monkeypatch.setattr(homework_module, 'ARCHIVE_FILE', None)
+        assert homework_module.search_archive('python')
+
+    def test_maintenance_runs_in_background(self, monkeypatch, tmp_path,
+                                            homework_module):
+        path = str(tmp_path / 'archive.db')
+        monkeypatch.setattr(homework_module, 'ARCHIVE_FILE', path)
+        storage = homework_module.get_archive(path)
+        storage.add_many([
+            make_vacancy(1, 'Old Python', created='2020-01-01T00:00:00Z')
+        ])
+        homework_module.maintain_archive()
+        assert storage.count() == 1, (
+            'Убедитесь, что новый архив не обслуживается сразу после '
+            'запуска.'
+        )
+        storage.set_meta('maintained', 0)
+        homework_module.maintain_archive()
+        with homework_module.ARCHIVE_MAINTENANCE:
+            assert storage.count() == 0
+        assert storage.get_meta('maintained') > 0
@@ -0,0 +1,134 @@
+import calendar
+import threading
+import time
+
+import pytest
+
+import backfill
+import utils
+
+
+def created_at(hour):
+    return f'2026-10-19T{hour:02d}:00:00Z'
+
+
+class TestBackfill:
+
+    def test_window_days(self):
+        since = calendar.timegm((2026, 10, 19, 0, 0, 0))
+        day = backfill.SECONDS_PER_DAY
+        assert backfill.window_days(created_at(0), since + 3600) == 1
+        assert backfill.window_days(created_at(0), since + 1.5 * day) == 2
+
+    def test_fetch_pages_in_parallel(self):
+        started = []
+        barrier = threading.Barrier(3, timeout=1)
+
+        def fetch_page(page):
+            started.append(page)
+            if page > 1:
+                barrier.wait()
+            return {
+                'count': 95,
+                'results': [
+                    utils.make_vacancy(f'{page}-{i}', created='')
+                    for i in range(2)
+                ]
+            }
+
+        results = backfill.fetch_pages(
+            fetch_page, page_size=10, max_pages=4, workers=3
+        )
+        assert sorted(started) == [1, 2, 3, 4], (
+            'Убедитесь, что загружается не больше `max_pages` страниц.'
+        )
+        assert len(results) == 8
+
+    def test_chronological(self):
+        vacancies = [
+            utils.make_vacancy(3, created=created_at(12)),
+            utils.make_vacancy(1, created=created_at(8)),
+            utils.make_vacancy(2, created=created_at(10)),
+            utils.make_vacancy(2, created=created_at(10)),
+        ]
+        ordered = backfill.chronological(vacancies, since=created_at(8))
+        assert [vacancy['id'] for vacancy in ordered] == [2, 3], (
+            'Убедитесь, что догруженные вакансии идут от старых к новым, '
+            'без повторов и только после последней известной.'
+        )
+
+
+class TestBackfillIntegration:
+
+    def test_once_mode_queues_missed_vacancies(self, monkeypatch,
+                                               homework_module):
+        pages = {
+            1: [utils.make_vacancy(5, created=created_at(12)),
+                utils.make_vacancy(4, created=created_at(11))],
+            2: [utils.make_vacancy(3, created=created_at(10)),
+                utils.make_vacancy(2, created=created_at(9))],
+        }
+        requested = []
+
+        def mock_get_api_answer(params=None, page=1):
+            requested.append((page, params['max_days_old']))
+            return {'count': 4, 'results': pages[page]}
+
+        monkeypatch.setattr(homework_module, 'BACKFILL_PAGE_SIZE', 2)
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer', mock_get_api_answer
+        )
+        state = {
+            'seen_ids': ['2'],
+            'last_created': created_at(9),
+            'last_poll': time.time() - 10 * homework_module.RETRY_PERIOD,
+        }
+        homework_module.run_backfill(None, state, background=False)
+        assert sorted(requested)[0][0] == 1 and len(requested) == 2
+        titles = [message.split(' in ')[0] for _, message in state['outbox']]
+        assert titles == ['Job 3', 'Job 4', 'Job 5']
+        assert state['last_created'] == created_at(12)
+
+    def test_background_backfill_goes_through_outbox(self, monkeypatch,
+                                                     homework_module):
+        pytest.importorskip('numpy')
+        monkeypatch.setattr(homework_module, 'SUBSCRIBERS', {
+            '777': {'profile': 'job'}
+        })
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer',
+            lambda params=None, page=1: {
+                'count': 1,
+                'results': [utils.make_vacancy(3, created=created_at(10))]
+            }
+        )
+        sent = []
+        monkeypatch.setattr(homework_module, 'send_message',
+                            lambda *args: sent.append(args))
+        state = {
+            'seen_ids': [],
+            'last_created': created_at(9),
+            'last_poll': time.time() - 10 * homework_module.RETRY_PERIOD,
+        }
+        homework_module.run_backfill(None, state)
+        for thread in threading.enumerate():
+            if thread.name == 'backfill':
+                thread.join(1)
+        assert sent == [], (
+            'Убедитесь, что догруженные вакансии отправляются через общую '
+            'очередь отправки, а не напрямую.'
+        )
+        assert [entry[0] for entry in state['outbox']] == ['777']
+        assert state['seen_ids'] == ['3']
+
+    def test_no_backfill_without_downtime(self, monkeypatch,
+                                          homework_module):
+        def fail(*args, **kwargs):
+            raise AssertionError(
+                'Убедитесь, что догрузка не запускается без простоя.'
+            )
+
+        monkeypatch.setattr(homework_module, 'get_api_answer', fail)
+        state = {'last_created': created_at(9), 'last_poll': time.time()}
+        homework_module.run_backfill(None, state, background=False)
+        assert 'outbox' not in state
@@ -0,0 +1,148 @@
+from types import SimpleNamespace
+
+import pytest
+import telegram
+
+import browse
+import quota
+import utils
+
+
+VACANCIES = [
+    utils.make_vacancy(i, f'Job {i}', f'About Job {i}',
+                       salary_min=40000, salary_max=50000)
+    for i in range(3)
+]
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+        self.edited = []
+        self.answered = []
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append((chat_id, text, kwargs.get('reply_markup')))
+
+    def edit_message_text(self, text, chat_id=None, message_id=None,
+                          reply_markup=None, **kwargs):
+        self.edited.append((chat_id, message_id, text, reply_markup))
+
+    def answer_callback_query(self, callback_query_id, text=None, **kwargs):
+        self.answered.append((callback_query_id, text))
+
+
+def press(chat_id, data):
+    return SimpleNamespace(
+        id='q1', data=data,
+        message=SimpleNamespace(chat_id=chat_id, message_id=7),
+    )
+
+
+class TestResultBrowser:
+
+    def test_pages_and_details(self):
+        browser = browse.ResultBrowser()
+        text, keyboard = browser.publish('1', 100, VACANCIES)
+        assert text.startswith('1/3. Job 0')
+        assert '40 000 – 50 000' in text
+        assert keyboard == [[('Подробнее', '100:d:0'), ('▶', '100:p:1')]]
+        text, keyboard = browser.handle(1, '100:p:2')
+        assert text.startswith('3/3. Job 2')
+        assert keyboard == [[('◀', '100:p:1'), ('Подробнее', '100:d:2')]]
+        text, keyboard = browser.handle('1', '100:d:1')
+        assert 'About Job 1' in text and 'adzuna.co.uk/1' in text
+        assert ('Кратко', '100:p:1') in keyboard[0]
+
+    def test_lru_eviction(self):
+        browser = browse.ResultBrowser(capacity=2)
+        browser.publish('1', 1, VACANCIES)
+        browser.publish('2', 1, VACANCIES)
+        assert browser.handle('1', '1:p:1') is not None
+        browser.publish('3', 1, VACANCIES)
+        assert browser.handle('2', '1:p:1') is None, (
+            'Убедитесь, что при переполнении вытесняется подборка, которую '
+            'дольше всего не просматривали.'
+        )
+        assert browser.handle('1', '1:p:1') is not None
+        assert browser.handle('1', 'garbage') is None
+        assert browser.handle('1', '1:p:99') is None
+
+
+class TestBrowseIntegration:
+
+    def test_cycle_sends_one_message_and_edits_it(self, monkeypatch,
+                                                  homework_module):
+        monkeypatch.setattr(homework_module, 'QUOTA', quota.QuotaManager())
+        monkeypatch.setattr(homework_module, 'BROWSE_MODE', True)
+        monkeypatch.setattr(
+            homework_module, 'BROWSER', browse.ResultBrowser()
+        )
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer',
+            lambda params=None: {'results': VACANCIES}
+        )
+        bot = FakeBot()
+        homework_module.run_cycle(bot, {})
+        assert len(bot.sent) == 1, (
+            'Убедитесь, что в режиме просмотра чат получает одно сообщение '
+            'с кнопками вместо сообщения на каждую вакансию.'
+        )
+        chat_id, text, markup = bot.sent[0]
+        assert chat_id == homework_module.TELEGRAM_CHAT_ID
+        data = markup.inline_keyboard[0][-1].callback_data
+        homework_module.answer_callback(bot, press(int(chat_id), data))
+        assert bot.edited[0][:2] == (int(chat_id), 7)
+        assert bot.edited[0][2].startswith('2/3. Job 1')
+        assert bot.answered == [('q1', None)]
+        homework_module.answer_callback(bot, press(999, data))
+        assert bot.answered[-1] == ('q1', 'Подборка устарела.')
+
+    def test_failed_edit_still_answers(self, monkeypatch, homework_module):
+        browser = browse.ResultBrowser()
+        monkeypatch.setattr(homework_module, 'BROWSER', browser)
+        browser.publish('1', 100, VACANCIES)
+        bot = FakeBot()
+
+        def edit_message_text(*args, **kwargs):
+            raise telegram.error.BadRequest('Message is not modified')
+
+        bot.edit_message_text = edit_message_text
+        homework_module.answer_callback(bot, press(1, '100:p:1'))
+        assert len(bot.answered) == 1 and bot.answered[0][1], (
+            'Убедитесь, что на нажатие кнопки отвечается, даже если '
+            'сообщение не удалось изменить.'
+        )
+
+    def test_poll_survives_bad_update(self, monkeypatch, homework_module):
+        class Stop(BaseException):
+            pass
+
+        browser = browse.ResultBrowser()
+        monkeypatch.setattr(homework_module, 'BROWSER', browser)
+        browser.publish('1', 100, VACANCIES)
+        batches = [
+            [
+                SimpleNamespace(update_id=1, callback_query=SimpleNamespace(
+                    id='q0', data='100:p:1', message=None
+                )),
+                SimpleNamespace(
+                    update_id=2, callback_query=press(1, '100:p:1')
+                ),
+            ],
+        ]
+        bot = FakeBot()
+
+        def get_updates(**kwargs):
+            if not batches:
+                raise Stop
+            return batches.pop(0)
+
+        bot.get_updates = get_updates
+        with pytest.raises(Stop):
+            homework_module.poll_updates(bot)
+        assert [answer[0] for answer in bot.answered] == ['q0', 'q1'], (
+            'Убедитесь, что сбой обработки одного нажатия не останавливает '
+            'поток получения обновлений.'
+        )
+        assert len(bot.edited) == 1
@@ -0,0 +1,156 @@
+import threading
+
+import canonical
+import quota
+import state
+import utils
+
+
+class TestNormalizeUrl:
+
+    def test_normalize(self):
+        assert canonical.normalize_url(
+            'HTTPS://WWW.Example.com:443/jobs/42/?utm_source=adzuna&b=2&a=1'
+            '&gclid=x#apply'
+        ) == 'https://example.com/jobs/42?a=1&b=2', (
+            'Убедитесь, что из адреса убираются параметры отслеживания, '
+            'порт по умолчанию, фрагмент и завершающий слеш.'
+        )
+        assert canonical.normalize_url('http://example.com:8080/') == (
+            'http://example.com:8080'
+        )
+
+
+class TestUrlResolver:
+
+    def test_cache_with_ttl(self):
+        clock = utils.FakeClock(1000.0)
+        resolver = canonical.UrlResolver(ttl=60, clock=clock)
+        bot_state = {}
+        resolver.bind(bot_state)
+        calls = []
+
+        def final_url(url):
+            calls.append(url)
+            return 'https://employer.example.com/job?utm_medium=feed'
+
+        resolver.final_url = final_url
+        for _ in range(2):
+            assert resolver.resolve('https://adzuna/1') == (
+                'https://employer.example.com/job?utm_medium=feed'
+            ), 'Убедитесь, что конечный адрес возвращается без изменений.'
+        assert calls == ['https://adzuna/1']
+        assert 'https://adzuna/1' in bot_state['url_cache'], (
+            'Убедитесь, что кеш адресов хранится в состоянии бота.'
+        )
+        clock.now += 61
+        resolver.resolve('https://adzuna/1')
+        assert len(calls) == 2
+
+    def test_failure_keeps_original(self):
+        resolver = canonical.UrlResolver()
+
+        def final_url(url):
+            raise ConnectionError('down')
+
+        resolver.final_url = final_url
+        assert resolver.resolve('https://Example.com/a/') == (
+            'https://Example.com/a/'
+        )
+
+    def test_resolve_many_in_parallel(self):
+        resolver = canonical.UrlResolver(max_workers=3)
+        barrier = threading.Barrier(3, timeout=1)
+
+        def final_url(url):
+            barrier.wait()
+            return url.replace('tracking', 'employer')
+
+        resolver.final_url = final_url
+        urls = [f'https://tracking.example.com/{i}' for i in range(3)]
+        assert resolver.resolve_many(urls + urls[:1]) == {
+            url: url.replace('tracking', 'employer') for url in urls
+        }
+
+    def test_canonical_url_deduplicates(self):
+        bot_state = {}
+        vacancies = [
+            utils.make_vacancy(1, redirect_url='a',
+                               canonical_url='https://job'),
+            utils.make_vacancy(2, redirect_url='b',
+                               canonical_url='https://job'),
+            utils.make_vacancy(3, redirect_url='c'),
+        ]
+        fresh = list(state.new_vacancies(bot_state, vacancies))
+        assert [vacancy['id'] for vacancy in fresh] == [1, 3], (
+            'Убедитесь, что вакансии с одинаковым каноническим адресом '
+            'отправляются один раз.'
+        )
+        state.mark_seen(bot_state, fresh)
+        assert bot_state['seen_urls'] == ['https://job']
+
+
+class TestCanonicalIntegration:
+
+    def test_cycle_sends_direct_link(self, monkeypatch, homework_module):
+        monkeypatch.setattr(homework_module, 'QUOTA', quota.QuotaManager())
+        monkeypatch.setattr(homework_module, 'RESOLVE_URLS', True)
+        monkeypatch.setattr(homework_module, 'SEND_CANONICAL_URLS', True)
+        resolver = canonical.UrlResolver()
+        resolver.final_url = (
+            lambda url: 'https://www.employer.example.com/job/?ref=adzuna'
+        )
+        monkeypatch.setattr(homework_module, 'URL_RESOLVER', resolver)
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer',
+            lambda params=None: {'results': [
+                utils.make_vacancy(1),
+                utils.make_vacancy(2),
+            ]}
+        )
+        sent = []
+        monkeypatch.setattr(
+            homework_module, 'send_message',
+            lambda bot, message: sent.append(message)
+        )
+        homework_module.run_cycle(None, {})
+        assert sent == [
+            'Job 1 in Edinburgh, Scotland, for company: Fake Company. '
+            'Link: https://www.employer.example.com/job/?ref=adzuna'
+        ], (
+            'Убедитесь, что пользователю отправляется конечный адрес в том '
+            'виде, в каком его вернул сервер.'
+        )
+
+    def test_failed_lookup_keeps_tracking_link(self, monkeypatch,
+                                               homework_module):
+        monkeypatch.setattr(homework_module, 'QUOTA', quota.QuotaManager())
+        monkeypatch.setattr(homework_module, 'RESOLVE_URLS', True)
+        monkeypatch.setattr(homework_module, 'SEND_CANONICAL_URLS', True)
+        resolver = canonical.UrlResolver()
+
+        def final_url(url):
+            raise ConnectionError('down')
+
+        resolver.final_url = final_url
+        monkeypatch.setattr(homework_module, 'URL_RESOLVER', resolver)
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer',
+            lambda params=None: {'results': [
+                utils.make_vacancy(
+                    1, redirect_url='https://www.adzuna.co.uk/1/?utm_source=x'
+                ),
+            ]}
+        )
+        sent = []
+        monkeypatch.setattr(
+            homework_module, 'send_message',
+            lambda bot, message: sent.append(message)
+        )
+        bot_state = {}
+        homework_module.run_cycle(None, bot_state)
+        assert sent == [
+            'Job 1 in Edinburgh, Scotland, for company: Fake Company. '
+            'Link: https://www.adzuna.co.uk/1/?utm_source=x'
+        ], 'Убедитесь, что при ошибке отправляется исходная ссылка.'
+        assert bot_state['seen_urls'] == ['https://adzuna.co.uk/1']
@@ -0,0 +1,86 @@
+import coalesce
+import planner
+import quota
+import utils
+
+BASE_PARAMS = {'what': 'python', 'results_per_page': 5, 'sort_by': 'date'}
+
+
+class TestCoalesce:
+
+    def test_compatible_searches_merged(self):
+        plans = planner.plan_searches({
+            'django': {'what': 'django'},
+            'flask': {'what': 'flask', 'exclude_companies': ['Skip Me']},
+            'leeds': {'what': 'fastapi', 'where': 'Leeds'},
+            'phrase': {'what': 'data engineer'},
+        }, BASE_PARAMS)
+        requests = coalesce.coalesce(plans)
+        assert len(requests) == 3, (
+            'Убедитесь, что поиски с одинаковыми параметрами объединяются в '
+            'один запрос, а остальные выполняются отдельно.'
+        )
+        merged = next(
+            request for request in requests if len(request.members) > 1
+        )
+        assert merged.members == ['django', 'flask']
+        assert merged.params['what_or'] == 'django flask'
+        assert 'what' not in merged.params
+        assert merged.params['results_per_page'] == 10
+        phrase = next(
+            request for request in requests if request.members == ['phrase']
+        )
+        assert phrase.params == plans['phrase'].params
+
+    def test_merge_limit(self):
+        plans = planner.plan_searches(
+            {f's{i}': {'what': f'kw{i}'} for i in range(5)}, BASE_PARAMS
+        )
+        requests = coalesce.coalesce(plans, max_merge=2)
+        assert [len(request.members) for request in requests] == [2, 2, 1]
+        assert requests[-1].params['what'] == 'kw4'
+
+    def test_demultiplex(self):
+        request = coalesce.MergedRequest(
+            dict(BASE_PARAMS, what_or='django flask'),
+            {'django': 'django', 'flask': 'flask'},
+        )
+        demuxed = request.demultiplex([
+            utils.make_vacancy(1, 'Django developer'),
+            utils.make_vacancy(2, 'Backend', 'Flask and Django'),
+            utils.make_vacancy(3, 'Flask engineer'),
+            utils.make_vacancy(4, 'Python developer'),
+        ])
+        assert [vacancy['id'] for vacancy in demuxed['django']] == [1, 2, 4]
+        assert [vacancy['id'] for vacancy in demuxed['flask']] == [2, 3, 4], (
+            'Убедитесь, что вакансия без ключевых слов достается всем '
+            'поискам объединенного запроса.'
+        )
+
+
+class TestCoalesceIntegration:
+
+    def test_fetch_merges_requests(self, monkeypatch, homework_module):
+        monkeypatch.setattr(homework_module, 'QUOTA', quota.QuotaManager())
+        monkeypatch.setattr(homework_module, 'SEARCHES', {
+            'django': {'what': 'django'},
+            'flask': {'what': 'flask', 'exclude_companies': ['Fake Company']},
+        })
+        calls = []
+
+        def mock_get_api_answer(params=None):
+            calls.append(params)
+            return {'results': [
+                utils.make_vacancy('d', 'Django developer'),
+                utils.make_vacancy('f', 'Flask developer'),
+            ]}
+
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer', mock_get_api_answer
+        )
+        vacancies = homework_module.fetch_vacancies()
+        assert len(calls) == 1 and calls[0]['what_or'] == 'django flask'
+        assert [vacancy['id'] for vacancy in vacancies] == ['d'], (
+            'Убедитесь, что локальные фильтры применяются к вакансиям '
+            'каждого поиска после разбора общего ответа.'
+        )
@@ -0,0 +1,192 @@
+import json
+import os
+
+import pytest
+
+import config
+import quota
+
+DEFAULTS = {
+    'country': 'gb',
+    'params': {'app_id': 'id', 'what': 'python'},
+    'retry_period': 600,
+    'searches': {'default': {}},
+    'feeds': {},
+}
+
+
+def write_config(path, data):
+    path.write_text(json.dumps(data), encoding='utf-8')
+    # Make sure the change is visible even on coarse mtime filesystems.
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+
+class TestConfig:
+
+    def test_read_config_rejects_bad_settings(self, tmp_path):
+        path = tmp_path / 'config.json'
+        for data in ([], {'countri': 'gb'}, {'retry_period': 0},
+                     {'searches': ['python']}, {'searches': {'a': ['what']}},
+                     {'feeds': {'x': 5}}, {'feeds': {'x': ['ok', 7]}}):
+            write_config(path, data)
+            with pytest.raises(ValueError):
+                config.read_config(str(path))
+
+    def test_params_merged_with_defaults(self):
+        merged = config.merge_config(DEFAULTS, {'params': {'what': 'go'}})
+        assert merged['params'] == {'app_id': 'id', 'what': 'go'}, (
+            'Убедитесь, что параметры из файла дополняют параметры по '
+            'умолчанию.'
+        )
+        assert merged['searches'] == {'default': {}}
+
+    def test_diff_searches(self):
+        old = dict(DEFAULTS, searches={
+            'default': {}, 'leeds': {'where': 'Leeds'}, 'old': {},
+        })
+        new = dict(DEFAULTS, searches={
+            'default': {}, 'leeds': {'where': 'York'}, 'new': {'what': 'go'},
+        })
+        assert config.diff_searches(old, new) == (['new'], ['old'], ['leeds'])
+        moved = dict(new, country='au')
+        assert config.diff_searches(new, moved) == (
+            [], [], ['default', 'leeds', 'new']
+        ), 'Убедитесь, что смена страны затрагивает все поиски.'
+        with pytest.raises(ValueError):
+            config.diff_searches(old, dict(DEFAULTS, searches={
+                'bad': {'colour': 'red'},
+            }))
+
+    def test_reloader_applies_changes_only(self, tmp_path):
+        path = tmp_path / 'config.json'
+        write_config(path, {'retry_period': 60})
+        applied = []
+        reloader = config.ConfigReloader(str(path), applied.append, DEFAULTS)
+        assert reloader.reload()
+        assert not reloader.check(), (
+            'Убедитесь, что неизмененный файл не перечитывается.'
+        )
+        reloader.request()
+        assert reloader.check()
+        write_config(path, {'retry_period': 'soon'})
+        assert not reloader.check()
+        assert not reloader.check()
+        assert [item['retry_period'] for item in applied] == [60, 60]
+
+    def test_reloader_survives_any_error(self, tmp_path):
+        path = tmp_path / 'config.json'
+        write_config(path, {'retry_period': 60})
+
+        def apply(config):
+            raise AttributeError('broken')
+
+        reloader = config.ConfigReloader(str(path), apply, DEFAULTS)
+        assert not reloader.reload(), (
+            'Убедитесь, что любая ошибка применения конфигурации не '
+            'останавливает бота.'
+        )
+
+
+class TestConfigIntegration:
+
+    def test_reload_keeps_warm_state(self, monkeypatch, tmp_path,
+                                     homework_module):
+        for name in ('COUNTRY', 'ENDPOINT', 'PARAMS', 'RETRY_PERIOD',
+                     'BACKFILL_AFTER', 'SEARCHES', 'FEEDS',
+                     'MESSAGE_TEMPLATE', 'MESSAGE_LOCALE'):
+            monkeypatch.setattr(
+                homework_module, name, getattr(homework_module, name)
+            )
+        monkeypatch.setattr(homework_module, 'SEARCHES', {
+            'default': {}, 'leeds': {'where': 'Leeds'}, 'old': {},
+        })
+        manager = quota.QuotaManager()
+        manager.data = {
+            'yield': {'default': 3.0, 'leeds': 2.0, 'old': 1.0},
+            'credit': {'default': 0.5, 'leeds': 0.5, 'old': 0.5},
+        }
+        monkeypatch.setattr(homework_module, 'QUOTA', manager)
+        limits = dict(homework_module.WATCHDOG.stage_limits)
+        monkeypatch.setattr(
+            homework_module.WATCHDOG, 'stage_limits', limits
+        )
+        path = tmp_path / 'config.json'
+        write_config(path, {
+            'retry_period': 300,
+            'searches': {'default': {}, 'leeds': {'where': 'York'}},
+        })
+        reloader = config.ConfigReloader(
+            str(path), homework_module.apply_config,
+            homework_module.current_config()
+        )
+        assert reloader.reload()
+        assert homework_module.RETRY_PERIOD == 300
+        assert homework_module.BACKFILL_AFTER == 600
+        assert limits['sleep'] == 300 + homework_module.STALL_GRACE
+        assert manager.data['yield'] == {'default': 3.0}, (
+            'Убедитесь, что статистика сбрасывается только у удаленных и '
+            'измененных поисков.'
+        )
+        assert manager.data['credit'] == {'default': 0.5}
+
+    def test_bad_template_keeps_previous(self, monkeypatch, tmp_path,
+                                         homework_module):
+        monkeypatch.setattr(homework_module, 'MESSAGE_TEMPLATE', 'plain')
+        monkeypatch.setattr(homework_module, 'MESSAGE_LOCALE', 'en')
+        monkeypatch.setattr(homework_module, 'RETRY_PERIOD', 600)
+        path = tmp_path / 'config.json'
+        write_config(path, {'template': 'html', 'locale': 'ru'})
+        reloader = config.ConfigReloader(
+            str(path), homework_module.apply_config,
+            homework_module.current_config()
+        )
+        assert reloader.reload()
+        assert homework_module.MESSAGE_TEMPLATE == 'html'
+        assert homework_module.MESSAGE_LOCALE == 'ru'
+        write_config(path, {'template': 'rtf', 'retry_period': 60})
+        assert not reloader.reload()
+        assert homework_module.MESSAGE_TEMPLATE == 'html', (
+            'Убедитесь, что конфигурация с неизвестным шаблоном '
+            'отклоняется целиком и прежний шаблон сохраняется.'
+        )
+        assert homework_module.RETRY_PERIOD == 600
+
+    def test_bad_template_fails_at_startup(self, monkeypatch,
+                                           homework_module):
+        monkeypatch.setattr(homework_module, 'API_ID', 'id4api')
+        monkeypatch.setattr(homework_module, 'API_KEY', 's0m3-api-k3y')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_TOKEN', '1234:abcdefg')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_CHAT_ID', '12345')
+        monkeypatch.setattr(homework_module, 'MESSAGE_LOCALE', 'de')
+        with pytest.raises(ValueError, match="'de'"):
+            homework_module.check_message_template()
+        with pytest.raises(ValueError, match="'de'"):
+            homework_module.run_once()
+
+    def test_bad_subscriber_template(self, monkeypatch, homework_module):
+        monkeypatch.setattr(homework_module, 'MESSAGE_TEMPLATE', 'plain')
+        monkeypatch.setattr(homework_module, 'MESSAGE_LOCALE', 'en')
+        monkeypatch.setattr(homework_module, 'SUBSCRIBERS', {
+            '5': {'profile': 'python', 'template': 'md'},
+        })
+        with pytest.raises(ValueError, match="'md'"):
+            homework_module.check_message_template()
+        vacancy = {
+            'id': 1, 'title': 'Job', 'redirect_url': 'https://job',
+            'company': {'display_name': 'Fake'},
+            'location': {'display_name': 'Leeds'},
+        }
+        assert homework_module.vacancy_entry(
+            '5', vacancy, homework_module.SUBSCRIBERS
+        ) == ['5', 'Job in Leeds, for company: Fake. Link: https://job'], (
+            'Убедитесь, что при неизвестном шаблоне подписчика вакансия '
+            'формируется по шаблону по умолчанию.'
+        )
+
+    def test_bad_feed_keeps_previous(self, monkeypatch, homework_module):
+        monkeypatch.setattr(homework_module, 'FEEDS', {})
+        new = dict(homework_module.current_config(), feeds={'x': 5})
+        with pytest.raises(ValueError):
+            homework_module.apply_config(new)
+        assert homework_module.FEEDS == {}
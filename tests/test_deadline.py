@@ -0,0 +1,161 @@
+import pytest
+import requests
+import telegram
+
+import deadline
+import quota
+import utils
+from exceptions import DeadlineExceededError
+
+
+class TestDeadline:
+
+    def test_timeout_without_deadline_uses_cap(self):
+        assert deadline.current() is None
+        assert deadline.timeout(5) == 5
+
+    def test_timeout_capped_by_remaining_time(self):
+        clock = utils.FakeClock()
+        with deadline.Deadline(10, clock):
+            assert deadline.timeout(5) == 5
+            clock.now = 8
+            assert deadline.timeout(5) == 2
+            clock.now = 10
+            with pytest.raises(DeadlineExceededError):
+                deadline.timeout(5)
+        assert deadline.current() is None
+
+    def test_share_is_bounded_by_parent(self):
+        clock = utils.FakeClock()
+        cycle = deadline.Deadline(100, clock)
+        clock.now = 20
+        fetch = cycle.share(0.5)
+        assert fetch.remaining() == 40
+        with fetch:
+            with cycle:
+                assert deadline.current() is cycle
+            assert deadline.current() is fetch
+
+
+class TestCycleDeadlines:
+
+    def test_requests_get_has_timeout(self, monkeypatch, homework_module):
+        calls = []
+
+        def mock_get(*args, **kwargs):
+            calls.append(kwargs)
+            return utils.MockResponseGET()
+
+        monkeypatch.setattr(requests, 'get', mock_get)
+        homework_module.get_api_answer()
+        connect, read = calls[0]['timeout']
+        assert 0 < connect <= homework_module.CONNECT_TIMEOUT
+        assert 0 < read <= homework_module.READ_TIMEOUT, (
+            'Убедитесь, что запрос к API выполняется с таймаутом.'
+        )
+
+    def test_send_message_has_timeout(self, homework_module):
+        bot = utils.MockTelegramBot()
+        calls = []
+        bot.send_message = lambda **kwargs: calls.append(kwargs)
+        homework_module.send_message(bot, 'text')
+        assert 0 < calls[0]['timeout'] <= homework_module.SEND_TIMEOUT
+
+    def test_undelivered_messages_deferred(self, monkeypatch,
+                                           homework_module):
+        clock = utils.FakeClock()
+        real_deadline = deadline.Deadline
+        monkeypatch.setattr(
+            deadline, 'Deadline',
+            lambda budget, *args: real_deadline(budget, clock)
+        )
+        monkeypatch.setattr(
+            homework_module, 'fetch_vacancies',
+            lambda: [{'id': i, 'title': f'Job {i}',
+                      'company': {'display_name': 'Fake'},
+                      'location': {'display_name': 'Edinburgh'},
+                      'redirect_url': 'https://example.com'}
+                     for i in range(5)]
+        )
+        sent = []
+
+        def slow_send_message(bot, message):
+            sent.append(message)
+            clock.now += homework_module.CYCLE_BUDGET / 3
+
+        monkeypatch.setattr(homework_module, 'send_message', slow_send_message)
+        state = {}
+        homework_module.run_cycle(None, state)
+        assert len(sent) == 3
+        assert len(state['outbox']) == 2, (
+            'Убедитесь, что неотправленные за цикл сообщения откладываются '
+            'до следующего цикла.'
+        )
+
+        clock.now = 0
+        monkeypatch.setattr(homework_module, 'fetch_vacancies', lambda: [])
+        homework_module.run_cycle(None, state)
+        assert sent[3:] == ['Job 3 in Edinburgh, for company: Fake. '
+                            'Link: https://example.com',
+                            'Job 4 in Edinburgh, for company: Fake. '
+                            'Link: https://example.com']
+        assert state['outbox'] == []
+
+    def test_transient_send_errors_keep_messages(self, monkeypatch,
+                                                 homework_module):
+        monkeypatch.setattr(homework_module, 'SEND_PAUSED_UNTIL', 0.0)
+        for error in (telegram.error.TimedOut(),
+                      telegram.error.RetryAfter(5)):
+            bot = utils.MockTelegramBot()
+
+            def send_message(*args, error=error, **kwargs):
+                raise error
+
+            bot.send_message = send_message
+            state = {'outbox': [[None, 'text']]}
+            homework_module.deliver_outbox(bot, state)
+            assert state['outbox'] == [[None, 'text']], (
+                'Убедитесь, что сообщение, не отправленное из-за временной '
+                'ошибки Telegram, остается в очереди.'
+            )
+        calls = []
+        bot.send_message = lambda **kwargs: calls.append(kwargs)
+        with deadline.Deadline(1):
+            homework_module.deliver_outbox(bot, state)
+        assert calls == [] and state['outbox'] == [[None, 'text']], (
+            'Убедитесь, что после RetryAfter отправка приостанавливается.'
+        )
+
+    def test_permanent_send_error_drops_message(self, homework_module):
+        bot = utils.MockTelegramBot()
+
+        def send_message(**kwargs):
+            raise telegram.error.BadRequest('Chat not found')
+
+        bot.send_message = send_message
+        state = {'outbox': [['1', 'text']]}
+        homework_module.deliver_outbox(bot, state)
+        assert state['outbox'] == []
+
+    def test_fetch_returns_partial_results(self, monkeypatch, caplog,
+                                           homework_module):
+        monkeypatch.setattr(homework_module, 'QUOTA', quota.QuotaManager())
+        monkeypatch.setattr(homework_module, 'SEARCHES', {
+            'london': {'where': 'London'},
+            'leeds': {'where': 'Leeds'},
+        })
+        calls = []
+
+        def get_api_answer(params=None):
+            calls.append(params)
+            if len(calls) > 1:
+                raise DeadlineExceededError('Время истекло.')
+            return {'results': [{'id': 1, 'title': 'Job 1'}]}
+
+        monkeypatch.setattr(homework_module, 'get_api_answer', get_api_answer)
+        vacancies = homework_module.fetch_vacancies()
+        assert [vacancy['id'] for vacancy in vacancies] == [1], (
+            'Убедитесь, что при истечении времени возвращаются уже '
+            'полученные вакансии.'
+        )
+        assert 'истекло' in caplog.text
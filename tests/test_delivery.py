@@ -0,0 +1,158 @@
+import threading
+import time
+
+import telegram
+
+import deadline
+import delivery
+import utils
+
+
+def chats_in_lanes(lanes, count):
+    """Возвращает по одному id чата для первых count очередей."""
+    chats = {}
+    chat_id = 0
+    while len(chats) < count:
+        chats.setdefault(lanes.lane_for(chat_id), chat_id)
+        chat_id += 1
+    return list(chats.values())
+
+
+class TestDeliveryLanes:
+
+    def test_chat_order_preserved(self):
+        sent = []
+        lanes = delivery.DeliveryLanes(
+            lambda chat_id, item: sent.append((chat_id, item)), lanes=3
+        )
+        for i in range(20):
+            lanes.submit(i % 4, i)
+        assert lanes.wait_idle(5)
+        for chat_id in range(4):
+            assert [item for chat, item in sent if chat == chat_id] == list(
+                range(chat_id, 20, 4)
+            ), 'Убедитесь, что сообщения одного чата уходят по порядку.'
+        assert sum(lane['sent'] for lane in lanes.stats()) == 20
+
+    def test_chats_sent_in_parallel(self):
+        lanes = delivery.DeliveryLanes(None, lanes=2)
+        barrier = threading.Barrier(2, timeout=5)
+        lanes.send = lambda chat_id, item: barrier.wait()
+        for chat_id in chats_in_lanes(lanes, 2):
+            lanes.submit(chat_id, 'text')
+        assert lanes.wait_idle(5)
+        assert not barrier.broken, (
+            'Убедитесь, что сообщения разных чатов отправляются параллельно.'
+        )
+
+    def test_full_lane_applies_backpressure(self):
+        release = threading.Event()
+        done = []
+        lanes = delivery.DeliveryLanes(
+            lambda chat_id, item: release.wait(5), lanes=1, max_depth=1
+        )
+        assert lanes.submit(1, 'a', done.append)
+        time.sleep(0.05)
+        assert lanes.submit(1, 'b', done.append)
+        assert not lanes.submit(1, 'c', done.append, timeout=0.05), (
+            'Убедитесь, что при заполненной очереди отправитель ждет и '
+            'получает отказ по таймауту.'
+        )
+        assert lanes.stats()[0]['depth'] == 1
+        release.set()
+        assert lanes.wait_idle(5)
+        assert done == ['a', 'b']
+
+    def test_failed_send_not_marked_done(self):
+        done = []
+
+        def send(chat_id, item):
+            if item == 'bad':
+                raise RuntimeError('boom')
+
+        lanes = delivery.DeliveryLanes(send, lanes=1)
+        lanes.submit(1, 'bad', done.append)
+        lanes.submit(2, 'good', done.append)
+        assert lanes.wait_idle(5)
+        assert done == ['good']
+
+    def test_failed_chat_keeps_order(self):
+        done = []
+
+        def send(chat_id, item):
+            if item == 'bad':
+                raise RuntimeError('boom')
+
+        lanes = delivery.DeliveryLanes(send, lanes=1)
+        for chat_id, item in ((1, 'bad'), (1, 'later'), (2, 'other')):
+            lanes.submit(chat_id, item, done.append)
+        assert lanes.wait_idle(5)
+        assert done == ['other'], (
+            'Убедитесь, что после сбоя остальные сообщения чата не '
+            'отправляются раньше неотправленного.'
+        )
+        lanes.reset_failures()
+        lanes.submit(1, 'later', done.append)
+        assert lanes.wait_idle(5)
+        assert done == ['other', 'later']
+
+
+class TestDeliveryIntegration:
+
+    def test_full_lane_does_not_block_others(self, monkeypatch,
+                                             homework_module):
+        release = threading.Event()
+        sent = []
+
+        def send_message(bot, message, chat_id=None, keyboard=None):
+            if chat_id == slow:
+                release.wait(5)
+            sent.append(message)
+
+        lanes = delivery.DeliveryLanes(
+            lambda chat_id, item: homework_module.send_entry(*item),
+            lanes=2, max_depth=1
+        )
+        slow, fast = chats_in_lanes(lanes, 2)
+        monkeypatch.setattr(homework_module, 'DELIVERY', lanes)
+        monkeypatch.setattr(homework_module, 'SEND_TIMEOUT', 0.05)
+        monkeypatch.setattr(homework_module, 'send_message', send_message)
+        state = {'outbox': [[slow, 'a1'], [slow, 'a2'], [slow, 'a3'],
+                            [fast, 'b1']]}
+        with deadline.Deadline(0.3):
+            homework_module.deliver_outbox(None, state)
+        assert sent == ['b1'], (
+            'Убедитесь, что заполненная очередь одного чата не задерживает '
+            'отправку в другие чаты.'
+        )
+        with deadline.Deadline(0.1):
+            homework_module.deliver_outbox(None, state)
+        release.set()
+        assert lanes.wait_idle(5)
+        homework_module.deliver_outbox(None, state)
+        assert lanes.wait_idle(5)
+        assert sent == ['b1', 'a1', 'a2', 'a3'], (
+            'Убедитесь, что сообщение, отправленное после конца цикла, не '
+            'отправляется повторно.'
+        )
+        assert state['outbox'] == []
+
+    def test_outbox_keeps_only_failed(self, homework_module):
+        sent = []
+
+        class FlakyBot(utils.MockTelegramBot):
+            def send_message(self, chat_id=None, text=None, **kwargs):
+                if text == 'fail':
+                    raise telegram.error.TimedOut()
+                sent.append((chat_id, text))
+
+        state = {'outbox': [['1', 'a'], ['2', 'fail'], ['1', 'b'],
+                            ['2', 'after'], [None, 'c']]}
+        homework_module.deliver_outbox(FlakyBot(), state)
+        assert [m for chat, m in sent if chat == '1'] == ['a', 'b']
+        assert (homework_module.TELEGRAM_CHAT_ID, 'c') in sent
+        assert state['outbox'] == [['2', 'fail'], ['2', 'after']], (
+            'Убедитесь, что в очереди остаются неотправленные сообщения, а '
+            'следующие сообщения того же чата ждут повтора.'
+        )
+        assert 'delivery' in homework_module.WATCHDOG.status()
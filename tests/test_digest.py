@@ -0,0 +1,140 @@
+import threading
+from datetime import datetime
+from functools import partial
+
+import pytest
+
+import digest
+import utils
+
+make_vacancy = partial(utils.make_vacancy, created='2026-10-19T10:00:00Z')
+
+
+class TestCronSchedule:
+
+    @pytest.mark.parametrize('expression, moment, expected', [
+        ('0 * * * *', datetime(2026, 10, 19, 10, 15),
+         datetime(2026, 10, 19, 11, 0)),
+        ('*/15 * * * *', datetime(2026, 10, 19, 10, 15),
+         datetime(2026, 10, 19, 10, 30)),
+        ('30 9 * * 1-5', datetime(2026, 10, 23, 10, 0),
+         datetime(2026, 10, 26, 9, 30)),
+        ('0 0 1 1 *', datetime(2026, 10, 19, 10, 0),
+         datetime(2027, 1, 1, 0, 0)),
+        # Day of month OR day of week: the 13th or any Friday.
+        ('0 0 13 * 5', datetime(2026, 10, 19, 10, 0),
+         datetime(2026, 10, 23, 0, 0)),
+        ('0 0 13 * 5', datetime(2026, 12, 12, 10, 0),
+         datetime(2026, 12, 13, 0, 0)),
+        # A start with a step runs to the end of the field.
+        ('50/5 * * * *', datetime(2026, 10, 19, 10, 51),
+         datetime(2026, 10, 19, 10, 55)),
+        ('0 22/1 * * *', datetime(2026, 10, 19, 22, 30),
+         datetime(2026, 10, 19, 23, 0)),
+    ])
+    def test_next_after(self, expression, moment, expected):
+        assert digest.CronSchedule(expression).next_after(moment) == expected
+
+    @pytest.mark.parametrize('expression', ['* * * *', '61 * * * *',
+                                            '*/0 * * * *', '0 0 31 2 *'])
+    def test_invalid_expression(self, expression):
+        with pytest.raises(ValueError):
+            schedule = digest.CronSchedule(expression)
+            schedule.next_after(datetime(2026, 10, 19))
+
+
+class TestDigest:
+
+    def test_build_digest_groups_and_ranks(self):
+        vacancies = [
+            digest.compact_vacancy(make_vacancy(
+                1, 'Python Engineer 1', company='Small'
+            )),
+            digest.compact_vacancy(make_vacancy(
+                2, 'Python Engineer 2', company='Big', salary_max=100
+            )),
+            digest.compact_vacancy(make_vacancy(
+                3, 'Python Engineer 3', company='Big', salary_max=200
+            )),
+        ]
+        messages = digest.build_digest(vacancies, 'company')
+        assert len(messages) == 1
+        text = messages[0]
+        assert text.index('Big (2)') < text.index('Small (1)'), (
+            'Убедитесь, что группы с большим числом вакансий идут первыми.'
+        )
+        assert text.index('Engineer 3') < text.index('Engineer 2')
+
+    def test_build_digest_respects_limit(self):
+        vacancies = [
+            digest.compact_vacancy(make_vacancy(
+                i, f'Python Engineer {i}', company=f'Company {i % 7}'
+            ))
+            for i in range(200)
+        ]
+        messages = digest.build_digest(vacancies, 'location', limit=500)
+        assert len(messages) > 1
+        assert all(len(message) <= 500 for message in messages)
+        joined = '\n'.join(messages)
+        assert all(f'/{i}' in joined for i in range(200)), (
+            'Убедитесь, что при разбиении дайджеста не теряются вакансии.'
+        )
+
+    def test_flush_follows_schedule(self):
+        state = {}
+        schedule = digest.CronSchedule('0 * * * *')
+        digest.buffer_vacancy(state, '1', make_vacancy(1, company='Fake'))
+        assert digest.flush_due_digests(
+            state, schedule, now=datetime(2026, 10, 19, 10, 5)
+        ) == {}
+        assert digest.flush_due_digests(
+            state, schedule, now=datetime(2026, 10, 19, 10, 55)
+        ) == {}
+        digests = digest.flush_due_digests(
+            state, schedule, now=datetime(2026, 10, 19, 11, 0)
+        )
+        assert list(digests) == ['1']
+        assert 'digest' not in state
+
+
+class TestDigestMode:
+
+    def test_run_cycle_buffers_vacancies(self, monkeypatch, homework_module):
+        monkeypatch.setattr(homework_module, 'DIGEST_GROUP_BY', 'company')
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer',
+            lambda params=None: utils.MockResponseGET().json()
+        )
+        sent = []
+        monkeypatch.setattr(
+            homework_module, 'send_message',
+            lambda bot, message, chat_id=None: sent.append(message)
+        )
+        state = {}
+        homework_module.run_cycle(None, state)
+        assert not sent, (
+            'Убедитесь, что в режиме дайджеста вакансии не отправляются '
+            'по одной.'
+        )
+        assert len(state['digest'][homework_module.TELEGRAM_CHAT_ID]) == 1
+
+    def test_queue_digests_holds_state_lock(self, monkeypatch,
+                                            homework_module):
+        locked = []
+
+        def flush(state, schedule, group_by):
+            # Another thread (backfill) must not be able to take the lock.
+            probe = threading.Thread(target=lambda: locked.append(
+                not homework_module.STATE_LOCK.acquire(blocking=False)
+            ))
+            probe.start()
+            probe.join()
+            return {None: ['digest']}
+
+        monkeypatch.setattr(homework_module, 'flush_due_digests', flush)
+        state = {'outbox': []}
+        homework_module.queue_digests(state)
+        assert locked == [True], (
+            'Убедитесь, что дайджесты ставятся в очередь под STATE_LOCK.'
+        )
+        assert state['outbox'] == [[None, 'digest']]
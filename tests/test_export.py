@@ -0,0 +1,209 @@
+import json
+import os
+import socket
+import threading
+from functools import partial
+
+import pytest
+import telegram
+
+import export
+import quota
+import utils
+
+make_vacancy = partial(
+    utils.make_vacancy, title='Python Developer', description='Django',
+    created='2024-05-01T10:00:00Z'
+)
+
+
+class BlockingSink:
+    name = 'blocking'
+    path = 'memory'
+
+    def __init__(self):
+        self.release = threading.Event()
+        self.batches = []
+        self.closed = False
+
+    def write(self, lines):
+        self.release.wait(1)
+        self.batches.append(lines)
+
+    def close(self):
+        self.closed = True
+
+
+class TestSinks:
+
+    def test_jsonl_rotation(self, tmp_path):
+        path = str(tmp_path / 'vacancies.jsonl')
+        sink = export.JsonlFileSink(path, max_bytes=600, backups=2)
+        lines = export.encode_vacancies(make_vacancy(i) for i in range(9))
+        for start in range(0, 9, 3):
+            sink.write(lines[start:start + 3])
+        sink.close()
+        assert sorted(os.listdir(tmp_path)) == [
+            'vacancies.jsonl', 'vacancies.jsonl.1', 'vacancies.jsonl.2'
+        ]
+        with open(path, encoding='utf-8') as file:
+            records = [json.loads(line) for line in file]
+        assert [record['id'] for record in records] == ['6', '7', '8']
+        assert records[0]['company'] == 'Fake Company'
+
+    def test_unix_socket(self, tmp_path):
+        path = str(tmp_path / 'export.sock')
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(path)
+        server.listen(1)
+        sink = export.UnixSocketSink(path)
+        sink.write(export.encode_vacancies([make_vacancy(1)]))
+        connection, _ = server.accept()
+        with connection, server:
+            received = connection.makefile('rb').readline()
+        sink.close()
+        assert json.loads(received)['id'] == '1'
+
+    @pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason='POSIX only')
+    def test_named_pipe(self, tmp_path):
+        path = str(tmp_path / 'export.fifo')
+        sink = export.NamedPipeSink(path)
+        with pytest.raises(OSError):
+            sink.write([b'lost\n'])
+        received = []
+        reader = threading.Thread(
+            target=lambda: received.extend(open(path, 'rb'))
+        )
+        reader.start()
+        while True:
+            try:
+                sink.write([b'one\n', b'two\n'])
+                break
+            except OSError:
+                # The reader has not opened the pipe yet.
+                threading.Event().wait(0.01)
+        sink.close()
+        reader.join(1)
+        assert received == [b'one\n', b'two\n']
+
+    def test_named_pipe_refuses_regular_file(self, tmp_path):
+        path = tmp_path / 'export.fifo'
+        path.write_bytes(b'data\n')
+        with pytest.raises(ValueError):
+            export.NamedPipeSink(str(path))
+        assert path.read_bytes() == b'data\n'
+
+
+class TestStreamExporter:
+
+    def test_batches_and_backpressure(self):
+        sink = BlockingSink()
+        exporter = export.StreamExporter(sink, buffer_size=3, batch_size=2)
+        lines = [f'{i}\n'.encode() for i in range(8)]
+        exporter.publish(lines[:1])
+        while exporter.queue.qsize():
+            # Wait for the writer to take the line and block on the sink.
+            threading.Event().wait(0.01)
+        assert exporter.publish(lines[1:], timeout=0.1) == 3, (
+            'Убедитесь, что при заполненной очереди publish ждет не дольше '
+            'таймаута и отбрасывает лишнее.'
+        )
+        assert exporter.stats()['dropped'] == 4
+        sink.release.set()
+        assert exporter.wait_idle(1)
+        assert sink.batches == [lines[:1], lines[1:3], lines[3:4]]
+        assert exporter.stats()['written'] == 4
+
+    def test_close_drains_queue(self):
+        sink = BlockingSink()
+        exporter = export.StreamExporter(sink)
+        exporter.publish([b'1\n', b'2\n'])
+        assert not exporter.close(0.05)
+        assert not sink.closed
+        sink.release.set()
+        assert exporter.close(1)
+        assert sink.closed and sum(map(len, sink.batches)) == 2, (
+            'Убедитесь, что close записывает очередь до закрытия приемника.'
+        )
+
+
+class TestExportIntegration:
+
+    def test_cycle_exports_new_vacancies_once(self, monkeypatch, tmp_path,
+                                              homework_module):
+        path = str(tmp_path / 'stream.jsonl')
+        monkeypatch.setattr(homework_module, 'QUOTA', quota.QuotaManager())
+        monkeypatch.setattr(homework_module, 'EXPORT_JSONL', path)
+        monkeypatch.setattr(
+            homework_module.WATCHDOG, 'probes',
+            dict(homework_module.WATCHDOG.probes)
+        )
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer',
+            lambda params=None: {
+                'results': [make_vacancy(i) for i in range(3)]
+            }
+        )
+        monkeypatch.setattr(homework_module, 'deliver_outbox',
+                            lambda bot, state: None)
+        state = {}
+        homework_module.run_cycle(None, state)
+        homework_module.run_cycle(None, state)
+        exporters = homework_module.get_exporters(path, None, None)
+        assert exporters[0].wait_idle(1)
+        with open(path, encoding='utf-8') as file:
+            ids = [json.loads(line)['id'] for line in file]
+        assert ids == ['0', '1', '2'], (
+            'Убедитесь, что экспортируются только новые вакансии.'
+        )
+        assert homework_module.WATCHDOG.status()['export'][0]['written'] == 3
+
+    def test_run_once_waits_for_export(self, monkeypatch, tmp_path,
+                                       homework_module):
+        monkeypatch.setattr(homework_module, 'API_ID', 'id4api')
+        monkeypatch.setattr(homework_module, 'API_KEY', 's0m3-api-k3y')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_TOKEN', '1234:abcdefg')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_CHAT_ID', '12345')
+        monkeypatch.setattr(telegram, 'Bot', utils.MockTelegramBot)
+        monkeypatch.setattr(homework_module, 'QUOTA', quota.QuotaManager())
+        monkeypatch.setattr(homework_module, 'EXPORT_JSONL', 'stream.jsonl')
+        sink = BlockingSink()
+        exporter = export.StreamExporter(sink)
+        monkeypatch.setattr(
+            homework_module, 'get_exporters', lambda *args: (exporter,)
+        )
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer',
+            lambda params=None: {'results': [make_vacancy(1)]}
+        )
+        monkeypatch.setattr(homework_module, 'deliver_outbox',
+                            lambda bot, state: None)
+        threading.Timer(0.1, sink.release.set).start()
+        homework_module.run_once(str(tmp_path / 'state.json'))
+        assert len(sink.batches) == 1 and sink.closed, (
+            'Убедитесь, что однократный запуск дожидается записи экспорта '
+            'и закрывает приемники.'
+        )
+
+    def test_bad_fifo_does_not_block_delivery(self, monkeypatch, tmp_path,
+                                              homework_module):
+        path = tmp_path / 'export.fifo'
+        path.write_bytes(b'data\n')
+        monkeypatch.setattr(homework_module, 'QUOTA', quota.QuotaManager())
+        monkeypatch.setattr(homework_module, 'EXPORT_FIFO', str(path))
+        with pytest.raises(ValueError):
+            homework_module.check_exporters()
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer',
+            lambda params=None: {'results': [make_vacancy(1)]}
+        )
+        sent = []
+        monkeypatch.setattr(homework_module, 'send_message',
+                            lambda bot, message: sent.append(message))
+        state = {}
+        homework_module.run_cycle(None, state)
+        assert len(sent) == 1 and state['outbox'] == [], (
+            'Убедитесь, что ошибка в настройке экспорта не мешает отправке '
+            'вакансий в Telegram.'
+        )
+        assert path.read_bytes() == b'data\n'
@@ -0,0 +1,143 @@
+import random
+
+import pytest
+
+import geo
+import quota
+import utils
+import webhook
+
+
+def make_vacancy(vacancy_id, lat=None, lon=None, area=()):
+    coordinates = {} if lat is None else {'latitude': lat, 'longitude': lon}
+    return utils.make_vacancy(
+        vacancy_id, 'Python Developer', 'Django',
+        location={'display_name': ', '.join(area) or '-', 'area': list(area)},
+        **coordinates
+    )
+
+
+EDINBURGH = (55.9533, -3.1883)
+GLASGOW = (55.8642, -4.2518)
+LONDON = (51.5072, -0.1276)
+
+
+class TestSubscriberGeoIndex:
+
+    def test_radius_and_area(self):
+        index = geo.SubscriberGeoIndex({
+            'edinburgh': {'near': list(EDINBURGH), 'radius_km': 10},
+            'glasgow': {'near': list(GLASGOW), 'radius_km': 100},
+            'london': {'near': list(LONDON), 'radius_km': 5},
+            'scotland': {'area': ['UK', 'Scotland']},
+            'both': {'area': ['UK', 'Scotland'],
+                     'near': list(LONDON), 'radius_km': 50},
+            'anyone': {'profile': 'python'},
+        })
+        vacancy = make_vacancy(
+            1, *EDINBURGH, area=('UK', 'scotland', 'Edinburgh')
+        )
+        assert index.match(vacancy) == {'edinburgh', 'glasgow', 'scotland'}
+        assert index.match(make_vacancy(2, *LONDON)) == {'london'}
+        assert index.match(make_vacancy(3, area=('UK', 'Scotland'))) == {
+            'scotland'
+        }, 'Убедитесь, что вакансия без координат проходит только по области.'
+        assert 'anyone' not in index.restricted
+        assert index.allowed([vacancy, make_vacancy(2, *LONDON)])[
+            'london'
+        ] == {1}
+
+    def test_matches_linear_scan(self):
+        generator = random.Random(7)
+        subscribers = {
+            str(number): {
+                'near': [generator.uniform(-80, 80),
+                         generator.uniform(-180, 180)],
+                'radius_km': generator.choice([2, 25, 300, 2500]),
+            }
+            for number in range(300)
+        }
+        # A circle across the antimeridian.
+        subscribers['fiji'] = {'near': [-17.7, 179.9], 'radius_km': 100}
+        index = geo.SubscriberGeoIndex(subscribers)
+        points = [(-17.7, -179.8)] + [
+            (generator.uniform(-80, 80), generator.uniform(-180, 180))
+            for _ in range(300)
+        ]
+        for lat, lon in points:
+            expected = {
+                chat_id for chat_id, settings in subscribers.items()
+                if geo.haversine_km(*settings['near'], lat, lon)
+                <= settings['radius_km']
+            }
+            assert index.match(make_vacancy(0, lat, lon)) == expected, (
+                'Убедитесь, что индекс находит тех же подписчиков, что и '
+                'полный перебор.'
+            )
+        assert 'fiji' in index.match(make_vacancy(0, -17.7, -179.8))
+
+
+class TestLocationFilters:
+
+    def test_filters_command(self):
+        subscribers = {'1': {'profile': 'python'}}
+        webhook.filters(
+            subscribers, '1', 'near=55.95,-3.19 radius_km=30 area=UK/Scotland'
+        )
+        assert subscribers['1'] == {
+            'profile': 'python', 'near': [55.95, -3.19], 'radius_km': 30.0,
+            'area': ['UK', 'Scotland'],
+        }
+        assert webhook.filters(subscribers, '1', 'near=95,0').startswith(
+            'Некорректная настройка'
+        )
+
+    def test_cycle_routes_by_location(self, monkeypatch, homework_module):
+        pytest.importorskip('numpy')
+        monkeypatch.setattr(homework_module, 'QUOTA', quota.QuotaManager())
+        monkeypatch.setattr(homework_module, 'SUBSCRIBERS', {
+            'edinburgh': {'profile': 'python', 'near': list(EDINBURGH),
+                          'radius_km': 20},
+            'england': {'profile': 'python', 'area': ['UK', 'England'],
+                        'top_k': 1},
+            'anywhere': {'profile': 'python'},
+        })
+        vacancies = [
+            make_vacancy(0, *EDINBURGH, area=('UK', 'Scotland')),
+            make_vacancy(1, *LONDON, area=('UK', 'England', 'London')),
+            make_vacancy(2, *GLASGOW, area=('UK', 'Scotland')),
+        ]
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer',
+            lambda params=None: {'results': vacancies}
+        )
+        monkeypatch.setattr(homework_module, 'deliver_outbox',
+                            lambda bot, state: None)
+        state = {}
+        homework_module.run_cycle(None, state)
+        routed = {}
+        for chat_id, message in state['outbox']:
+            routed.setdefault(chat_id, []).append(message.split('/')[-1])
+        assert routed == {
+            'edinburgh': ['0'],
+            'england': ['1'],
+            'anywhere': ['0', '1', '2'],
+        }, 'Убедитесь, что подписчики получают вакансии только из своих мест.'
+
+    def test_index_rebuilt_only_on_filter_change(self, homework_module):
+        subscribers = {
+            'edinburgh': {'profile': 'python', 'near': list(EDINBURGH),
+                          'radius_km': 20},
+            'anywhere': {'profile': 'python'},
+        }
+        index = homework_module.get_geo_index(subscribers)
+        subscribers['anywhere'] = {'profile': 'go', 'top_k': 3}
+        assert homework_module.get_geo_index(subscribers) is index, (
+            'Убедитесь, что индекс не перестраивается, пока фильтры по '
+            'месту не меняются.'
+        )
+        subscribers['edinburgh'] = dict(subscribers['edinburgh'],
+                                        radius_km=50)
+        rebuilt = homework_module.get_geo_index(subscribers)
+        assert rebuilt is not index
+        assert rebuilt.circles['edinburgh'][2] == 50
@@ -0,0 +1,128 @@
+import json
+import logging
+import urllib.error
+import urllib.request
+
+import pytest
+
+import healthcheck
+import utils
+
+
+def get(server, path):
+    url = f'http://127.0.0.1:{server.server_address[1]}{path}'
+    try:
+        with urllib.request.urlopen(url, timeout=1) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as error:
+        return error.code, None
+
+
+class TestWatchdog:
+
+    def test_stage_progress(self):
+        clock = utils.FakeClock(1000.0)
+        watchdog = healthcheck.Watchdog(10, clock=clock)
+        with watchdog.stage('fetch'):
+            assert watchdog.status()['stage'] == 'fetch'
+            clock.now += 1
+        assert watchdog.status()['last_success'] == {'fetch': 1001.0}
+        with pytest.raises(ValueError):
+            with watchdog.stage('send'):
+                raise ValueError
+        assert 'send' not in watchdog.status()['last_success'], (
+            'Убедитесь, что неуспешный этап не отмечается как успешный.'
+        )
+        assert watchdog.status()['stage'] is None
+
+    def test_stall_detected_and_stacks_dumped(self, caplog):
+        clock = utils.FakeClock(1000.0)
+        watchdog = healthcheck.Watchdog(10, {'sleep': 100}, clock=clock)
+        with watchdog.stage('sleep'):
+            clock.now += 50
+            assert not watchdog.check()
+        with caplog.at_level(logging.CRITICAL):
+            with watchdog.stage('send'):
+                clock.now += 11
+                assert watchdog.check()
+                assert watchdog.check()
+        stall_records = [
+            record for record in caplog.records
+            if record.levelno == logging.CRITICAL
+        ]
+        assert len(stall_records) == 1, (
+            'Убедитесь, что при зависании стеки потоков выводятся один раз.'
+        )
+        assert 'test_stall_detected_and_stacks_dumped' in (
+            stall_records[0].message
+        )
+        assert not watchdog.check()
+
+    def test_nested_stage_resets_outer_timer(self):
+        clock = utils.FakeClock(1000.0)
+        watchdog = healthcheck.Watchdog(10, clock=clock)
+        with watchdog.stage('cycle'):
+            for _ in range(3):
+                with watchdog.stage('send'):
+                    clock.now += 8
+            assert not watchdog.check()
+
+
+class TestHealthServer:
+
+    def test_endpoints(self):
+        clock = utils.FakeClock(1000.0)
+        watchdog = healthcheck.Watchdog(10, clock=clock)
+        server = healthcheck.start_health_server(
+            watchdog, '127.0.0.1', 0, ready_max_age=60
+        )
+        try:
+            assert get(server, '/healthz')[0] == 200
+            assert get(server, '/readyz')[0] == 503, (
+                'Убедитесь, что до первого успешного цикла /readyz '
+                'возвращает 503.'
+            )
+            watchdog.cycle_completed()
+            status, body = get(server, '/readyz')
+            assert status == 200
+            assert body['last_cycle'] == clock.now
+            clock.now += 61
+            assert get(server, '/readyz')[0] == 503
+            with watchdog.stage('fetch'):
+                clock.now += 11
+                assert get(server, '/healthz')[0] == 503
+            assert get(server, '/unknown')[0] == 404
+        finally:
+            server.shutdown()
+            server.server_close()
+
+
+class TestLoopStages:
+
+    def test_cycle_reports_stages(self, monkeypatch, homework_module):
+        watchdog = healthcheck.Watchdog(10)
+        monkeypatch.setattr(homework_module, 'WATCHDOG', watchdog)
+        monkeypatch.setattr(homework_module, 'fetch_vacancies', lambda: [])
+        homework_module.run_cycle(None, {})
+        assert set(watchdog.status()['last_success']) == {
+            'fetch', 'parse', 'send', 'cycle'
+        }
+
+    def test_stage_limits_follow_budgets(self, homework_module):
+        limits = homework_module.WATCHDOG.stage_limits
+        assert limits['fetch'] < homework_module.CYCLE_BUDGET, (
+            'Убедитесь, что лимит этапа выводится из его бюджета времени.'
+        )
+        assert homework_module.WATCHDOG.stall_threshold < 60
+
+    def test_maintenance_is_a_stage(self, monkeypatch, tmp_path,
+                                    homework_module):
+        watchdog = healthcheck.Watchdog(10)
+        monkeypatch.setattr(homework_module, 'WATCHDOG', watchdog)
+        monkeypatch.setattr(homework_module, 'ARCHIVE_FILE',
+                            str(tmp_path / 'archive.db'))
+        monkeypatch.setattr(homework_module, 'fetch_vacancies', lambda: [])
+        homework_module.run_cycle(None, {})
+        assert 'maintenance' in watchdog.status()['last_success'], (
+            'Убедитесь, что работа после цикла выполняется внутри этапа.'
+        )
@@ -0,0 +1,122 @@
+import pytest
+
+import planner
+import quota
+import utils
+
+BASE_PARAMS = {'what': 'python', 'results_per_page': 5, 'sort_by': 'date'}
+
+
+class TestPlanner:
+
+    def test_empty_filters_keep_base_params(self):
+        plan = planner.plan_search({}, BASE_PARAMS)
+        assert plan.params == BASE_PARAMS
+        assert not plan.predicates, (
+            'Убедитесь, что без фильтров локальные проверки не создаются.'
+        )
+
+    def test_filters_pushed_down(self):
+        plan = planner.plan_search(
+            {
+                'what': 'django',
+                'where': 'Monterrey',
+                'salary_min': 30000,
+                'salary_max': 90000,
+                'category': 'it-jobs',
+                'contract_type': 'permanent',
+                'contract_time': ['full_time'],
+                'exclude': ['senior', 'lead'],
+            },
+            BASE_PARAMS
+        )
+        assert plan.params == dict(
+            BASE_PARAMS,
+            what='django',
+            where='Monterrey',
+            salary_min=30000,
+            salary_max=90000,
+            category='it-jobs',
+            permanent=1,
+            full_time=1,
+            what_exclude='senior lead',
+        )
+        assert not plan.predicates, (
+            'Убедитесь, что фильтры, которые поддерживает Adzuna, не '
+            'проверяются повторно на стороне бота.'
+        )
+
+    def test_all_options_mean_no_filter(self):
+        plan = planner.plan_search(
+            {'contract_time': ['full_time', 'part_time']}, BASE_PARAMS
+        )
+        assert plan.params == BASE_PARAMS
+
+    def test_leftover_predicates_applied_locally(self):
+        plan = planner.plan_search(
+            {
+                'exclude': ['senior', 'team lead'],
+                'exclude_companies': ['Bad Corp'],
+            },
+            BASE_PARAMS
+        )
+        assert plan.params['what_exclude'] == 'senior'
+        assert plan.local_filters == {
+            'exclude': ['team lead'], 'exclude_companies': ['Bad Corp']
+        }
+        vacancies = [
+            utils.make_vacancy(1, 'Python Developer'),
+            utils.make_vacancy(2, 'Python Team Lead'),
+            utils.make_vacancy(3, 'Python Developer', 'Be a team lead'),
+            utils.make_vacancy(4, 'Python Developer', company='bad corp'),
+        ]
+        assert plan.filter(vacancies) == vacancies[:1]
+
+    def test_single_string_is_one_item(self):
+        plan = planner.plan_search(
+            {'exclude': 'senior', 'exclude_companies': 'Acme'}, BASE_PARAMS
+        )
+        assert plan.params['what_exclude'] == 'senior', (
+            'Убедитесь, что строка в фильтре считается одним значением.'
+        )
+        assert plan.filter([
+            utils.make_vacancy(1, 'Python', company='Acme')
+        ]) == []
+
+    @pytest.mark.parametrize('filters', [
+        {'unknown': 1},
+        {'contract_type': 'freelance'},
+        {'contract_time': ['full_time', 'weekends']},
+        {'exclude': 5},
+        {'exclude_companies': ['Acme', None]},
+    ])
+    def test_invalid_filters(self, filters):
+        with pytest.raises(ValueError):
+            planner.plan_search(filters, BASE_PARAMS)
+
+
+class TestSearches:
+
+    def test_fetch_uses_planned_params(self, monkeypatch, homework_module):
+        monkeypatch.setattr(homework_module, 'QUOTA', quota.QuotaManager())
+        monkeypatch.setattr(homework_module, 'SEARCHES', {
+            'django': {'what': 'django', 'exclude_companies': ['Skip Me']},
+            'flask': {'what': 'flask', 'where': 'Leeds'},
+        })
+        calls = []
+
+        def mock_get_api_answer(params=None):
+            calls.append(params['what'])
+            return {'results': [
+                utils.make_vacancy(params['what'], params['what']),
+                utils.make_vacancy('skip', 'x', company='Skip Me'),
+            ]}
+
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer', mock_get_api_answer
+        )
+        vacancies = homework_module.fetch_vacancies()
+        assert calls == ['django', 'flask']
+        assert [vacancy['id'] for vacancy in vacancies] == [
+            'django', 'flask', 'skip'
+        ]
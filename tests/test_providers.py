@@ -0,0 +1,247 @@
+import json
+import logging
+import threading
+import time
+
+import pytest
+
+import deadline
+import providers
+import quota
+import utils
+from exceptions import DeadlineExceededError
+
+RSS = """<?xml version="1.0"?>
+<rss version="2.0" xmlns:dc="http://purl.org/dc/elements/1.1/">
+  <channel>
+    <title>Remote Jobs</title>
+    <item>
+      <guid>job-1</guid>
+      <title>Python Developer</title>
+      <link>https://jobs.example.com/1</link>
+      <dc:creator>Acme</dc:creator>
+      <description>Django and Celery</description>
+      <pubDate>Mon, 19 Oct 2026 09:30:00 +0200</pubDate>
+    </item>
+    <item>
+      <guid>job-2</guid>
+      <title>No link</title>
+    </item>
+  </channel>
+</rss>"""
+
+ATOM = """<?xml version="1.0"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <title>Atom Jobs</title>
+  <entry>
+    <id>urn:job:7</id>
+    <title>Go Engineer</title>
+    <link href="https://atom.example.com/7"/>
+    <updated>2026-10-19T08:00:00Z</updated>
+  </entry>
+</feed>"""
+
+JSON_FEED = json.dumps({
+    'version': 'https://jsonfeed.org/version/1.1',
+    'title': 'JSON Jobs',
+    'items': [{
+        'id': '42',
+        'title': 'Data Engineer',
+        'url': 'https://json.example.com/42',
+        'authors': [{'name': 'Initech'}],
+        'date_published': '2026-10-19T10:00:00+03:00',
+        '_location': 'Monterrey',
+    }],
+})
+
+
+class StaticProvider(providers.Provider):
+
+    def __init__(self, name, vacancies, delay=0.0, error=None,
+                 barrier=None, timeout=20):
+        super().__init__(timeout=timeout)
+        self.name = name
+        self.vacancies = vacancies
+        self.delay = delay
+        self.error = error
+        self.barrier = barrier
+
+    def fetch(self):
+        if self.barrier:
+            self.barrier.wait()
+        time.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return self.vacancies
+
+
+class TestFeeds:
+
+    def test_rss(self):
+        provider = providers.FeedProvider('remote', 'https://example.com')
+        provider.download = lambda url: RSS
+        vacancies = provider.poll()
+        assert vacancies == [{
+            'id': 'remote:job-1',
+            'title': 'Python Developer',
+            'company': {'display_name': 'Acme'},
+            'location': {'display_name': '-'},
+            'redirect_url': 'https://jobs.example.com/1',
+            'created': '2026-10-19T07:30:00Z',
+            'description': 'Django and Celery',
+        }], (
+            'Убедитесь, что записи ленты приводятся к общему виду, а записи '
+            'без ссылки пропускаются.'
+        )
+
+    def test_atom_and_json_feed(self):
+        provider = providers.FeedProvider('mixed', ['atom', 'json'])
+        provider.download = {'atom': ATOM, 'json': JSON_FEED}.get
+        vacancies = {vacancy['id']: vacancy for vacancy in provider.poll()}
+        assert set(vacancies) == {'mixed:urn:job:7', 'mixed:42'}
+        assert vacancies['mixed:urn:job:7']['company']['display_name'] == (
+            'Atom Jobs'
+        )
+        assert vacancies['mixed:42']['location']['display_name'] == (
+            'Monterrey'
+        )
+        assert vacancies['mixed:42']['created'] == '2026-10-19T07:00:00Z'
+
+    def test_broken_feed_does_not_stop_others(self, caplog):
+        provider = providers.FeedProvider('feeds', ['bad', 'good'])
+        provider.download = {'bad': '<html>', 'good': ATOM}.get
+        with caplog.at_level(logging.ERROR):
+            vacancies = provider.poll()
+        assert [vacancy['id'] for vacancy in vacancies] == [
+            'feeds:urn:job:7'
+        ]
+        assert 'feeds' in caplog.text
+
+    def test_feed_out_of_time_keeps_others(self):
+        def download(url):
+            if url == 'late':
+                raise DeadlineExceededError('Время истекло.')
+            return ATOM
+
+        provider = providers.FeedProvider('feeds', ['good', 'late'])
+        provider.download = download
+        assert [vacancy['id'] for vacancy in provider.poll()] == [
+            'feeds:urn:job:7'
+        ], 'Убедитесь, что по истечении времени ленты не теряются.'
+
+
+class TestPollProviders:
+
+    def test_providers_polled_concurrently(self):
+        barrier = threading.Barrier(2, timeout=1)
+        results, errors = providers.poll_providers([
+            StaticProvider('a', [utils.make_vacancy(1)], barrier=barrier),
+            StaticProvider('b', [utils.make_vacancy(2)], barrier=barrier),
+        ])
+        assert results == {
+            'a': [utils.make_vacancy(1)], 'b': [utils.make_vacancy(2)]
+        }
+        assert errors == {}
+
+    def test_slow_and_failing_providers_skipped(self, caplog):
+        with caplog.at_level(logging.WARNING):
+            results, errors = providers.poll_providers([
+                StaticProvider('fast', [utils.make_vacancy(1)]),
+                StaticProvider('slow', [utils.make_vacancy(2)], delay=1.5,
+                               timeout=0.1),
+                StaticProvider('broken', [], error=ConnectionError('down')),
+            ])
+        assert results == {'fast': [utils.make_vacancy(1)]}, (
+            'Убедитесь, что медленный или неисправный источник не мешает '
+            'получить вакансии остальных.'
+        )
+        assert 'slow' in caplog.text and 'down' in caplog.text
+        assert list(errors) == ['broken'], (
+            'Убедитесь, что ошибки источников возвращаются для уведомлений.'
+        )
+
+    def test_straggler_stops_calling(self):
+        calls = []
+
+        class Polling(providers.Provider):
+            name = 'polling'
+
+            def fetch(self):
+                while True:
+                    # Every call takes its timeout from the deadline.
+                    deadline.timeout(1)
+                    calls.append(time.monotonic())
+                    time.sleep(0.01)
+
+        providers.poll_providers([
+            Polling(timeout=0.1),
+            StaticProvider('fast', [utils.make_vacancy(1)])
+        ])
+        made = len(calls)
+        time.sleep(0.1)
+        assert len(calls) == made, (
+            'Убедитесь, что источник, не уложившийся в срок, не делает '
+            'новых запросов.'
+        )
+
+    def test_provider_is_abstract(self):
+        with pytest.raises(TypeError):
+            providers.Provider()
+
+    def test_all_failed_raises(self):
+        with pytest.raises(ConnectionError):
+            providers.poll_providers([
+                StaticProvider('broken', [], error=ConnectionError('down')),
+            ])
+
+
+class TestProvidersIntegration:
+
+    def test_cycle_polls_feeds(self, monkeypatch, homework_module):
+        monkeypatch.setattr(homework_module, 'QUOTA', quota.QuotaManager())
+        monkeypatch.setattr(homework_module, 'FEEDS', {'remote': 'rss'})
+        monkeypatch.setattr(
+            providers.FeedProvider, 'download', lambda self, url: RSS
+        )
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer',
+            lambda params=None: {'results': [utils.make_vacancy(1)]}
+        )
+        sent = []
+        monkeypatch.setattr(
+            homework_module, 'send_message',
+            lambda bot, message: sent.append(message)
+        )
+        homework_module.run_cycle(None, {})
+        assert sorted(sent) == [
+            'Job 1 in Edinburgh, Scotland, for company: Fake Company. '
+            'Link: https://www.adzuna.co.uk/1',
+            'Python Developer in -, for company: Acme. '
+            'Link: https://jobs.example.com/1',
+        ]
+
+    def test_adzuna_failure_reported_with_feeds(self, monkeypatch,
+                                                homework_module):
+        monkeypatch.setattr(homework_module, 'QUOTA', quota.QuotaManager())
+        monkeypatch.setattr(homework_module, 'FEEDS', {'remote': 'rss'})
+        monkeypatch.setattr(
+            providers.FeedProvider, 'download', lambda self, url: RSS
+        )
+
+        def broken_get_api_answer(params=None):
+            raise ConnectionError('Adzuna недоступна')
+
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer', broken_get_api_answer
+        )
+        monkeypatch.setattr(homework_module, 'send_message',
+                            lambda bot, message: None)
+        reported = []
+        monkeypatch.setattr(homework_module, 'handle_cycle_error',
+                            lambda bot, error: reported.append(error))
+        assert not homework_module.run_cycle(None, {}), (
+            'Убедитесь, что цикл со сбоем источника не считается успешным.'
+        )
+        assert [str(error) for error in reported] == ['Adzuna недоступна'], (
+            'Убедитесь, что сбой Adzuna сообщается и при настроенных лентах.'
+        )
@@ -0,0 +1,117 @@
+import time
+from datetime import datetime
+
+import pytest
+import requests
+
+import quota
+import utils
+from exceptions import QuotaExceededError
+
+
+class TestQuotaManager:
+
+    def test_calls_counted_and_limited(self):
+        clock = utils.FakeClock(datetime(2026, 10, 19, 12, 0))
+        manager = quota.QuotaManager(3, 100, clock=clock)
+        state = {}
+        manager.bind(state)
+        for _ in range(3):
+            manager.record_call()
+        with pytest.raises(QuotaExceededError):
+            manager.record_call()
+        assert state['quota']['day_calls'] == 3, (
+            'Убедитесь, что счетчики запросов хранятся в состоянии бота.'
+        )
+        clock.now += quota.SECONDS_PER_DAY
+        assert manager.remaining() == 3
+        assert state['quota']['month_calls'] == 3
+
+    @pytest.mark.skipif(not hasattr(time, 'tzset'), reason='POSIX only')
+    def test_periods_follow_utc(self, monkeypatch):
+        monkeypatch.setenv('TZ', 'Asia/Tokyo')
+        time.tzset()
+        try:
+            clock = utils.FakeClock(datetime(2026, 10, 19, 23, 30))
+            manager = quota.QuotaManager(1, None, clock=clock)
+            manager.bind({})
+            manager.record_call()
+            assert manager.remaining() == 0
+            clock.now += 31 * 60
+            assert manager.remaining() == 1, (
+                'Убедитесь, что дневной лимит сбрасывается в полночь по UTC.'
+            )
+        finally:
+            monkeypatch.undo()
+            time.tzset()
+
+    def test_plenty_of_budget_polls_everything(self):
+        clock = utils.FakeClock(datetime(2026, 10, 19, 23, 0))
+        manager = quota.QuotaManager(250, None, clock=clock)
+        manager.bind({})
+        searches = ['a', 'b', 'c']
+        assert manager.plan_cycle(searches, period=600) == searches
+
+    def test_budget_follows_yield(self):
+        clock = utils.FakeClock(datetime(2026, 10, 19, 0, 0))
+        manager = quota.QuotaManager(60, None, clock=clock)
+        manager.bind({})
+        polls = {'busy': 0, 'quiet': 0}
+        for _ in range(100):
+            planned = manager.plan_cycle(polls, period=1200)
+            for name in planned:
+                manager.record_call()
+                polls[name] += 1
+                manager.record_fetch(
+                    name, [f'{name}-{clock.now}'] if name == 'busy' else []
+                )
+            manager.settle([f'busy-{clock.now}'])
+            clock.now += 1200
+        assert polls['busy'] > 2 * polls['quiet'] > 0, (
+            'Убедитесь, что бюджет распределяется пропорционально числу '
+            'новых вакансий, а малополезные поиски опрашиваются реже.'
+        )
+        assert sum(polls.values()) <= 2 * 60
+
+    def test_projection(self):
+        clock = utils.FakeClock(datetime(2026, 10, 11, 0, 0))
+        manager = quota.QuotaManager(None, 1000, clock=clock)
+        manager.bind({'quota': {
+            'day': '2026-10-11', 'day_calls': 0,
+            'month': '2026-10', 'month_calls': 500,
+        }})
+        projection = manager.projection()
+        assert 1500 < projection['month_projected'] < 1560
+        assert projection['exhausted_at'].startswith('2026-10-2')
+        assert 'закончится' in quota.format_quota_report(manager)
+
+    def test_projection_uses_daily_limit(self):
+        clock = utils.FakeClock(datetime(2026, 10, 11, 6, 0))
+        manager = quota.QuotaManager(100, 100000, clock=clock)
+        manager.bind({'quota': {
+            'day': '2026-10-11', 'day_calls': 50,
+            'month': '2026-10', 'month_calls': 500,
+        }})
+        projection = manager.projection()
+        assert projection['day_projected'] == 200
+        assert projection['exhausted_at'] == '2026-10-11T12:00 UTC', (
+            'Убедитесь, что прогноз учитывает и дневной лимит, и сообщает '
+            'о более раннем исчерпании.'
+        )
+
+
+class TestQuotaIntegration:
+
+    def test_exhausted_quota_blocks_requests(self, monkeypatch,
+                                             homework_module):
+        manager = quota.QuotaManager(0, None)
+        monkeypatch.setattr(homework_module, 'QUOTA', manager)
+
+        def unexpected_get(*args, **kwargs):
+            raise AssertionError(
+                'Убедитесь, что при исчерпанном лимите запрос не выполняется.'
+            )
+
+        monkeypatch.setattr(requests, 'get', unexpected_get)
+        with pytest.raises(QuotaExceededError):
+            homework_module.get_api_answer()
@@ -0,0 +1,103 @@
+import pytest
+
+np = pytest.importorskip('numpy')
+
+import quota  # noqa: E402
+import ranking  # noqa: E402
+import utils  # noqa: E402
+
+
+VACANCIES = [
+    utils.make_vacancy(0, 'Python Developer',
+                       'Django REST framework, PostgreSQL'),
+    utils.make_vacancy(1, 'Data Engineer',
+                       'Python, Spark, Airflow pipelines'),
+    utils.make_vacancy(2, 'Frontend Developer', 'React, TypeScript'),
+    utils.make_vacancy(3, 'Django Developer', 'Python and Django, Celery'),
+]
+
+
+class TestTfidfRanker:
+
+    def test_scores_match_dense_cosine(self):
+        ranker = ranking.TfidfRanker()
+        profiles = ['django python', 'react', 'haskell']
+        rows, columns, scores = ranker.score(VACANCIES, profiles)
+        dense = np.zeros((len(VACANCIES), len(profiles)))
+        dense[rows, columns] = scores
+
+        texts = [ranking.vacancy_text(vacancy) for vacancy in VACANCIES]
+        vocabulary = sorted(set(
+            word for text in texts + profiles
+            for word in ranking.tokenize(text)
+        ))
+        counts = np.array([
+            [ranking.tokenize(text).count(word) for word in vocabulary]
+            for text in texts
+        ])
+        idf = np.log(
+            (1 + len(texts)) / (1 + (counts > 0).sum(axis=0))
+        ) + 1
+        matrix = np.where(counts > 0, 1 + np.log(np.maximum(counts, 1)), 0)
+        matrix = matrix * idf
+        matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+        profile_matrix = np.array([
+            [word in ranking.tokenize(profile) for word in vocabulary]
+            for profile in profiles
+        ]) * idf
+        norms = np.linalg.norm(profile_matrix, axis=1, keepdims=True)
+        profile_matrix /= np.where(norms == 0, 1, norms)
+        assert np.allclose(dense, matrix @ profile_matrix.T), (
+            'Убедитесь, что оценки равны косинусной близости TF-IDF векторов.'
+        )
+
+    def test_idf_updated_incrementally(self):
+        ranker = ranking.TfidfRanker()
+        ranker.score(VACANCIES[:2], [])
+        ranker.score(VACANCIES[2:], [])
+        idf = ranker.idf()
+        assert ranker.documents == 4
+        assert idf[ranker.vocabulary['developer']] < idf[
+            ranker.vocabulary['react']
+        ], 'Убедитесь, что частые слова получают меньший вес.'
+
+    def test_select_top_k_and_threshold(self):
+        ranker = ranking.TfidfRanker()
+        selected = ranker.select(VACANCIES, {
+            'django': {'profile': 'django', 'top_k': 1},
+            'python': {'profile': 'python'},
+            'strict': {'profile': 'python', 'min_score': 0.99},
+            'nothing': {'profile': 'cobol'},
+        })
+        assert selected == {
+            'django': [3],
+            'python': [0, 3, 1],
+            'strict': [],
+            'nothing': [],
+        }
+
+
+class TestRankingIntegration:
+
+    def test_cycle_routes_to_subscribers(self, monkeypatch,
+                                         homework_module):
+        monkeypatch.setattr(homework_module, 'QUOTA', quota.QuotaManager())
+        monkeypatch.setattr(homework_module, 'SUBSCRIBERS', {
+            '111': {'profile': 'react typescript'},
+        })
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer',
+            lambda params=None: {'results': VACANCIES}
+        )
+        monkeypatch.setattr(homework_module, 'deliver_outbox',
+                            lambda bot, state: None)
+        state = {'subscribers': {'222': {'profile': 'django', 'top_k': 1}}}
+        homework_module.run_cycle(None, state)
+        assert [
+            (chat_id, message.split(' in ')[0])
+            for chat_id, message in state['outbox']
+        ] == [('111', 'Frontend Developer'), ('222', 'Django Developer')], (
+            'Убедитесь, что каждый подписчик получает только релевантные '
+            'его профилю вакансии.'
+        )
+        assert state['seen_ids'] == ['0', '1', '2', '3']
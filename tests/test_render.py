@@ -0,0 +1,79 @@
+import pytest
+
+import quota
+import render
+
+VACANCY = {
+    'id': '42',
+    'title': 'C++ Developer (remote) <senior>',
+    'company': {'display_name': 'Fake & Co.'},
+    'location': {'display_name': 'Edinburgh, Scotland'},
+    'redirect_url': 'https://example.com/job_(42)?a=1&b=2',
+}
+
+
+class TestMessageRenderer:
+
+    def test_templates_escape_fields(self):
+        renderer = render.MessageRenderer()
+        assert renderer.render(VACANCY) == (
+            'C++ Developer (remote) <senior> in Edinburgh, Scotland, for '
+            'company: Fake & Co.. Link: https://example.com/job_(42)?a=1&b=2'
+        )
+        assert renderer.render(VACANCY, 'markdown') == (
+            '*C\\+\\+ Developer \\(remote\\) <senior\\>* in Edinburgh, '
+            'Scotland, for company: Fake & Co\\.\\. '
+            '[Link](https://example.com/job_(42\\)?a=1&b=2)'
+        ), 'Убедитесь, что спецсимволы MarkdownV2 экранируются.'
+        assert renderer.render(VACANCY, 'html', 'ru') == (
+            '<b>C++ Developer (remote) &lt;senior&gt;</b> — Edinburgh, '
+            'Scotland, компания: Fake &amp; Co.. '
+            '<a href="https://example.com/job_(42)?a=1&amp;b=2">Ссылка</a>'
+        )
+        with pytest.raises(ValueError):
+            renderer.render(VACANCY, 'latex')
+
+    def test_cache_hits_and_eviction(self):
+        renderer = render.MessageRenderer(capacity=2)
+        first = renderer.render(VACANCY)
+        assert renderer.render(dict(VACANCY)) is first, (
+            'Убедитесь, что повторная отрисовка берется из кеша.'
+        )
+        renderer.render(VACANCY, 'html')
+        renderer.render(VACANCY, 'markdown')
+        assert renderer.stats() == {'size': 2, 'hits': 1, 'misses': 3}
+        renderer.render(VACANCY)
+        assert renderer.stats()['misses'] == 4
+
+    def test_changed_vacancy_rendered_again(self):
+        renderer = render.MessageRenderer()
+        renderer.render(VACANCY)
+        moved = dict(VACANCY, redirect_url='https://example.org/42')
+        assert renderer.render(moved).endswith('https://example.org/42')
+
+
+class TestRenderIntegration:
+
+    def test_fan_out_renders_once(self, monkeypatch, homework_module):
+        pytest.importorskip('numpy')
+        monkeypatch.setattr(homework_module, 'QUOTA', quota.QuotaManager())
+        renderer = render.MessageRenderer()
+        monkeypatch.setattr(homework_module, 'RENDERER', renderer)
+        subscribers = {
+            str(chat_id): {'profile': 'developer'} for chat_id in range(50)
+        }
+        subscribers['html'] = {'profile': 'developer', 'template': 'html'}
+        monkeypatch.setattr(homework_module, 'SUBSCRIBERS', subscribers)
+        monkeypatch.setattr(
+            homework_module, 'get_api_answer',
+            lambda params=None: {'results': [VACANCY]}
+        )
+        monkeypatch.setattr(homework_module, 'deliver_outbox',
+                            lambda bot, state: None)
+        state = {}
+        homework_module.run_cycle(None, state)
+        assert len(state['outbox']) == 51
+        assert renderer.stats()['misses'] == 2, (
+            'Убедитесь, что вакансия форматируется один раз на шаблон.'
+        )
+        assert state['outbox'][-1][2:] == [None, 'HTML']
@@ -0,0 +1,143 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+import requests
+import telegram
+
+import utils
+
+
+class TestState:
+
+    def test_load_missing_state(self, tmp_path):
+        import state
+
+        loaded = state.load_state(str(tmp_path / 'missing.json'))
+        assert loaded == {'seen_ids': []}, (
+            'Убедитесь, что при отсутствии файла состояния возвращается '
+            'пустое состояние.'
+        )
+
+    def test_load_corrupted_state(self, tmp_path):
+        import state
+
+        path = tmp_path / 'state.json'
+        path.write_text('{not json', encoding='utf-8')
+        assert state.load_state(str(path)) == {'seen_ids': []}, (
+            'Убедитесь, что поврежденный файл состояния не роняет бота.'
+        )
+
+    def test_save_and_load_roundtrip(self, tmp_path):
+        import state
+
+        path = str(tmp_path / 'state.json')
+        state.save_state(path, {'seen_ids': ['1', '2']})
+        assert state.load_state(path) == {'seen_ids': ['1', '2']}
+        assert os.listdir(str(tmp_path)) == ['state.json'], (
+            'Убедитесь, что временные файлы не остаются после сохранения.'
+        )
+
+    def test_new_vacancies_skips_seen(self, monkeypatch):
+        import state
+
+        monkeypatch.setattr(state, 'SEEN_IDS_LIMIT', 3)
+        current = {'seen_ids': ['1']}
+        vacancies = [{'id': i} for i in (1, 2, 3, 4)]
+        fresh = list(state.new_vacancies(current, vacancies + vacancies))
+        assert [vacancy['id'] for vacancy in fresh] == [2, 3, 4]
+        assert current['seen_ids'] == ['1'], (
+            'Убедитесь, что вакансии запоминаются только через `mark_seen`.'
+        )
+        state.mark_seen(current, fresh)
+        assert current['seen_ids'] == ['2', '3', '4'], (
+            'Убедитесь, что хранится не более `SEEN_IDS_LIMIT` id.'
+        )
+
+
+class TestRunOnce:
+
+    def test_run_once_persists_state(self, monkeypatch, tmp_path,
+                                     homework_module):
+        monkeypatch.setattr(homework_module, 'API_ID', 'id4api')
+        monkeypatch.setattr(homework_module, 'API_KEY', 's0m3-api-k3y')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_TOKEN', '1234:abcdefg')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_CHAT_ID', '12345')
+        monkeypatch.setattr(
+            requests, 'get', lambda *args, **kwargs: utils.MockResponseGET()
+        )
+        monkeypatch.setattr(telegram, 'Bot', utils.MockTelegramBot)
+        sent = []
+        monkeypatch.setattr(
+            homework_module, 'send_message',
+            lambda bot, message: sent.append(message)
+        )
+        path = str(tmp_path / 'state.json')
+
+        assert homework_module.run_once(path) == 0
+        assert len(sent) == 1
+        with open(path, encoding='utf-8') as file:
+            assert json.load(file)['seen_ids'] == ['42']
+
+        assert homework_module.run_once(path) == 0
+        assert len(sent) == 1, (
+            'Убедитесь, что `run_once` не отправляет повторно вакансии, '
+            'сохраненные в файле состояния.'
+        )
+
+    def test_failed_cycle_keeps_vacancies_unseen(self, monkeypatch,
+                                                 homework_module):
+        monkeypatch.setattr(
+            requests, 'get', lambda *args, **kwargs: utils.MockResponseGET()
+        )
+
+        def broken_route(state, vacancies):
+            raise RuntimeError('boom')
+
+        monkeypatch.setattr(homework_module, 'route_vacancies', broken_route)
+        current = {'seen_ids': []}
+        with pytest.raises(RuntimeError):
+            homework_module.run_cycle(None, current)
+        assert current['seen_ids'] == [], (
+            'Убедитесь, что вакансии не считаются отправленными, если цикл '
+            'упал до постановки сообщений в очередь.'
+        )
+
+    def test_run_once_reports_failure(self, monkeypatch, tmp_path,
+                                      homework_module):
+        monkeypatch.setattr(homework_module, 'API_ID', 'id4api')
+        monkeypatch.setattr(homework_module, 'TELEGRAM_TOKEN', '1234:abcdefg')
+
+        def broken_get(*args, **kwargs):
+            raise requests.RequestException('boom')
+
+        monkeypatch.setattr(requests, 'get', broken_get)
+        monkeypatch.setattr(telegram, 'Bot', utils.MockTelegramBot)
+        path = str(tmp_path / 'state.json')
+        assert homework_module.run_once(path) == 1
+        assert os.path.exists(path)
+
+    @pytest.mark.timeout(10, method='thread')
+    def test_import_is_lazy(self):
+        root_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        code = (
+            'import sys, time\n'
+            'started = time.perf_counter()\n'
+            'import jobsearch_bot\n'
+            'elapsed = time.perf_counter() - started\n'
+            'print(sorted({"telegram", "requests", "dotenv"} '
+            '& set(sys.modules)))\n'
+            'print(elapsed)\n'
+        )
+        env = dict(os.environ, API_ID='id4api')
+        output = subprocess.run(
+            [sys.executable, '-c', code], cwd=root_dir, env=env,
+            stdout=subprocess.PIPE, check=True, universal_newlines=True
+        ).stdout.split('\n')
+        assert output[0] == '[]', (
+            'Убедитесь, что `telegram`, `requests` и `dotenv` не '
+            f'импортируются при импорте модуля: {output[0]}.'
+        )
+        assert float(output[1]) < 0.5
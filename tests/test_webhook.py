@@ -0,0 +1,196 @@
+import http.client
+import json
+import time
+import urllib.error
+import urllib.request
+
+import pytest
+
+import utils
+import webhook
+
+
+def command_update(update_id, chat_id, text):
+    return {
+        'update_id': update_id,
+        'message': {
+            'message_id': update_id,
+            'date': 0,
+            'chat': {'id': chat_id, 'type': 'private'},
+            'text': text,
+        },
+    }
+
+
+def post(port, path, data):
+    request = urllib.request.Request(
+        f'http://127.0.0.1:{port}{path}', data=data,
+        headers={'Content-Type': 'application/json'}
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=1) as response:
+            return response.status
+    except urllib.error.HTTPError as error:
+        return error.code
+
+
+class FakeBot:
+    def __init__(self):
+        self.sent = []
+        self.webhook = None
+
+    def set_webhook(self, url=None, **kwargs):
+        self.webhook = url
+
+    def send_message(self, chat_id=None, text=None, **kwargs):
+        self.sent.append((chat_id, text))
+
+
+class TestSubscriptionCommands:
+
+    def test_parse_command(self):
+        assert webhook.parse_command('/Subscribe@jobs_bot python  go ') == (
+            'subscribe', 'python  go'
+        )
+        assert webhook.parse_command('hello') is None
+
+    def test_subscribe_filters_unsubscribe(self):
+        subscribers = {}
+        webhook.subscribe(subscribers, '1', 'python django')
+        entry = subscribers['1']
+        reply = webhook.filters(
+            subscribers, '1', 'top_k=3 min_score=0.2 template=html'
+        )
+        assert subscribers['1'] == {
+            'profile': 'python django', 'top_k': 3, 'min_score': 0.2,
+            'template': 'html',
+        }
+        assert 'top_k: 3' in reply
+        assert entry == {'profile': 'python django'}, (
+            'Убедитесь, что настройки подписчика заменяются, а не '
+            'изменяются на месте.'
+        )
+        assert webhook.filters(subscribers, '1', 'top_k=-1').startswith(
+            'Некорректная настройка top_k=-1.'
+        )
+        assert subscribers['1']['top_k'] == 3
+        assert webhook.unsubscribe(subscribers, '1', '') == (
+            'Подписка отменена.'
+        )
+        assert subscribers == {}
+
+    def test_chat_of(self):
+        assert webhook.chat_of(command_update(1, 5, '/filters')) == 5
+        assert webhook.chat_of({
+            'callback_query': {'message': {'chat': {'id': 7}}}
+        }) == 7
+        assert webhook.chat_of({'update_id': 1}) is None
+
+
+class TestWebhookIntegration:
+
+    def test_commands_update_live_registry(self, monkeypatch,
+                                           homework_module):
+        monkeypatch.setattr(
+            homework_module, 'WEBHOOK_URL', 'https://example.com/hook-s3cr3t'
+        )
+        monkeypatch.setattr(homework_module, 'WEBHOOK_PORT', 0)
+        monkeypatch.setattr(homework_module, 'OPEN_SUBSCRIPTIONS', True)
+        monkeypatch.setattr(
+            homework_module.WATCHDOG, 'probes',
+            dict(homework_module.WATCHDOG.probes)
+        )
+        bot = FakeBot()
+        state = {}
+        server = homework_module.start_webhook(bot, state)
+        port = server.server_address[1]
+        try:
+            assert bot.webhook == 'https://example.com/hook-s3cr3t'
+            assert post(port, '/wrong', b'{}') == 404
+            assert post(port, '/hook-s3cr3t', b'not json') == 400
+            connection = http.client.HTTPConnection('127.0.0.1', port, 1)
+            connection.request(
+                'POST', '/hook-s3cr3t', b'{}', {'Content-Length': 'many'}
+            )
+            assert connection.getresponse().status == 400, (
+                'Убедитесь, что на некорректный Content-Length сервер '
+                'отвечает 400.'
+            )
+            connection.close()
+            updates = [
+                command_update(1, 5, '/subscribe react typescript'),
+                command_update(2, 5, '/filters top_k=2'),
+                command_update(3, 6, '/subscribe python'),
+                command_update(4, 6, '/unsubscribe'),
+            ]
+            for update in updates:
+                assert post(
+                    port, '/hook-s3cr3t', json.dumps(update).encode()
+                ) == 200
+            started = time.monotonic()
+            while len(bot.sent) < 4 and time.monotonic() - started < 1:
+                time.sleep(0.01)
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert state['subscribers'] == {
+            '5': {'profile': 'react typescript', 'top_k': 2},
+        }, 'Убедитесь, что команды меняют подписки без перезапуска бота.'
+        assert [text for chat, text in bot.sent if chat == '6'] == [
+            'Подписка оформлена: python.', 'Подписка отменена.'
+        ], 'Убедитесь, что команды одного чата выполняются по порядку.'
+        assert homework_module.get_subscribers(state)['5']['top_k'] == 2
+
+    def test_commands_need_subscription(self, monkeypatch, homework_module):
+        monkeypatch.setitem(
+            homework_module.COMMANDS, 'quota', lambda argument: 'report'
+        )
+        state = {'subscribers': {'5': {'profile': 'python'}}}
+        handle = homework_module.handle_command
+        assert handle(state, '5', '/quota') == 'report'
+        assert handle(
+            state, str(homework_module.TELEGRAM_CHAT_ID), '/quota'
+        ) == 'report'
+        assert handle(state, '6', '/quota') != 'report', (
+            'Убедитесь, что /search, /stats и /quota недоступны чатам без '
+            'подписки.'
+        )
+        monkeypatch.setattr(homework_module, 'COMMAND_CHATS', {'6'})
+        assert handle(state, '6', '/quota') == 'report'
+
+    def test_subscribe_is_gated(self, monkeypatch, homework_module):
+        state = {'subscribers': {'5': {'profile': 'python'}}}
+        handle = homework_module.handle_command
+        reply = handle(state, '7', '/subscribe python')
+        assert '7' not in state['subscribers'], (
+            'Убедитесь, что без OPEN_SUBSCRIPTIONS посторонний чат не может '
+            'подписаться.'
+        )
+        assert '/subscribe' not in reply
+        assert handle(state, '5', '/unsubscribe') == 'Подписка отменена.'
+        handle(state, str(homework_module.TELEGRAM_CHAT_ID), '/subscribe go')
+        assert str(homework_module.TELEGRAM_CHAT_ID) in state['subscribers']
+        monkeypatch.setattr(homework_module, 'OPEN_SUBSCRIPTIONS', True)
+        handle(state, '7', '/subscribe python')
+        assert '7' in state['subscribers']
+
+    def test_default_chat_keeps_vacancies(self, monkeypatch,
+                                          homework_module):
+        pytest.importorskip('numpy')
+        vacancies = [
+            utils.make_vacancy(1, 'Python developer'),
+            utils.make_vacancy(2, 'Java developer'),
+        ]
+        state = {'subscribers': {'5': {'profile': 'python'}}}
+        routed = homework_module.route_vacancies(state, vacancies)
+        assert [(chat, vacancy['id']) for chat, vacancy in routed] == [
+            (None, 1), (None, 2), ('5', 1)
+        ], (
+            'Убедитесь, что после подписки других чатов основной чат '
+            'по-прежнему получает все вакансии.'
+        )
+        monkeypatch.setattr(homework_module, 'SUBSCRIBERS', {
+            '9': {'profile': 'java'}
+        })
+        routed = homework_module.route_vacancies(state, vacancies)
+        assert None not in [chat for chat, _ in routed]
@@ -1,8 +1,10 @@
+import calendar
 import logging
 import re
 import signal
 from collections import namedtuple
 from contextlib import contextmanager
+from datetime import datetime
 from functools import wraps
 from http import HTTPStatus
 from inspect import signature
@@ -132,6 +134,43 @@ class MockTelegramBot:
         self.text = text
 
 
+def make_vacancy(vacancy_id, title=None, description='',
+                 company='Fake Company', location='Edinburgh, Scotland',
+                 **fields):
+    """Build an Adzuna vacancy; extra fields are added as they are.
+
+    company and location may be display names or whole Adzuna objects.
+    """
+    vacancy = {
+        'id': vacancy_id,
+        'title': f'Job {vacancy_id}' if title is None else title,
+        'description': description,
+        'company': (
+            company if isinstance(company, dict)
+            else {'display_name': company}
+        ),
+        'location': (
+            location if isinstance(location, dict)
+            else {'display_name': location}
+        ),
+        'redirect_url': f'https://www.adzuna.co.uk/{vacancy_id}',
+    }
+    vacancy.update(fields)
+    return vacancy
+
+
+class FakeClock:
+    """Clock for the `clock` arguments; move it by changing `now`."""
+
+    def __init__(self, now=0.0):
+        if isinstance(now, datetime):
+            now = calendar.timegm(now.timetuple())
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
 class BreakInfiniteLoop(Exception):
     pass
 
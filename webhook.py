@@ -0,0 +1,190 @@
+import json
+import logging
+import threading
+from http import HTTPStatus
+from typing import Callable, Dict, List, Optional, Tuple
+
+from render import LAYOUTS, PHRASES
+
+MAX_BODY = 1024 * 1024
+USAGE = (
+    'Команды:\n'
+    '/subscribe слова профиля — получать подходящие вакансии\n'
+    '/unsubscribe — отписаться\n'
+    '/filters — показать настройки подписки\n'
+    '/filters top_k=5 min_score=0.1 template=html locale=ru — изменить их\n'
+    '/filters near=55.95,-3.19 radius_km=30 — только вакансии в радиусе\n'
+    '/filters area=UK/Scotland — только вакансии в этой области'
+)
+
+
+def chat_of(update: Dict) -> Optional[int]:
+    """Возвращает id чата, к которому относится обновление Telegram."""
+    message = update.get('message') or update.get('edited_message')
+    if message is None and update.get('callback_query'):
+        message = update['callback_query'].get('message')
+    if not message:
+        return None
+    return message.get('chat', {}).get('id')
+
+
+def parse_command(text: str) -> Optional[Tuple[str, str]]:
+    """
+    Разбирает команду вида `/name@bot аргументы` и возвращает имя команды
+    в нижнем регистре и аргументы или None, если текст не команда.
+    """
+    if not text or not text.startswith('/'):
+        return None
+    command, _, argument = text[1:].partition(' ')
+    return command.split('@', 1)[0].lower(), argument.strip()
+
+
+def _number(cast: Callable, low: float, high: float) -> Callable:
+    def parse(value: str):
+        number = cast(value)
+        if not low <= number <= high:
+            raise ValueError
+        return number
+    return parse
+
+
+def _choice(options) -> Callable:
+    def parse(value: str) -> str:
+        if value not in options:
+            raise ValueError
+        return value
+    return parse
+
+
+def _point(value: str) -> List[float]:
+    lat, lon = map(float, value.split(','))
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        raise ValueError
+    return [lat, lon]
+
+
+def _area(value: str) -> List[str]:
+    if not value.strip('/'):
+        raise ValueError
+    return value.strip('/').split('/')
+
+
+# Settings /filters can change, with a parser that raises ValueError.
+FILTER_PARSERS = {
+    'top_k': _number(int, 1, float('inf')),
+    'min_score': _number(float, 0, 1),
+    'template': _choice(LAYOUTS),
+    'locale': _choice(PHRASES),
+    'near': _point,
+    'radius_km': _number(float, 0.1, 20000),
+    'area': _area,
+}
+
+
+def subscribe(subscribers: Dict, chat_id: str, argument: str) -> str:
+    """Обрабатывает команду /subscribe: задает профиль подписчика."""
+    if not argument:
+        return 'Опишите, какие вакансии нужны: /subscribe python django'
+    subscribers[chat_id] = {
+        **subscribers.get(chat_id, {}), 'profile': argument
+    }
+    return f'Подписка оформлена: {argument}.'
+
+
+def unsubscribe(subscribers: Dict, chat_id: str, argument: str) -> str:
+    """Обрабатывает команду /unsubscribe: удаляет подписку чата."""
+    if subscribers.pop(chat_id, None) is None:
+        return 'Подписки нет.'
+    return 'Подписка отменена.'
+
+
+def filters(subscribers: Dict, chat_id: str, argument: str) -> str:
+    """
+    Обрабатывает команду /filters: без аргументов показывает настройки
+    подписки, с аргументами key=value меняет top_k, min_score, template,
+    locale и фильтры по месту near, radius_km и area.
+    """
+    if chat_id not in subscribers:
+        return 'Сначала подпишитесь: /subscribe python django'
+    changes = {}
+    for pair in argument.split():
+        key, _, value = pair.partition('=')
+        try:
+            changes[key] = FILTER_PARSERS[key](value)
+        except (KeyError, ValueError):
+            return f'Некорректная настройка {pair}.\n\n{USAGE}'
+    # The entry is replaced, not changed in place: a poll cycle may be
+    # reading it.
+    subscribers[chat_id] = settings = {**subscribers[chat_id], **changes}
+    return '\n'.join(
+        f'{key}: {value}' for key, value in sorted(settings.items())
+    )
+
+
+SUBSCRIPTION_COMMANDS = {
+    'subscribe': subscribe,
+    'unsubscribe': unsubscribe,
+    'filters': filters,
+}
+
+
+def _content_length(value: Optional[str]) -> int:
+    # A missing or malformed header counts as an empty body.
+    try:
+        return int(value or 0)
+    except ValueError:
+        return 0
+
+
+def start_webhook_server(dispatch: Callable[[Dict], bool], host: str,
+                         port: int, path: str):
+    """
+    Запускает в фоновом потоке HTTP-сервер, принимающий обновления Telegram
+    POST-запросами на path. Обновление сразу передается в dispatch, а
+    ответ отправляется, не дожидаясь обработки; если dispatch вернул False
+    (очередь переполнена), Telegram получает 503 и повторит доставку.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class WebhookHandler(BaseHTTPRequestHandler):
+        # Keep-alive: Telegram reuses its connections to the webhook.
+        protocol_version = 'HTTP/1.1'
+
+        def _reply(self, status: HTTPStatus) -> None:
+            self.send_response(status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def do_POST(self) -> None:
+            if self.path != path:
+                self._reply(HTTPStatus.NOT_FOUND)
+                return
+            length = _content_length(self.headers.get('Content-Length'))
+            if not 0 < length <= MAX_BODY:
+                self._reply(HTTPStatus.BAD_REQUEST)
+                return
+            try:
+                update = json.loads(self.rfile.read(length))
+            except ValueError:
+                update = None
+            if not isinstance(update, dict):
+                self._reply(HTTPStatus.BAD_REQUEST)
+                return
+            self._reply(
+                HTTPStatus.OK if dispatch(update)
+                else HTTPStatus.SERVICE_UNAVAILABLE
+            )
+
+        def log_message(self, format: str, *args) -> None:
+            logging.debug(f'Webhook: {format % args}')
+
+    server = ThreadingHTTPServer((host, port), WebhookHandler)
+    server.daemon_threads = True
+    threading.Thread(
+        target=server.serve_forever, name='webhook-server', daemon=True
+    ).start()
+    logging.info(
+        f'Webhook принимает обновления на http://{host}:'
+        f'{server.server_address[1]}{path}.'
+    )
+    return server